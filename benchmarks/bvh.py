@@ -0,0 +1,66 @@
+#!/usr/bin/env python
+
+# Benchmark for shortcrust.bvh -
+# builds a TriangleBVH over rows of spheres totalling several hundred thousand
+# triangles, then times picking with random rays and sphere queries, against
+# testing every triangle.
+
+import time
+
+import numpy
+
+from shortcrust.bvh import TriangleBVH
+from shortcrust.geometry import Sphere, Union
+
+SPHERE_COUNTS = [2, 10, 20]
+RAY_COUNT = 200
+
+
+def scene(sphere_count):
+	return Union([
+		Sphere(c=[i * 2.5, 0, 0], lat_divisions=150, lng_divisions=150)
+		for i in range(sphere_count)
+	])
+
+
+def random_rays(rng, sphere_count):
+	origins = numpy.column_stack([
+		rng.uniform(-2, sphere_count * 2.5, RAY_COUNT), rng.uniform(-3, 3, RAY_COUNT), numpy.full(RAY_COUNT, -5.0)
+	])
+	directions = numpy.column_stack([
+		rng.uniform(-0.3, 0.3, RAY_COUNT), rng.uniform(-0.3, 0.3, RAY_COUNT), numpy.ones(RAY_COUNT)
+	])
+	return origins, directions
+
+
+def main():
+	rng = numpy.random.RandomState(0)
+	for sphere_count in SPHERE_COUNTS:
+		geometry = scene(sphere_count)
+		print("%d triangles:" % (geometry.index_count // 3))
+
+		start = time.time()
+		bvh = TriangleBVH(geometry)
+		print("  build: %.3fs (depth %d)" % (time.time() - start, bvh.depth))
+
+		origins, directions = random_rays(rng, sphere_count)
+		times = []
+		for origin, direction in zip(origins, directions):
+			start = time.time()
+			bvh.intersect_ray(origin, direction)
+			times.append(time.time() - start)
+		print("  pick: median %.3fms, max %.3fms" % (numpy.median(times) * 1000, max(times) * 1000))
+
+		start = time.time()
+		for origin, direction in zip(origins[:10], directions[:10]):
+			bvh._intersect_triangles(numpy.arange(len(bvh.triangles)), origin, direction, numpy.inf)
+		print("  pick, testing every triangle: %.3fms" % ((time.time() - start) * 100))
+
+		start = time.time()
+		for origin in origins:
+			bvh.query_sphere(origin * [1, 1, 0], 0.25)
+		print("  sphere query: %.3fms" % ((time.time() - start) * 1000 / len(origins)))
+
+
+if __name__ == '__main__':
+	main()
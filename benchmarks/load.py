@@ -0,0 +1,121 @@
+#!/usr/bin/env python
+
+# Benchmark for shortcrust.geometry.loaders -
+# writes grids of several million triangles as OBJ (with and without texture
+# coordinates and normals) and binary PLY files (of triangles only, and of triangles
+# and quads mixed at random) to a temporary directory, then times loading them.
+
+import os
+import shutil
+import tempfile
+import time
+
+import numpy
+
+from shortcrust.geometry.loaders import load_obj, load_ply
+
+GRID_SIZES = [500, 1000, 1500]
+
+
+def grid(size):
+	# a size x size grid of quads on a rippled surface
+	u, v = numpy.meshgrid(numpy.linspace(0.0, 1.0, size + 1), numpy.linspace(0.0, 1.0, size + 1))
+	positions = numpy.column_stack([u.ravel(), v.ravel(), 0.1 * numpy.sin(10 * u.ravel()) * numpy.cos(10 * v.ravel())])
+	texture_positions = numpy.column_stack([u.ravel(), v.ravel()])
+	corners = numpy.arange((size + 1) * (size + 1)).reshape(size + 1, size + 1)
+	quads = numpy.column_stack([
+		corners[:-1, :-1].ravel(), corners[:-1, 1:].ravel(), corners[1:, 1:].ravel(), corners[1:, :-1].ravel()
+	])
+	return positions, texture_positions, quads
+
+
+def write_obj(path, positions, texture_positions, quads, with_attributes):
+	with open(path, 'w') as f:
+		numpy.savetxt(f, positions, fmt='v %.6f %.6f %.6f')
+		if with_attributes:
+			numpy.savetxt(f, texture_positions, fmt='vt %.6f %.6f')
+			f.write('vn 0 0 1\n')
+			faces = numpy.column_stack([quads + 1, quads + 1, numpy.ones_like(quads)])[:, [0, 4, 8, 1, 5, 9, 2, 6, 10, 3, 7, 11]]
+			numpy.savetxt(f, faces, fmt='f %d/%d/%d %d/%d/%d %d/%d/%d %d/%d/%d')
+		else:
+			numpy.savetxt(f, quads + 1, fmt='f %d %d %d %d')
+
+
+def write_ply(path, positions, quads):
+	triangles = numpy.column_stack([quads[:, [0, 1, 2]], quads[:, [0, 2, 3]]]).reshape(-1, 3)
+	faces = numpy.zeros(len(triangles), dtype=[('n', 'u1'), ('indices', '<i4', (3,))])
+	faces['n'] = 3
+	faces['indices'] = triangles
+	with open(path, 'wb') as f:
+		f.write((
+			"ply\nformat binary_little_endian 1.0\nelement vertex %d\n"
+			"property float x\nproperty float y\nproperty float z\n"
+			"element face %d\nproperty list uchar int vertex_indices\nend_header\n"
+		) % (len(positions), len(faces)))
+		f.write(positions.astype('<f4').tobytes())
+		f.write(faces.tobytes())
+
+
+def write_mixed_ply(path, positions, quads, rng):
+	# each quad is written either as it is or as two triangles, chosen at random, so that
+	# runs of faces with the same number of corners are short
+	split = rng.rand(len(quads)) < 0.5
+	face_counts = numpy.where(split, 2, 1)
+	face_quads = numpy.repeat(numpy.arange(len(quads)), face_counts)
+	# the corners of the quad, or of its first or second triangle
+	parts = numpy.arange(len(face_quads)) - numpy.repeat(numpy.cumsum(face_counts) - face_counts, face_counts)
+	columns = numpy.array([[0, 1, 2, 3], [0, 1, 2, -1], [0, 2, 3, -1]])[numpy.where(split[face_quads], parts + 1, 0)]
+	sizes = (columns >= 0).sum(axis=1)
+	face_indices = quads[face_quads[:, numpy.newaxis], columns][columns >= 0]
+	record_sizes = 1 + 4 * sizes
+	starts = numpy.concatenate(([0], numpy.cumsum(record_sizes)[:-1]))
+	records = numpy.zeros(int(record_sizes.sum()), dtype=numpy.uint8)
+	records[starts] = sizes
+	indices = face_indices.astype('<i4').view(numpy.uint8).reshape(-1, 4)
+	index_starts = numpy.repeat(starts + 1, sizes) + 4 * (numpy.arange(sizes.sum()) - numpy.repeat(numpy.cumsum(sizes) - sizes, sizes))
+	records[index_starts[:, numpy.newaxis] + numpy.arange(4)] = indices
+	with open(path, 'wb') as f:
+		f.write((
+			"ply\nformat binary_little_endian 1.0\nelement vertex %d\n"
+			"property float x\nproperty float y\nproperty float z\n"
+			"element face %d\nproperty list uchar int vertex_indices\nend_header\n"
+		) % (len(positions), len(sizes)))
+		f.write(positions.astype('<f4').tobytes())
+		f.write(records.tobytes())
+
+
+def time_load(name, loader, path):
+	start = time.time()
+	geometry = loader(path)
+	elapsed = time.time() - start
+	print("  %s: %d triangles, %d vertices from %.1fMB in %.2fs (%.1f Mtriangles/s)" % (
+		name, geometry.index_count // 3, geometry.vertex_count, os.path.getsize(path) / 1048576.0,
+		elapsed, geometry.index_count / 3.0 / elapsed / 1e6
+	))
+
+
+def main():
+	rng = numpy.random.RandomState(0)
+	directory = tempfile.mkdtemp()
+	try:
+		for size in GRID_SIZES:
+			positions, texture_positions, quads = grid(size)
+			print("Grid %dx%d:" % (size, size))
+
+			path = os.path.join(directory, 'grid.obj')
+			write_obj(path, positions, texture_positions, quads, False)
+			time_load("OBJ, positions only", load_obj, path)
+			write_obj(path, positions, texture_positions, quads, True)
+			time_load("OBJ, v/vt/vn", load_obj, path)
+
+			path = os.path.join(directory, 'grid.ply')
+			write_ply(path, positions, quads)
+			time_load("binary PLY", load_ply, path)
+			write_mixed_ply(path, positions, quads, rng)
+			time_load("binary PLY, triangles and quads mixed", load_ply, path)
+	finally:
+		shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,60 @@
+#!/usr/bin/env python
+
+# Micro-benchmarks for shortcrust.matrix.mat4 -
+# reports the cost per call of each operation, both in place (result written back to
+# the source matrix) and with a separate, preallocated destination matrix. Neither
+# form allocates a new matrix.
+
+import timeit
+
+from shortcrust.matrix import mat4
+
+CALLS = 100000
+
+
+def cost_per_call(func):
+	""" Return the time taken by one call of func, in microseconds """
+	best = min(timeit.repeat(func, number=CALLS, repeat=3))
+	return best / CALLS * 1000000
+
+
+def main():
+	mat = mat4.perspective(45, 4.0 / 3, 0.1, 100.0)
+	mat2 = mat4.lookAt([0, 0, -4], [0, 0, 0], [0, 1, 0])
+	dest = mat4.create()
+	vec = [0.1, 0.2, 0.3]
+	unit_scale = [1.0, 1.0, 1.0]
+	axis = [1, 1, 0]
+
+	# in-place calls are made on a scratch matrix, reset before each operation is timed;
+	# operations are chosen so that repeating them in place keeps its values stable
+	scratch = mat4.create(mat)
+
+	operations = [
+		# existing operations, for reference
+		("translate", lambda: mat4.translate(scratch, vec), lambda: mat4.translate(mat, vec, dest)),
+		("rotate", lambda: mat4.rotate(scratch, 0.01, axis), lambda: mat4.rotate(mat, 0.01, axis, dest)),
+		("rotateY", lambda: mat4.rotateY(scratch, 0.01), lambda: mat4.rotateY(mat, 0.01, dest)),
+		# algebra operations
+		("multiply", lambda: mat4.multiply(scratch, mat2), lambda: mat4.multiply(mat, mat2, dest)),
+		("inverse", lambda: mat4.inverse(mat4.inverse(scratch)), lambda: mat4.inverse(mat2, dest)),
+		("scale", lambda: mat4.scale(scratch, unit_scale), lambda: mat4.scale(mat, vec, dest)),
+		("ortho", None, lambda: mat4.ortho(-1, 1, -1, 1, 0.1, 100, dest)),
+	]
+
+	results = []
+	for name, in_place_func, dest_func in operations:
+		scratch[:] = mat[:]
+		results.append((name, in_place_func and cost_per_call(in_place_func), cost_per_call(dest_func)))
+
+	translate_cost = results[0][2]
+	print("%-12s %14s %14s %16s" % ("operation", "in place (us)", "dest (us)", "x translate"))
+	for name, in_place_cost, dest_cost in results:
+		in_place = "%14.3f" % in_place_cost if in_place_cost else "%14s" % "-"
+		print("%-12s %s %14.3f %15.2fx" % (name, in_place, dest_cost, dest_cost / translate_cost))
+
+	print("(in-place inverse is timed as two inversions, to keep the matrix stable)")
+
+
+if __name__ == '__main__':
+	main()
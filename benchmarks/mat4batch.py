@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+
+# Benchmark for shortcrust.matrix.mat4batch -
+# compares the per-matrix cost of each batched operation against calling the
+# equivalent shortcrust.matrix.mat4 function once per matrix.
+
+import timeit
+
+from shortcrust.matrix import mat4, mat4batch
+
+SIZES = [1, 100, 10000]
+
+
+def time_per_matrix(func, count):
+	""" Return the time taken by func (which processes count matrices), in microseconds per matrix """
+	runs = max(1, 20000 // count)
+	best = min(timeit.repeat(func, number=runs, repeat=3))
+	return best / runs / count * 1000000
+
+
+def main():
+	print("%-16s %8s %14s %14s %8s" % ("operation", "N", "mat4 (us)", "batch (us)", "speedup"))
+
+	for count in SIZES:
+		mats = [mat4.identity() for i in range(count)]
+		vecs = [mat4.create() for i in range(count)]
+		inverses = [mat4.toInverseMat3(mat4.identity()) for i in range(count)]
+		batch = mat4batch.identity(count)
+		batch_vecs = mat4batch.create(count)[:, :3].copy()
+		batch_inverses = mat4batch.toInverseMat3(batch)
+		angles = [i * 0.001 for i in range(count)]
+		axis = [1, 1, 0]
+		offset = [0.1, 0.2, 0.3]
+		eye = [0, 0, -4]
+		center = [0, 0, 0]
+		up = [0, 1, 0]
+
+		def scalar(operation):
+			def run():
+				for i in range(count):
+					operation(i)
+			return run
+
+		operations = [
+			(
+				"translate",
+				scalar(lambda i: mat4.translate(mats[i], offset)),
+				lambda: mat4batch.translate(batch, offset),
+			),
+			(
+				"rotate",
+				scalar(lambda i: mat4.rotate(mats[i], angles[i], axis)),
+				lambda: mat4batch.rotate(batch, angles, axis),
+			),
+			(
+				"rotateX",
+				scalar(lambda i: mat4.rotateX(mats[i], angles[i])),
+				lambda: mat4batch.rotateX(batch, angles),
+			),
+			(
+				"rotateY",
+				scalar(lambda i: mat4.rotateY(mats[i], angles[i])),
+				lambda: mat4batch.rotateY(batch, angles),
+			),
+			(
+				"rotateZ",
+				scalar(lambda i: mat4.rotateZ(mats[i], angles[i])),
+				lambda: mat4batch.rotateZ(batch, angles),
+			),
+			(
+				"lookAt",
+				scalar(lambda i: mat4.lookAt(eye, center, up, mats[i])),
+				lambda: mat4batch.lookAt(eye, center, up, batch),
+			),
+			(
+				"toInverseMat3",
+				scalar(lambda i: mat4.toInverseMat3(mats[i], inverses[i])),
+				lambda: mat4batch.toInverseMat3(batch, batch_inverses),
+			),
+			(
+				"multiplyVec3",
+				scalar(lambda i: mat4.multiplyVec3(mats[i], vecs[i])),
+				lambda: mat4batch.multiplyVec3(batch, batch_vecs),
+			),
+		]
+
+		for name, scalar_func, batch_func in operations:
+			scalar_time = time_per_matrix(scalar_func, count)
+			batch_time = time_per_matrix(batch_func, count)
+			print("%-16s %8d %14.3f %14.3f %7.1fx" % (
+				name, count, scalar_time, batch_time, scalar_time / batch_time
+			))
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+
+# Benchmark for shortcrust.octree -
+# scatters 10,000 and 100,000 objects of assorted sizes through a 1024-unit cube, then
+# times inserting them, moving them (a frame's worth of small movements, and a few
+# long jumps), and frustum and radius queries, against testing every object's
+# bounding sphere with Frustum.intersects_spheres.
+
+import time
+
+import numpy
+
+from shortcrust.culling import Frustum
+from shortcrust.geometry.bounds import Bounds
+from shortcrust.matrix import mat4
+from shortcrust.octree import LooseOctree
+
+OBJECT_COUNTS = [10000, 100000]
+QUERY_COUNT = 20
+
+
+class Prop(object):
+	def __init__(self, bounds):
+		self.bounds = bounds
+
+
+def translations(positions):
+	matrices = numpy.zeros((len(positions), 16), dtype=numpy.float32)
+	matrices[:, [0, 5, 10, 15]] = 1.0
+	matrices[:, 12:15] = positions
+	return matrices
+
+
+def time_per_call(function, calls):
+	start = time.time()
+	for args in calls:
+		function(*args)
+	return (time.time() - start) * 1000 / len(calls)
+
+
+def main():
+	rng = numpy.random.RandomState(0)
+	shapes = [Bounds(rng.normal(size=(20, 3)) * scale) for scale in (0.5, 1.0, 2.0, 8.0)]
+	view_matrices = [
+		mat4.lookAt(list(rng.uniform(-500, 500, 3)), list(rng.uniform(-100, 100, 3)), [0, 1, 0])
+		for i in range(QUERY_COUNT)
+	]
+	# views reaching 400 units (a few percent of the scene) and 100 units
+	frustum_sets = [
+		(far, [Frustum(mat4.perspective(60, 1.5, 0.1, far), v_matrix) for v_matrix in view_matrices])
+		for far in (400, 100)
+	]
+	spheres = [(rng.uniform(-500, 500, 3), 50.0) for i in range(QUERY_COUNT)]
+
+	for object_count in OBJECT_COUNTS:
+		print("%d objects:" % object_count)
+		objects = [Prop(shapes[i % len(shapes)]) for i in range(object_count)]
+		positions = rng.uniform(-500, 500, (object_count, 3))
+		centers = (numpy.array([obj.bounds.center for obj in objects]) + positions).astype(numpy.float32)
+		radii = numpy.array([obj.bounds.radius for obj in objects], dtype=numpy.float32)
+
+		start = time.time()
+		octree = LooseOctree(size=1024.0)
+		octree.insert_many(objects, translations(positions))
+		print("  insert: %.3fs (%d nodes)" % (time.time() - start, octree.node_count))
+
+		positions += rng.normal(size=positions.shape) * 0.5
+		start = time.time()
+		relinked = octree.move_many(objects, translations(positions))
+		print("  move_many, all objects moving slightly: %.3fs (%d relinked)" % (time.time() - start, relinked))
+
+		jumps = rng.randint(0, object_count, 1000)
+		matrices = translations(rng.uniform(-500, 500, (len(jumps), 3)))
+		print("  move, one object jumping: %.3fms" % time_per_call(
+			octree.move, [(objects[i], matrix) for i, matrix in zip(jumps, matrices)]
+		))
+
+		for far, frustums in frustum_sets:
+			print("  frustum query, far plane at %d: %.3fms (%d objects visible on average)" % (
+				far, time_per_call(octree.query_frustum, [(frustum,) for frustum in frustums]),
+				numpy.mean([len(octree.query_frustum(frustum)) for frustum in frustums])
+			))
+			print("  frustum test of every object, far plane at %d: %.3fms" % (far, time_per_call(
+				lambda frustum: [objects[i] for i in numpy.flatnonzero(frustum.intersects_spheres(centers, radii)).tolist()],
+				[(frustum,) for frustum in frustums]
+			)))
+		print("  radius query: %.3fms (%d objects found on average)" % (
+			time_per_call(octree.query_sphere, spheres),
+			numpy.mean([len(octree.query_sphere(center, radius)) for center, radius in spheres])
+		))
+
+
+if __name__ == '__main__':
+	main()
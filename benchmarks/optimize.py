@@ -0,0 +1,44 @@
+#!/usr/bin/env python
+
+# Benchmark for shortcrust.geometry.optimize -
+# reports the average cache miss ratio (vertex shader runs per triangle) of each
+# geometry's index order as generated, after vertex cache optimisation, and as a
+# triangle strip, for a few simulated FIFO cache sizes, along with the time taken.
+
+import time
+
+from shortcrust.geometry import Sphere, Cylinder, Union
+from shortcrust.geometry.optimize import acmr, stripify
+
+CACHE_SIZES = [8, 16, 32]
+
+
+def geometries():
+	yield "Sphere 20x20", Sphere()
+	yield "Sphere 100x100", Sphere(lat_divisions=100, lng_divisions=100)
+	yield "Cylinder 64, capped", Cylinder(divisions=64, caps=True)
+	yield "Union of 50 spheres", Union([Sphere(c=[i, 0, 0], lat_divisions=12, lng_divisions=12) for i in range(50)])
+
+
+def main():
+	print("ACMR (vertices transformed per triangle) for FIFO cache sizes %s" % CACHE_SIZES)
+	for name, geometry in geometries():
+		start = time.time()
+		optimized = geometry.optimized()
+		optimize_time = time.time() - start
+
+		start = time.time()
+		strip = stripify(optimized.indices)
+		strip_time = time.time() - start
+
+		print("%s: %d triangles" % (name, geometry.index_count // 3))
+		print("  original:  %s" % " ".join("%.3f" % acmr(geometry.indices, size) for size in CACHE_SIZES))
+		print("  optimized: %s  (%.3fs)" % (" ".join("%.3f" % acmr(optimized.indices, size) for size in CACHE_SIZES), optimize_time))
+		print("  strip:     %s  (%.3fs, %d indices instead of %d)" % (
+			" ".join("%.3f" % acmr(strip, size, strip=True) for size in CACHE_SIZES),
+			strip_time, len(strip), optimized.index_count
+		))
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,63 @@
+#!/usr/bin/env python
+
+# Benchmark for shortcrust.geometry.simplify -
+# times quadric error simplification of large geometries to a fraction of their
+# triangles, and reports how far the result strays from the original surface
+# (for spheres, the distance of each vertex from the true sphere) and how many of its
+# faces have turned more than 90 degrees from it (facing into the sphere).
+
+import time
+
+import numpy
+
+from shortcrust.geometry import Sphere, Union
+from shortcrust.geometry.simplify import simplify
+
+RATIOS = [0.5, 0.1, 0.02]
+
+
+def geometries():
+	yield "Sphere 200x200", Sphere(lat_divisions=200, lng_divisions=200), [[0.0, 0.0, 0.0]]
+	yield "Sphere 500x500", Sphere(lat_divisions=500, lng_divisions=500), [[0.0, 0.0, 0.0]]
+	centers = [[x * 3.0, 0.0, 0.0] for x in range(20)]
+	yield "Union of 20 spheres 100x100", Union([Sphere(c=c, lat_divisions=100, lng_divisions=100) for c in centers]), centers
+
+
+def sphere_error(geometry, centers):
+	# distance of each vertex from the surface of the nearest unit sphere
+	positions = geometry.positions.astype(numpy.float64)
+	centers = numpy.array(centers)
+	offsets = positions[:, numpy.newaxis, :] - centers[numpy.newaxis, :, :]
+	distances = numpy.sqrt((offsets * offsets).sum(axis=2)).min(axis=1)
+	return numpy.abs(distances - 1.0).max()
+
+
+def inverted_faces(geometry, centers):
+	# triangles whose face normal points towards the nearest sphere's center, ignoring
+	# degenerate ones (such as those at a Sphere's poles), whose normals are just noise
+	corners = geometry.positions.astype(numpy.float64)[geometry.indices.reshape(-1, 3)]
+	face_normals = numpy.cross(corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0])
+	middles = corners.mean(axis=1)
+	centers = numpy.array(centers)
+	offsets = middles[:, numpy.newaxis, :] - centers[numpy.newaxis, :, :]
+	nearest = centers[(offsets * offsets).sum(axis=2).argmin(axis=1)]
+	degenerate = (face_normals * face_normals).sum(axis=1) <= 1e-24
+	return int((((face_normals * (middles - nearest)).sum(axis=1) < 0) & ~degenerate).sum())
+
+
+def main():
+	for name, geometry, centers in geometries():
+		triangle_count = geometry.index_count // 3
+		print("%s: %d triangles" % (name, triangle_count))
+		for ratio in RATIOS:
+			start = time.time()
+			simplified = simplify(geometry, int(triangle_count * ratio))
+			elapsed = time.time() - start
+			print("  to %d%%: %d triangles in %.2fs, max error %.5f, %d faces inverted" % (
+				ratio * 100, simplified.index_count // 3, elapsed, sphere_error(simplified, centers),
+				inverted_faces(simplified, centers)
+			))
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+
+# Benchmark for shortcrust.geometry.Sphere -
+# compares the vectorised generator against the original point-by-point
+# implementation (reproduced below) across a range of division counts, and checks
+# that both produce identical vertex data once converted to GLfloats.
+
+import math
+import time
+
+import numpy
+
+from shortcrust.geometry import Sphere
+
+DIVISIONS = [10, 20, 50, 100, 200]
+
+
+def loop_sphere(r=1.0, c=[0.0, 0.0, 0.0], scale=[1.0, 1.0, 1.0],
+	min_lat_deg=-90, max_lat_deg=90, min_lng_deg=-180, max_lng_deg=180,
+	lat_divisions=20, lng_divisions=20):
+	""" The original implementation of Sphere.__init__, returning lists of tuples """
+	positions = []
+	normals = []
+	texture_positions = []
+	indices = []
+
+	min_lat = min_lat_deg * math.pi / 180.0
+	max_lat = max_lat_deg * math.pi / 180.0
+	min_lng = min_lng_deg * math.pi / 180.0
+	max_lng = max_lng_deg * math.pi / 180.0
+
+	lng_step = (max_lng - min_lng) / lng_divisions
+	lat_step = (max_lat - min_lat) / lat_divisions
+
+	current_lat_index = 0
+	prev_lat_index = None
+	for y in range(lat_divisions + 1):
+		lat = min_lat + y * lat_step
+
+		radius = r * math.cos(lat)
+		for x in range(lng_divisions + 1):
+			lng = min_lng + x * lng_step
+			positions += [(radius * scale[0] * math.sin(lng) + c[0], r * scale[1] * math.sin(lat) + c[1], radius * scale[2] * math.cos(lng) + c[2])]
+			normals += [(math.cos(lat) * math.sin(lng), math.sin(lat), math.cos(lat) * math.cos(lng))]
+			texture_positions += [(float(x) / lng_divisions, float(y) / lat_divisions)]
+
+		if y > 0:
+			for x0 in range(lng_divisions):
+				x1 = x0 + 1
+				indices += [
+					prev_lat_index + x0, prev_lat_index + x1, current_lat_index + x0,
+					prev_lat_index + x1, current_lat_index + x1, current_lat_index + x0
+				]
+
+		prev_lat_index = current_lat_index
+		current_lat_index += lng_divisions + 1
+
+	return positions, normals, texture_positions, indices
+
+
+def best_time(func, repeat=3):
+	best = None
+	for i in range(repeat):
+		start = time.time()
+		func()
+		elapsed = time.time() - start
+		if best is None or elapsed < best:
+			best = elapsed
+	return best
+
+
+def main():
+	print("%10s %10s %12s %12s %8s %10s" % ("divisions", "vertices", "loop (ms)", "array (ms)", "speedup", "identical"))
+
+	for divisions in DIVISIONS:
+		kwargs = {'lat_divisions': divisions, 'lng_divisions': divisions}
+
+		positions, normals, texture_positions, indices = loop_sphere(**kwargs)
+		sphere = Sphere(**kwargs)
+		identical = (
+			numpy.array_equal(numpy.array(positions, dtype=numpy.float32), sphere.positions)
+			and numpy.array_equal(numpy.array(normals, dtype=numpy.float32), sphere.normals)
+			and numpy.array_equal(numpy.array(texture_positions, dtype=numpy.float32), sphere.texture_positions)
+			and numpy.array_equal(numpy.array(indices), sphere.indices)
+		)
+
+		loop_time = best_time(lambda: loop_sphere(**kwargs))
+		array_time = best_time(lambda: Sphere(**kwargs))
+		print("%10d %10d %12.2f %12.2f %7.1fx %10s" % (
+			divisions, len(sphere.positions), loop_time * 1000, array_time * 1000,
+			loop_time / array_time, identical
+		))
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+
+# Benchmark for shortcrust.matrix.vec3batch -
+# compares transforming arrays of points and normals with transformPoints /
+# transformNormals against looping over mat4.multiplyVec3 (and, for normals, the
+# equivalent loop over a normal matrix built with mat4.toInverseMat3).
+
+import timeit
+
+from shortcrust.matrix import mat3, mat4, vec3, vec3batch
+
+SIZES = [1, 100, 10000, 100000]
+
+
+def time_per_vector(func, count):
+	""" Return the time taken by func (which processes count vectors), in microseconds per vector """
+	runs = max(1, 20000 // count)
+	best = min(timeit.repeat(func, number=runs, repeat=3))
+	return best / runs / count * 1000000
+
+
+def transform_normals_loop(mat, normals, dest):
+	# the per-vector equivalent of vec3batch.transformNormals
+	n = mat4.toInverseMat3(mat)
+	mat3.transpose(n)
+	for normal, result in zip(normals, dest):
+		x = normal[0]
+		y = normal[1]
+		z = normal[2]
+		result[0] = n[0] * x + n[3] * y + n[6] * z
+		result[1] = n[1] * x + n[4] * y + n[7] * z
+		result[2] = n[2] * x + n[5] * y + n[8] * z
+		vec3.normalize(result)
+
+
+def main():
+	mat = mat4.identity()
+	mat4.translate(mat, [1, 2, 3])
+	mat4.rotate(mat, 0.5, [1, 1, 0])
+	mat4.scale(mat, [1, 2, 1])
+
+	print("%-16s %8s %14s %14s %8s" % ("operation", "N", "loop (us)", "batch (us)", "speedup"))
+
+	for count in SIZES:
+		vecs = [vec3.create([i, i + 1, i + 2]) for i in range(count)]
+		dest = [vec3.create() for i in range(count)]
+		batch = vec3batch.create(count, [list(v) for v in vecs])
+		batch_dest = vec3batch.create(count)
+
+		def points_loop():
+			for vec, result in zip(vecs, dest):
+				mat4.multiplyVec3(mat, vec, result)
+
+		operations = [
+			(
+				"transformPoints",
+				points_loop,
+				lambda: vec3batch.transformPoints(mat, batch, batch_dest),
+			),
+			(
+				"transformNormals",
+				lambda: transform_normals_loop(mat, vecs, dest),
+				lambda: vec3batch.transformNormals(mat, batch, batch_dest),
+			),
+		]
+
+		for name, loop_func, batch_func in operations:
+			loop_time = time_per_vector(loop_func, count)
+			batch_time = time_per_vector(batch_func, count)
+			print("%-16s %8d %14.3f %14.3f %7.1fx" % (
+				name, count, loop_time, batch_time, loop_time / batch_time
+			))
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,288 @@
+from shortcrust.gl2 import *
+from shortcrust.buffer import InterleavedAttribute, StreamBuffer, uint_indices_supported
+from shortcrust.geometry.base import index_dtype
+from shortcrust.geometry.union import Union
+from shortcrust.matrix import mat4batch, vec3batch
+import ctypes
+import numpy
+
+# floats per vertex in a DynamicBatch's vertex buffer: position, normal, texture position
+DYNAMIC_VERTEX_SIZE = 8
+
+
+class StaticBatch(object):
+	"""
+		Merges many static objects into a few large meshes, one per material, so that each
+		material takes a single draw call rather than one per object (plus the uniform
+		uploads to position it).
+
+		Objects are added as (geometry, model matrix, material color, texture) - either
+		through add(), or as tuples passed to the constructor, where the material color and
+		texture may be omitted. build() then transforms each object's positions and normals
+		into world space (with shortcrust.matrix.vec3batch, an array at a time) and uploads
+		each group of objects sharing a material color and texture as a Mesh, in meshes.
+		These are drawn like any other mesh, using the view matrix as the model-view matrix
+		since the vertices are already in world space.
+
+		The geometry is copied when the batch is built, so later changes to the geometries
+		or matrices have no effect unless build() is called again.
+	"""
+	def __init__(self, items=[]):
+		# material key -> [material color, texture, [(geometry, matrix), ...]]
+		self.groups = {}
+		self.group_order = []
+		self.object_count = 0
+		self.meshes = []
+		for item in items:
+			self.add(*item)
+
+	def add(self, geometry, matrix, material_color=[1.0, 1.0, 1.0], texture=None):
+		"""
+			Add a geometry to the batch, placed by the model matrix matrix
+		"""
+		key = (tuple(float(c) for c in material_color), id(texture))
+		if key not in self.groups:
+			self.groups[key] = [material_color, texture, []]
+			self.group_order.append(key)
+		self.groups[key][2].append((geometry, matrix))
+		self.object_count += 1
+
+	def build(self, **kwargs):
+		"""
+			Transform and merge the objects added so far, and upload one Mesh per material.
+			Keyword arguments are passed to each Mesh (such as optimize=True or
+			interleaved=True). Returns the list of meshes.
+		"""
+		self.meshes = []
+		for key in self.group_order:
+			material_color, texture, objects = self.groups[key]
+			self.meshes.append(
+				self.merge(objects).to_mesh(material_color=material_color, texture=texture, **kwargs)
+			)
+		return self.meshes
+
+	@staticmethod
+	def merge(objects):
+		"""
+			Return a Union of the given (geometry, matrix) pairs, with each geometry's
+			positions and normals transformed by its matrix. Its indices are 16-bit unless
+			it has more than 65536 vertices, so that small batches can be drawn where
+			32-bit indices are unavailable:
+
+			>>> from shortcrust.geometry import Sphere, Cylinder
+			>>> StaticBatch.merge([(Sphere(), numpy.identity(4)), (Cylinder(), numpy.identity(4))]).indices.dtype
+			dtype('uint16')
+		"""
+		union = Union([geometry for geometry, matrix in objects])
+		first_vertex = 0
+		first_index = 0
+		for geometry, matrix in objects:
+			last_vertex = first_vertex + len(geometry.positions)
+			last_index = first_index + len(geometry.indices)
+			vec3batch.transformPoints(matrix, union.positions[first_vertex:last_vertex])
+			vec3batch.transformNormals(matrix, union.normals[first_vertex:last_vertex])
+
+			# a mirroring transform turns the triangles inside out, so reverse their winding
+			m = numpy.asarray(matrix, dtype=numpy.float64).reshape(4, 4)
+			if numpy.linalg.det(m[:3, :3]) < 0:
+				triangles = union.indices[first_index:last_index].reshape(-1, 3)
+				triangles[:, [1, 2]] = triangles[:, [2, 1]]
+
+			first_vertex = last_vertex
+			first_index = last_index
+
+		union.indices = union.indices.astype(index_dtype(len(union.positions)), copy=False)
+		return union
+
+	@property
+	def draw_calls(self):
+		"""
+			The number of glDrawElements calls made in drawing all of the meshes
+		"""
+		return sum(len(mesh.chunks) if mesh.chunks else 1 for mesh in self.meshes)
+
+	@property
+	def draw_calls_saved(self):
+		"""
+			The number of draw calls saved per frame, compared with drawing each object
+			as a mesh of its own
+		"""
+		return self.object_count - self.draw_calls
+
+	def draw(self, frustum=None):
+		"""
+			Draw all of the meshes (for shaders with no per-material state to set up
+			between them)
+		"""
+		for mesh in self.meshes:
+			mesh.draw(frustum)
+
+
+class DynamicBatchGroup(object):
+	"""
+		The objects of one material within a DynamicBatch, drawn with one call. This can be
+		drawn in the same way as a Mesh (all groups share the same vertex attributes, so
+		these only need attaching once per frame).
+	"""
+	mode = GL_TRIANGLES
+
+	def __init__(self, batch, material_color, texture, offset, index_count):
+		self.batch = batch
+		self.material_color = material_color
+		self.texture = texture
+		self.offset = offset
+		self.index_count = index_count
+
+	@property
+	def positions(self):
+		return self.batch.positions
+
+	@property
+	def normals(self):
+		return self.batch.normals
+
+	@property
+	def texture_positions(self):
+		return self.batch.texture_positions
+
+	def attach(self, position_location, normal_location=None, texture_position_location=None):
+		self.batch.attach(position_location, normal_location, texture_position_location)
+
+	def draw(self, frustum=None):
+		glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, self.batch.index_buffer.name)
+		glDrawElements(self.mode, self.index_count, self.batch.index_type, ctypes.c_void_p(self.offset) if self.offset else None)
+
+
+class DynamicBatch(object):
+	"""
+		Draws many small moving objects (sprites, debris...) with one draw call per
+		material, rather than one per object. Each frame, call clear(), then add() each
+		object with its current model matrix and material; update() then transforms all of
+		their vertices into world space in one vectorised pass, writes them to streaming
+		buffers (see shortcrust.buffer.StreamBuffer) and returns a DynamicBatchGroup per
+		material (also available as groups) to draw like a Mesh, with the view matrix as the
+		model-view matrix.
+
+		Objects with more than max_object_vertices vertices are refused by add(), as are
+		objects that would take the frame's total beyond vertex_capacity; add() returns False
+		for these, and they should be drawn individually. vertex_capacity is limited to
+		65536 where 32-bit indices are not available.
+	"""
+	def __init__(self, max_object_vertices=256, vertex_capacity=0x10000):
+		if vertex_capacity > 0x10000 and not uint_indices_supported():
+			vertex_capacity = 0x10000
+		self.max_object_vertices = max_object_vertices
+		self.vertex_capacity = vertex_capacity
+		self.index_type = GL_UNSIGNED_INT if index_dtype(vertex_capacity) == numpy.uint32 else GL_UNSIGNED_SHORT
+		self.index_dtype = index_dtype(vertex_capacity)
+
+		stride = DYNAMIC_VERTEX_SIZE * 4
+		self.vertices = numpy.empty((vertex_capacity, DYNAMIC_VERTEX_SIZE), dtype=numpy.float32)
+		self.vertex_buffer = StreamBuffer(GL_ARRAY_BUFFER, vertex_capacity * stride, stride=stride)
+		self.index_buffer = StreamBuffer(GL_ELEMENT_ARRAY_BUFFER, vertex_capacity * 2 * numpy.dtype(self.index_dtype).itemsize)
+		self.positions = InterleavedAttribute(self.vertex_buffer, 3, GL_FLOAT, 0)
+		self.normals = InterleavedAttribute(self.vertex_buffer, 3, GL_FLOAT, 12)
+		self.texture_positions = InterleavedAttribute(self.vertex_buffer, 2, GL_FLOAT, 24)
+
+		self.groups = []
+		self.clear()
+
+	def clear(self):
+		"""
+			Remove all objects, ready to add the next frame's
+		"""
+		# material key -> [material color, texture, [(geometry, matrix), ...]]
+		self.materials = {}
+		self.material_order = []
+		self.object_count = 0
+		self.vertex_count = 0
+
+	def add(self, geometry, matrix, material_color=[1.0, 1.0, 1.0], texture=None):
+		"""
+			Add a geometry to this frame's batch, placed by the model matrix matrix. Returns
+			False, without adding it, if the geometry is too large to batch.
+		"""
+		vertex_count = geometry.vertex_count
+		if vertex_count > self.max_object_vertices or self.vertex_count + vertex_count > self.vertex_capacity:
+			return False
+
+		key = (tuple(float(c) for c in material_color), id(texture))
+		if key not in self.materials:
+			self.materials[key] = [material_color, texture, []]
+			self.material_order.append(key)
+		self.materials[key][2].append((geometry, matrix))
+		self.object_count += 1
+		self.vertex_count += vertex_count
+		return True
+
+	def update(self):
+		"""
+			Transform the objects added since clear() and upload them. Returns the list of
+			DynamicBatchGroups.
+		"""
+		self.groups = []
+		objects = [obj for key in self.material_order for obj in self.materials[key][2]]
+		if not objects:
+			return self.groups
+
+		geometries = [geometry for geometry, matrix in objects]
+		vertex_counts = numpy.array([geometry.vertex_count for geometry in geometries])
+		index_counts = numpy.array([geometry.index_count for geometry in geometries])
+		matrices = numpy.array([numpy.asarray(matrix, dtype=numpy.float32).reshape(16) for geometry, matrix in objects])
+		object_of_vertex = numpy.repeat(numpy.arange(len(objects)), vertex_counts)
+
+		vertices = self.vertices[:self.vertex_count]
+		mat4batch.multiplyVec3(
+			matrices[object_of_vertex], numpy.concatenate([geometry.positions for geometry in geometries]),
+			vertices[:, 0:3]
+		)
+		# normals are transformed by the transposed inverse of each matrix's upper 3x3;
+		# inverse[n, i, j] is row j, column i of the inverse
+		inverse = mat4batch.toInverseMat3(matrices).reshape(-1, 3, 3)[object_of_vertex]
+		normals = numpy.concatenate([geometry.normals for geometry in geometries])
+		vertices[:, 3:6] = vec3batch.normalize(numpy.einsum('nij,nj->ni', inverse, normals))
+		vertices[:, 6:8] = numpy.concatenate([geometry.texture_positions for geometry in geometries])
+
+		first_vertices = numpy.cumsum(vertex_counts) - vertex_counts
+		indices = numpy.concatenate([geometry.indices for geometry in geometries]).astype(self.index_dtype)
+		indices += numpy.repeat(first_vertices, index_counts).astype(self.index_dtype)
+		# a mirroring transform turns the triangles inside out, so reverse their winding
+		mirrored = numpy.linalg.det(matrices.reshape(-1, 4, 4)[:, :3, :3]) < 0
+		if mirrored.any():
+			triangles = indices.reshape(-1, 3)
+			flipped = numpy.repeat(mirrored, index_counts // 3)
+			triangles[flipped] = triangles[flipped][:, [0, 2, 1]]
+
+		self.vertex_buffer.update(vertices)
+		self.index_buffer.update(indices)
+
+		offset = 0
+		for key in self.material_order:
+			material_color, texture, material_objects = self.materials[key]
+			index_count = sum(geometry.index_count for geometry, matrix in material_objects)
+			self.groups.append(DynamicBatchGroup(self, material_color, texture, offset * indices.itemsize, index_count))
+			offset += index_count
+		return self.groups
+
+	def attach(self, position_location, normal_location=None, texture_position_location=None):
+		glBindBuffer(GL_ARRAY_BUFFER, self.vertex_buffer.name)
+		attributes = (self.positions, self.normals, self.texture_positions)
+		for attribute, attr_location in zip(attributes, (position_location, normal_location, texture_position_location)):
+			if attr_location is not None:
+				attribute.point(attr_location)
+
+	@property
+	def draw_calls_saved(self):
+		"""
+			The number of draw calls saved in the last update, compared with drawing each
+			object as a mesh of its own
+		"""
+		return self.object_count - len(self.groups)
+
+	def draw(self, frustum=None):
+		"""
+			Draw all of the groups (for shaders with no per-material state to set up
+			between them)
+		"""
+		for group in self.groups:
+			group.draw()
@@ -1,40 +1,144 @@
 from .gl2 import *
+from shortcrust import has_glut
+import ctypes
+import numpy
+
+# Half-float vertex attributes are core in desktop OpenGL, but an extension
+# (OES_vertex_half_float) in OpenGL ES 2.0, where the type has a different value
+if has_glut:
+	HALF_FLOAT = GL_HALF_FLOAT
+else:
+	HALF_FLOAT = 0x8D61  # GL_HALF_FLOAT_OES
 
 TYPE_CONSTRUCTORS = {
+	GL_BYTE: GLbyte,
 	GL_UNSIGNED_BYTE: GLubyte,
+	GL_SHORT: GLshort,
 	GL_UNSIGNED_SHORT: GLushort,
 	GL_UNSIGNED_INT: GLuint,
 	GL_FLOAT: GLfloat,
+	HALF_FLOAT: GLushort,
+}
+
+# numpy type codes corresponding to the above, for uploading numpy arrays
+ARRAY_TYPE_CODES = {
+	GL_BYTE: 'i1',
+	GL_UNSIGNED_BYTE: 'u1',
+	GL_SHORT: 'i2',
+	GL_UNSIGNED_SHORT: 'u2',
+	GL_UNSIGNED_INT: 'u4',
+	GL_FLOAT: 'f4',
+	HALF_FLOAT: 'f2',
 }
 
+# integer attribute types which are normalized to floats when read by the shader,
+# with the largest unsigned value of each (2^bits - 1)
+NORMALIZED_TYPES = {
+	GL_BYTE: 0xff,
+	GL_UNSIGNED_BYTE: 0xff,
+	GL_SHORT: 0xffff,
+	GL_UNSIGNED_SHORT: 0xffff,
+}
+
+_extensions = None
+
+
+def gl_extensions():
+	"""
+		Return the set of extension names reported by GL_EXTENSIONS. Requires a current
+		GL context.
+	"""
+	global _extensions
+	if _extensions is None:
+		_extensions = set((glGetString(GL_EXTENSIONS) or b'').split())
+	return _extensions
+
+
+def uint_indices_supported():
+	"""
+		Return True if GL_UNSIGNED_INT element indices can be used: always the case in
+		desktop OpenGL, but an extension (OES_element_index_uint) in OpenGL ES 2.0.
+		Requires a current GL context.
+	"""
+	return has_glut or b'OES_element_index_uint' in gl_extensions()
+
+
+def half_float_attributes_supported():
+	"""
+		Return True if HALF_FLOAT vertex attributes can be used: always the case in
+		desktop OpenGL, but an extension (OES_vertex_half_float) in OpenGL ES 2.0.
+		Requires a current GL context.
+	"""
+	return has_glut or b'OES_vertex_half_float' in gl_extensions()
+
+
+def pack_attribute(items, data_type):
+	"""
+		Convert vertex attribute values to a numpy array of shape (element_count, n) of
+		the given data type, with each element padded out to a multiple of 4 bytes (which
+		GL implementations handle far better than unaligned attributes).
+		Floats converted to an integer type are quantized for normalization: signed types
+		represent -1.0 to 1.0 and unsigned types 0.0 to 1.0, with values outside the range
+		clamped. Returns (array, element_size, normalized), where element_size is the
+		number of values per element before padding.
+	"""
+	array = numpy.asarray(items)
+	array = array.reshape(len(array), -1)
+	element_size = array.shape[1]
+	normalized = data_type in NORMALIZED_TYPES
+	if normalized and array.dtype.kind == 'f':
+		scale = NORMALIZED_TYPES[data_type]
+		if ARRAY_TYPE_CODES[data_type].startswith('i'):
+			# OpenGL ES 2.0 maps a signed value c to (2c + 1) / (2^bits - 1), so that
+			# -1.0 and 1.0 are both exact (and 0.0 falls between two values)
+			array = numpy.round((numpy.clip(array, -1.0, 1.0) * scale - 1) / 2)
+		else:
+			array = numpy.round(numpy.clip(array, 0.0, 1.0) * scale)
+	array = array.astype(ARRAY_TYPE_CODES[data_type])
+
+	padding = -element_size * array.itemsize % 4 // array.itemsize
+	if padding:
+		array = numpy.hstack([array, numpy.zeros((len(array), padding), dtype=array.dtype)])
+	return numpy.ascontiguousarray(array), element_size, normalized
+
 
 class Buffer(object):
 	def __init__(self, items, data_type=None):
 		if data_type:
 			self.data_type = data_type
 
-		self.element_count = len(items)
-
-		# examine first element to find out whether it's a vector type,
-		# in which case the array needs flattening
-		try:
-			self.element_size = len(items[0])
-			is_flat = False
-		except TypeError:
-			# elements are scalar
-			self.element_size = 1
-			is_flat = True
+		constructor = TYPE_CONSTRUCTORS[self.data_type]
 
-		if is_flat:
-			items_flat = items
+		if hasattr(items, 'dtype'):
+			# items is a numpy array, either flat or of shape (element_count, element_size);
+			# upload its data directly, converting to the buffer's data type only if necessary
+			array = items.astype(ARRAY_TYPE_CODES[self.data_type], order='C', copy=False)
+			self.element_count = len(array)
+			self.element_size = array.shape[1] if array.ndim > 1 else 1
+			gl_items = (constructor * array.size).from_address(array.ctypes.data)
 		else:
-			# need to flatten array
-			items_flat = []
-			for item in items:
-				items_flat += item
+			self.element_count = len(items)
+
+			# examine first element to find out whether it's a vector type,
+			# in which case the array needs flattening
+			try:
+				self.element_size = len(items[0])
+				is_flat = False
+			except TypeError:
+				# elements are scalar
+				self.element_size = 1
+				is_flat = True
+
+			if is_flat:
+				items_flat = items
+			else:
+				# need to flatten array
+				items_flat = []
+				for item in items:
+					items_flat += item
+
+			gl_items = (constructor * len(items_flat))(*items_flat)
 
-		constructor = TYPE_CONSTRUCTORS[self.data_type]
-		gl_items = (constructor * len(items_flat))(*items_flat)
 		self.name = glGenBuffers(1)
 		glBindBuffer(self.target, self.name)
 		glBufferData(self.target, gl_items, GL_STATIC_DRAW)
@@ -46,9 +150,173 @@ class ElementArrayBuffer(Buffer):
 
 
 class AttributeBuffer(Buffer):
+	"""
+		A buffer of one vertex attribute. With a data_type other than GL_FLOAT, the items
+		are converted by pack_attribute: e.g. GL_BYTE suits unit normals and
+		GL_UNSIGNED_SHORT texture coordinates within 0 to 1.
+	"""
 	data_type = GL_FLOAT
 	target = GL_ARRAY_BUFFER
 
-	def attach(self, attr_location):
+	location = None
+	normalized = False
+	stride = 0
+
+	def __init__(self, items, data_type=None):
+		element_size = None
+		if data_type and data_type != GL_FLOAT:
+			items, element_size, self.normalized = pack_attribute(items, data_type)
+		super(AttributeBuffer, self).__init__(items, data_type)
+		if element_size is not None:
+			# Buffer has counted the padding as part of each element
+			self.stride = self.element_size * ctypes.sizeof(TYPE_CONSTRUCTORS[self.data_type])
+			self.element_size = element_size
+
+	def attach(self, attr_location, first_vertex=0):
+		"""
+			Associate the buffer with the given vertex attribute location, starting from
+			element first_vertex. The location is recorded so that meshes drawn in several
+			chunks can re-point it.
+		"""
+		self.location = attr_location
+		glBindBuffer(self.target, self.name)
+		offset = first_vertex * (self.stride or self.element_size * ctypes.sizeof(TYPE_CONSTRUCTORS[self.data_type]))
+		glVertexAttribPointer(
+			attr_location, self.element_size, self.data_type, GL_TRUE if self.normalized else GL_FALSE,
+			self.stride, ctypes.c_void_p(offset) if offset else None
+		)
+
+
+class InterleavedAttribute(object):
+	"""
+		One attribute within an InterleavedBuffer. This can be attached in the same way as
+		an AttributeBuffer.
+	"""
+	location = None
+
+	def __init__(self, buffer, element_size, data_type, offset, normalized=False):
+		self.buffer = buffer
+		self.element_size = element_size
+		self.data_type = data_type
+		self.offset = offset
+		self.normalized = normalized
+
+	@property
+	def name(self):
+		return self.buffer.name
+
+	@property
+	def element_count(self):
+		return self.buffer.element_count
+
+	def attach(self, attr_location, first_vertex=0):
+		glBindBuffer(GL_ARRAY_BUFFER, self.buffer.name)
+		self.point(attr_location, first_vertex)
+
+	def point(self, attr_location, first_vertex=0):
+		"""
+			Associate the attribute with the given location, assuming that the buffer is
+			already bound to GL_ARRAY_BUFFER
+		"""
+		self.location = attr_location
+		offset = self.offset + first_vertex * self.buffer.stride
+		glVertexAttribPointer(
+			attr_location, self.element_size, self.data_type, GL_TRUE if self.normalized else GL_FALSE,
+			self.buffer.stride, ctypes.c_void_p(offset) if offset else None
+		)
+
+
+class InterleavedBuffer(object):
+	"""
+		A single GL_ARRAY_BUFFER holding several vertex attributes, with all the attributes
+		of each vertex stored together. arrays is a list of numpy arrays of shape
+		(element_count, element_size), one per attribute, all of the same length;
+		attributes is the corresponding list of InterleavedAttributes.
+		data_types optionally gives the data type of each attribute (default GL_FLOAT),
+		converted as by pack_attribute.
+	"""
+	target = GL_ARRAY_BUFFER
+	data_type = GL_FLOAT
+
+	def __init__(self, arrays, data_types=None):
+		if data_types is None:
+			data_types = [self.data_type] * len(arrays)
+		packed = [pack_attribute(array, data_type) for array, data_type in zip(arrays, data_types)]
+		self.element_count = len(packed[0][0])
+
+		# pack each vertex's attributes into consecutive bytes of one row; pack_attribute
+		# has padded each one to a multiple of 4 bytes, so all stay aligned
+		self.attributes = []
+		offset = 0
+		for data_type, (array, element_size, normalized) in zip(data_types, packed):
+			self.attributes.append(InterleavedAttribute(self, element_size, data_type, offset, normalized))
+			offset += array.shape[1] * array.itemsize
+		self.stride = offset
+
+		data = numpy.empty((self.element_count, self.stride), dtype=numpy.uint8)
+		for attribute, (array, element_size, normalized) in zip(self.attributes, packed):
+			data[:, attribute.offset:attribute.offset + array.shape[1] * array.itemsize] = (
+				array.view(numpy.uint8).reshape(self.element_count, -1)
+			)
+
+		self.name = glGenBuffers(1)
+		glBindBuffer(self.target, self.name)
+		glBufferData(self.target, (GLubyte * data.size).from_address(data.ctypes.data), GL_STATIC_DRAW)
+
+	def attach(self, attr_locations, first_vertex=0):
+		"""
+			Associate each attribute with the corresponding location in attr_locations
+			(skipping any that are None), with a single bind of the buffer
+		"""
 		glBindBuffer(self.target, self.name)
-		glVertexAttribPointer(attr_location, self.element_size, self.data_type, GL_FALSE, 0, None)
+		for attribute, attr_location in zip(self.attributes, attr_locations):
+			if attr_location is not None:
+				attribute.point(attr_location, first_vertex)
+
+
+class StreamBuffer(object):
+	"""
+		A buffer whose contents are replaced every frame. Storage is allocated with
+		GL_STREAM_DRAW and reused, with update() writing into it through glBufferSubData
+		(it is only reallocated, at double the size, when the data outgrows it). Successive
+		updates alternate between buffer_count separate GL buffers, so that writing one
+		frame's data need not wait for the GPU to finish drawing from the previous frame's.
+		stride may be set, as for InterleavedBuffer, to attach InterleavedAttributes to it.
+	"""
+	def __init__(self, target, capacity=0x10000, buffer_count=2, stride=0):
+		self.target = target
+		self.stride = stride
+		self.element_count = 0
+		self.names = [glGenBuffers(1) for i in range(buffer_count)]
+		self.capacities = [0] * buffer_count
+		for i in range(buffer_count):
+			self._allocate(i, capacity)
+		# the first update goes to the first buffer
+		self.current = buffer_count - 1
+
+	@property
+	def name(self):
+		return self.names[self.current]
+
+	def _allocate(self, i, capacity):
+		glBindBuffer(self.target, self.names[i])
+		glBufferData(self.target, (GLubyte * capacity)(), GL_STREAM_DRAW)
+		self.capacities[i] = capacity
+
+	def update(self, array, element_count=None):
+		"""
+			Write the contents of a numpy array to the next buffer in turn, which becomes
+			the current one (and stays bound to the target)
+		"""
+		self.current = (self.current + 1) % len(self.names)
+		array = numpy.ascontiguousarray(array)
+		if array.nbytes > self.capacities[self.current]:
+			capacity = self.capacities[self.current] or 1
+			while capacity < array.nbytes:
+				capacity *= 2
+			self._allocate(self.current, capacity)
+		else:
+			glBindBuffer(self.target, self.name)
+		if array.nbytes:
+			glBufferSubData(self.target, 0, (GLubyte * array.nbytes).from_address(array.ctypes.data))
+		self.element_count = len(array) if element_count is None else element_count
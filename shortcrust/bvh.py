@@ -0,0 +1,352 @@
+"""
+	Bounding volume hierarchies, for finding what a ray hits (picking) or what lies within
+	a sphere or box without testing everything.
+
+	Construction is vectorised: items are sorted along a Morton (Z-order) curve through
+	the centres of their bounding boxes, so that nearby items end up next to each other,
+	then grouped leaf_size at a time into the leaves of a complete binary tree, whose node
+	bounds are computed a level at a time from the leaves up. Queries likewise descend
+	the tree a level at a time, testing all of the nodes reached at each level at once.
+"""
+import numpy
+
+# number of triangles tested at a time by TriangleBVH.intersect_ray
+RAY_BATCH_SIZE = 64
+
+
+def _spread_bits(values):
+	# spread the low 10 bits of each value out to every third bit
+	values = values.astype(numpy.uint32) & 0x3ff
+	values = (values | (values << 16)) & 0x030000ff
+	values = (values | (values << 8)) & 0x0300f00f
+	values = (values | (values << 4)) & 0x030c30c3
+	values = (values | (values << 2)) & 0x09249249
+	return values
+
+
+def morton_codes(points):
+	"""
+		Return 30-bit Morton codes for an (N, 3) array of points, quantized to a 1024^3
+		grid over their bounding box
+	"""
+	points = numpy.asarray(points, dtype=numpy.float64).reshape(-1, 3)
+	if not len(points):
+		return numpy.zeros(0, dtype=numpy.uint32)
+	low = points.min(axis=0)
+	extent = points.max(axis=0) - low
+	extent[extent == 0] = 1.0
+	cells = numpy.minimum((points - low) / extent * 1024, 1023)
+	return (_spread_bits(cells[:, 0]) << 2) | (_spread_bits(cells[:, 1]) << 1) | _spread_bits(cells[:, 2])
+
+
+def _cross(a, b):
+	# numpy.cross is slow for many small vectors
+	return numpy.column_stack([
+		a[:, 1] * b[:, 2] - a[:, 2] * b[:, 1],
+		a[:, 2] * b[:, 0] - a[:, 0] * b[:, 2],
+		a[:, 0] * b[:, 1] - a[:, 1] * b[:, 0],
+	])
+
+
+def _dot(a, b):
+	return (a * b).sum(axis=1)
+
+
+class BVH(object):
+	"""
+		A bounding volume hierarchy over items with axis-aligned bounding boxes, given as
+		(N, 3) arrays box_min and box_max. The query methods return arrays of item
+		numbers (indexes into these arrays).
+	"""
+	def __init__(self, box_min, box_max, leaf_size=4):
+		box_min = numpy.asarray(box_min, dtype=numpy.float32).reshape(-1, 3)
+		box_max = numpy.asarray(box_max, dtype=numpy.float32).reshape(-1, 3)
+		self.item_count = len(box_min)
+		self.leaf_size = leaf_size
+
+		leaf_count = max(1, -(-self.item_count // leaf_size))
+		self.depth = int(numpy.ceil(numpy.log2(leaf_count))) if leaf_count > 1 else 0
+		slot_count = (1 << self.depth) * leaf_size
+
+		# item number in each slot of the leaves, or -1 for padding
+		self.order = numpy.full(slot_count, -1, dtype=numpy.int64)
+		self.order[:self.item_count] = numpy.argsort(morton_codes((box_min + box_max) * 0.5), kind='mergesort')
+
+		# padding slots get empty boxes, which fail every test
+		slot_min = numpy.full((slot_count, 3), numpy.inf, dtype=numpy.float32)
+		slot_max = numpy.full((slot_count, 3), -numpy.inf, dtype=numpy.float32)
+		slot_min[:self.item_count] = box_min[self.order[:self.item_count]]
+		slot_max[:self.item_count] = box_max[self.order[:self.item_count]]
+
+		# node bounds for each level, from the root (level 0, one node) to the leaves
+		# (level depth); the children of node i are nodes 2i and 2i + 1 of the next level
+		levels_min = [slot_min.reshape(-1, leaf_size, 3).min(axis=1)]
+		levels_max = [slot_max.reshape(-1, leaf_size, 3).max(axis=1)]
+		for level in range(self.depth):
+			levels_min.append(levels_min[-1].reshape(-1, 2, 3).min(axis=1))
+			levels_max.append(levels_max[-1].reshape(-1, 2, 3).max(axis=1))
+		self.levels_min = levels_min[::-1]
+		self.levels_max = levels_max[::-1]
+
+		self.box_min = box_min
+		self.box_max = box_max
+
+	def _descend(self, test):
+		"""
+			Return the leaves reached by descending from the root through every node for
+			which test(node_min, node_max) (given arrays of node bounds) is true
+		"""
+		nodes = numpy.zeros(1, dtype=numpy.int64)
+		for level in range(self.depth + 1):
+			mask = test(self.levels_min[level][nodes], self.levels_max[level][nodes])
+			nodes = nodes[mask]
+			if not len(nodes) or level == self.depth:
+				return nodes
+			nodes = (nodes[:, numpy.newaxis] * 2 + numpy.array([0, 1])).reshape(-1)
+
+	def _leaf_items(self, leaves):
+		items = self.order.reshape(-1, self.leaf_size)[leaves].reshape(-1)
+		return items[items >= 0]
+
+	def query_box(self, box_min, box_max):
+		"""
+			Return the items whose boxes overlap the box from box_min to box_max
+		"""
+		box_min = numpy.asarray(box_min, dtype=numpy.float32)
+		box_max = numpy.asarray(box_max, dtype=numpy.float32)
+
+		def overlaps(node_min, node_max):
+			return ((node_min <= box_max) & (node_max >= box_min)).all(axis=1)
+
+		items = self._leaf_items(self._descend(overlaps))
+		return items[overlaps(self.box_min[items], self.box_max[items])]
+
+	def query_sphere(self, center, radius):
+		"""
+			Return the items whose boxes intersect the sphere with the given center and
+			radius
+		"""
+		center = numpy.asarray(center, dtype=numpy.float32)
+		radius_squared = radius * radius
+
+		def intersects(node_min, node_max):
+			offsets = numpy.minimum(numpy.maximum(center, node_min), node_max) - center
+			return _dot(offsets, offsets) <= radius_squared
+
+		items = self._leaf_items(self._descend(intersects))
+		return items[intersects(self.box_min[items], self.box_max[items])]
+
+	def query_ray(self, origin, direction, max_distance=numpy.inf):
+		"""
+			Return the items whose boxes are hit by the ray from origin along direction,
+			within max_distance (measured in multiples of direction, so that the point at
+			distance t is origin + t * direction). Returns (items, distances), in order of
+			distance to the point where the ray enters each box.
+		"""
+		origin = numpy.asarray(origin, dtype=numpy.float64)
+		with numpy.errstate(divide='ignore'):
+			inverse = 1.0 / numpy.asarray(direction, dtype=numpy.float64)
+
+		def entry_distances(node_min, node_max):
+			with numpy.errstate(invalid='ignore'):
+				t1 = (node_min - origin) * inverse
+				t2 = (node_max - origin) * inverse
+			# fmin / fmax ignore the NaNs from a ray lying in the plane of a box face
+			near = numpy.fmax.reduce(numpy.fmin(t1, t2), axis=1)
+			far = numpy.fmin.reduce(numpy.fmax(t1, t2), axis=1)
+			near = numpy.maximum(near, 0.0)
+			hit = (near <= far) & (near <= max_distance) & (node_min <= node_max).all(axis=1)
+			return hit, near
+
+		def hits(node_min, node_max):
+			return entry_distances(node_min, node_max)[0]
+
+		items = self._leaf_items(self._descend(hits))
+		hit, near = entry_distances(self.box_min[items], self.box_max[items])
+		items = items[hit]
+		near = near[hit]
+		order = numpy.argsort(near, kind='mergesort')
+		return items[order], near[order]
+
+
+class TriangleBVH(BVH):
+	"""
+		A BVH over the triangles of a geometry, with exact ray, sphere and box tests.
+		Triangles are numbered in the order of the geometry's indices (triangle i has
+		vertices indices[3i:3i + 3]).
+	"""
+	def __init__(self, geometry, leaf_size=4):
+		self.triangles = numpy.asarray(geometry.indices).reshape(-1, 3)
+		self.corners = geometry.positions[self.triangles]
+		super(TriangleBVH, self).__init__(self.corners.min(axis=1), self.corners.max(axis=1), leaf_size)
+
+	def intersect_ray(self, origin, direction, max_distance=numpy.inf):
+		"""
+			Find the first triangle hit by the ray from origin along direction (from either
+			side), within max_distance (measured in multiples of direction). Returns
+			(triangle, distance, barycentric), where barycentric is the (u, v) position of
+			the hit within the triangle, or None if nothing is hit.
+		"""
+		candidates, entry = self.query_ray(origin, direction, max_distance)
+		origin = numpy.asarray(origin, dtype=numpy.float64)
+		direction = numpy.asarray(direction, dtype=numpy.float64)
+
+		# test the candidates a batch at a time in order of their boxes' entry distances,
+		# stopping once the nearest hit so far is nearer than the next box
+		best = None
+		for start in range(0, len(candidates), RAY_BATCH_SIZE):
+			if best is not None and best[1] <= entry[start]:
+				break
+			batch = candidates[start:start + RAY_BATCH_SIZE]
+			hit, t, u, v = self._intersect_triangles(batch, origin, direction, max_distance)
+			if hit.any():
+				i = numpy.flatnonzero(hit)[numpy.argmin(t[hit])]
+				if best is None or t[i] < best[1]:
+					best = (int(batch[i]), float(t[i]), (float(u[i]), float(v[i])))
+		return best
+
+	def _intersect_triangles(self, triangles, origin, direction, max_distance):
+		# Moller-Trumbore intersection, returning (hit, t, u, v) arrays
+		corners = self.corners[triangles].astype(numpy.float64)
+		edge1 = corners[:, 1] - corners[:, 0]
+		edge2 = corners[:, 2] - corners[:, 0]
+		p = _cross(numpy.broadcast_to(direction, edge2.shape), edge2)
+		determinant = _dot(edge1, p)
+		with numpy.errstate(divide='ignore', invalid='ignore'):
+			inverse = 1.0 / determinant
+			s = origin - corners[:, 0]
+			u = _dot(s, p) * inverse
+			q = _cross(s, edge1)
+			v = _dot(q, numpy.broadcast_to(direction, q.shape)) * inverse
+			t = _dot(edge2, q) * inverse
+			hit = (determinant != 0) & (u >= 0) & (v >= 0) & (u + v <= 1) & (t >= 0) & (t <= max_distance)
+		return hit, t, u, v
+
+	def closest_points(self, point, triangles=None):
+		"""
+			Return the closest point on each of the given triangles (by default, all of
+			them) to point, as an (N, 3) array
+		"""
+		corners = self.corners if triangles is None else self.corners[triangles]
+		point = numpy.asarray(point, dtype=numpy.float64)
+		a = corners[:, 0].astype(numpy.float64)
+		b = corners[:, 1].astype(numpy.float64)
+		c = corners[:, 2].astype(numpy.float64)
+
+		# the Voronoi region tests of Ericson, "Real-Time Collision Detection", 5.1.5
+		ab = b - a
+		ac = c - a
+		ap = point - a
+		bp = point - b
+		cp = point - c
+		d1 = _dot(ab, ap)
+		d2 = _dot(ac, ap)
+		d3 = _dot(ab, bp)
+		d4 = _dot(ac, bp)
+		d5 = _dot(ab, cp)
+		d6 = _dot(ac, cp)
+		va = d3 * d6 - d5 * d4
+		vb = d5 * d2 - d1 * d6
+		vc = d1 * d4 - d3 * d2
+
+		with numpy.errstate(divide='ignore', invalid='ignore'):
+			# interior, then each region in increasing order of precedence
+			denominator = va + vb + vc
+			result = a + ab * (vb / denominator)[:, numpy.newaxis] + ac * (vc / denominator)[:, numpy.newaxis]
+			regions = [
+				((va <= 0) & (d4 - d3 >= 0) & (d5 - d6 >= 0),
+					lambda: b + (c - b) * ((d4 - d3) / ((d4 - d3) + (d5 - d6)))[:, numpy.newaxis]),
+				((vb <= 0) & (d2 >= 0) & (d6 <= 0), lambda: a + ac * (d2 / (d2 - d6))[:, numpy.newaxis]),
+				((d6 >= 0) & (d5 <= d6), lambda: c),
+				((vc <= 0) & (d1 >= 0) & (d3 <= 0), lambda: a + ab * (d1 / (d1 - d3))[:, numpy.newaxis]),
+				((d3 >= 0) & (d4 <= d3), lambda: b),
+				((d1 <= 0) & (d2 <= 0), lambda: a),
+			]
+			for mask, closest in regions:
+				if mask.any():
+					result[mask] = closest()[mask]
+		return result
+
+	def query_sphere(self, center, radius):
+		"""
+			Return the triangles which come within radius of center
+		"""
+		candidates = super(TriangleBVH, self).query_sphere(center, radius)
+		offsets = self.closest_points(center, candidates) - numpy.asarray(center, dtype=numpy.float64)
+		return candidates[_dot(offsets, offsets) <= radius * radius]
+
+	def query_box(self, box_min, box_max):
+		"""
+			Return the triangles which overlap the box from box_min to box_max
+		"""
+		candidates = super(TriangleBVH, self).query_box(box_min, box_max)
+		box_min = numpy.asarray(box_min, dtype=numpy.float64)
+		box_max = numpy.asarray(box_max, dtype=numpy.float64)
+		center = (box_min + box_max) * 0.5
+		half_size = (box_max - box_min) * 0.5
+
+		# separating axis test (the box's own axes having been tested by the BVH): the
+		# triangle's normal, and the cross products of its edges with the box axes
+		corners = self.corners[candidates].astype(numpy.float64) - center
+		edges = [corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 1], corners[:, 0] - corners[:, 2]]
+		axes = [_cross(edges[0], edges[1])]
+		for edge in edges:
+			for unit in numpy.eye(3):
+				axes.append(_cross(edge, numpy.broadcast_to(unit, edge.shape)))
+
+		overlapping = numpy.ones(len(candidates), dtype=bool)
+		for axis in axes:
+			projections = numpy.column_stack([_dot(corners[:, i], axis) for i in range(3)])
+			reach = _dot(numpy.abs(axis), numpy.broadcast_to(half_size, axis.shape))
+			overlapping &= (projections.min(axis=1) <= reach) & (projections.max(axis=1) >= -reach)
+		return candidates[overlapping]
+
+
+class SceneBVH(BVH):
+	"""
+		A BVH over the bounding boxes of a scene's objects - anything with bounds, such as
+		a Mesh or LODMesh - each optionally placed by a model matrix. The query methods
+		return lists of the objects, nearest first in the case of pick.
+	"""
+	def __init__(self, objects, model_matrices=None, leaf_size=2):
+		self.objects = list(objects)
+		box_min = numpy.array([obj.bounds.box_min for obj in self.objects], dtype=numpy.float32).reshape(-1, 3)
+		box_max = numpy.array([obj.bounds.box_max for obj in self.objects], dtype=numpy.float32).reshape(-1, 3)
+
+		if model_matrices is not None:
+			# the box around each transformed box: its center transforms as a point, and
+			# its extent along each axis is the sum of the absolute extents contributed
+			m = numpy.asarray(model_matrices, dtype=numpy.float32).reshape(-1, 4, 4)
+			centers = (box_min + box_max) * 0.5
+			half_sizes = (box_max - box_min) * 0.5
+			centers = numpy.matmul(centers[:, numpy.newaxis, :], m[:, :3, :3])[:, 0, :] + m[:, 3, :3]
+			half_sizes = numpy.matmul(half_sizes[:, numpy.newaxis, :], numpy.abs(m[:, :3, :3]))[:, 0, :]
+			box_min = centers - half_sizes
+			box_max = centers + half_sizes
+
+		super(SceneBVH, self).__init__(box_min, box_max, leaf_size)
+
+	@classmethod
+	def from_nodes(cls, root, leaf_size=2):
+		"""
+			Build a SceneBVH of the meshes of root (a shortcrust.scene.Node) and its
+			descendants, placed by their world matrices
+		"""
+		nodes = [node for node in root.walk() if node.mesh is not None]
+		matrices = numpy.array([list(node.world_matrix) for node in nodes], dtype=numpy.float32).reshape(-1, 16)
+		return cls([node.mesh for node in nodes], matrices, leaf_size)
+
+	def pick(self, origin, direction, max_distance=numpy.inf):
+		"""
+			Return the objects whose (transformed) bounding boxes are hit by the ray from
+			origin along direction, as a list of (distance, object) in order of the distance
+			at which the ray enters each box
+		"""
+		items, distances = self.query_ray(origin, direction, max_distance)
+		return [(float(distance), self.objects[item]) for item, distance in zip(items, distances)]
+
+	def objects_in_sphere(self, center, radius):
+		return [self.objects[item] for item in self.query_sphere(center, radius)]
+
+	def objects_in_box(self, box_min, box_max):
+		return [self.objects[item] for item in self.query_box(box_min, box_max)]
@@ -0,0 +1,135 @@
+import numpy
+from shortcrust.matrix import mat4
+
+
+class Frustum(object):
+	"""
+		The view frustum of a camera, as six planes extracted from a projection matrix (as
+		generated by mat4.perspective / mat4.frustum) multiplied by a model-view matrix (as
+		generated by mat4.lookAt). The planes are expressed in the coordinate space that the
+		model-view matrix transforms from: pass the model-view matrix of an individual object
+		to test against that object's bounds directly, or just the view matrix to obtain
+		world-space planes for testing many objects at once with intersects_spheres.
+
+		Every test made through is_visible counts towards drawn_count or culled_count;
+		call reset_counters at the start of each frame.
+	"""
+
+	def __init__(self, p_matrix=None, mv_matrix=None):
+		self.planes = numpy.zeros((6, 4), dtype=numpy.float32)
+		self.clip_matrix = mat4.create()
+		self.reset_counters()
+
+		if p_matrix is not None:
+			self.update(p_matrix, mv_matrix)
+
+	def reset_counters(self):
+		self.drawn_count = 0
+		self.culled_count = 0
+
+	def update(self, p_matrix, mv_matrix=None):
+		"""
+			Recalculate the frustum planes from a projection matrix and (optionally) a
+			model-view matrix
+		"""
+		if mv_matrix is not None:
+			mat4.multiply(p_matrix, mv_matrix, self.clip_matrix)
+		else:
+			mat4.set(p_matrix, self.clip_matrix)
+
+		# rows of the clip matrix (which is stored in column-major order)
+		m = numpy.array(self.clip_matrix, dtype=numpy.float32).reshape(4, 4).T
+		planes = self.planes
+		planes[0] = m[3] + m[0]  # left
+		planes[1] = m[3] - m[0]  # right
+		planes[2] = m[3] + m[1]  # bottom
+		planes[3] = m[3] - m[1]  # top
+		planes[4] = m[3] + m[2]  # near
+		planes[5] = m[3] - m[2]  # far
+
+		# normalise, so that plane equations give true distances
+		planes /= numpy.sqrt((planes[:, :3] * planes[:, :3]).sum(axis=1))[:, numpy.newaxis]
+		self._plane_list = planes.tolist()
+
+	def intersects_sphere(self, center, radius):
+		"""
+			Return True if the sphere with the given center and radius is at least partly
+			inside the frustum
+		"""
+		x = center[0]
+		y = center[1]
+		z = center[2]
+		for a, b, c, d in self._plane_list:
+			if a * x + b * y + c * z + d < -radius:
+				return False
+		return True
+
+	def intersects_box(self, box_min, box_max):
+		"""
+			Return True if the axis-aligned box from box_min to box_max is at least partly
+			inside the frustum (conservatively - boxes lying just outside a corner of the
+			frustum may also be reported as visible)
+		"""
+		for a, b, c, d in self._plane_list:
+			# test the box corner that lies furthest along the plane normal
+			x = box_max[0] if a >= 0 else box_min[0]
+			y = box_max[1] if b >= 0 else box_min[1]
+			z = box_max[2] if c >= 0 else box_min[2]
+			if a * x + b * y + c * z + d < 0:
+				return False
+		return True
+
+	def intersects_spheres(self, centers, radii, model_matrices=None):
+		"""
+			Test many bounding spheres against the frustum in one vectorised pass.
+
+			@param centers (N, 3) array of sphere centers
+			@param radii (N,) array of sphere radii, or a single radius for all spheres
+			@param model_matrices optional (N, 16) mat4batch of matrices to transform each
+				sphere by before testing; radii are scaled by the largest scale factor of
+				each matrix
+
+			@returns (N,) boolean numpy array, true where the sphere is at least partly inside
+		"""
+		centers = numpy.asarray(centers, dtype=numpy.float32).reshape(-1, 3)
+		radii = numpy.asarray(radii, dtype=numpy.float32)
+
+		if model_matrices is not None:
+			m = numpy.asarray(model_matrices, dtype=numpy.float32).reshape(-1, 4, 4)
+			centers = numpy.matmul(centers[:, numpy.newaxis, :], m[:, :3, :3])[:, 0, :] + m[:, 3, :3]
+			scales = numpy.sqrt((m[:, :3, :3] * m[:, :3, :3]).sum(axis=2)).max(axis=1)
+			radii = radii * scales
+
+		distances = numpy.dot(centers, self.planes[:, :3].T) + self.planes[:, 3]
+		return (distances >= -radii.reshape(-1, 1)).all(axis=1)
+
+	def is_visible(self, mesh):
+		"""
+			Test a mesh's bounds against the frustum, counting it as drawn or culled
+		"""
+		bounds = mesh.bounds
+		visible = (
+			self.intersects_sphere(bounds.center, bounds.radius)
+			and self.intersects_box(bounds.box_min, bounds.box_max)
+		)
+		if visible:
+			self.drawn_count += 1
+		else:
+			self.culled_count += 1
+		return visible
+
+	def cull(self, meshes, model_matrices):
+		"""
+			Return the list of meshes that are at least partly inside the frustum, where
+			model_matrices is a (N, 16) mat4batch giving each mesh's model matrix and the
+			frustum has been built from the projection and view matrices. Counts towards
+			drawn_count and culled_count.
+		"""
+		centers = numpy.array([mesh.bounds.center for mesh in meshes], dtype=numpy.float32)
+		radii = numpy.array([mesh.bounds.radius for mesh in meshes], dtype=numpy.float32)
+		visible = self.intersects_spheres(centers, radii, model_matrices)
+
+		drawn = int(visible.sum())
+		self.drawn_count += drawn
+		self.culled_count += len(meshes) - drawn
+		return [mesh for mesh, is_visible in zip(meshes, visible) if is_visible]
@@ -1,3 +1,5 @@
 from sphere import Sphere
 from cylinder import Cylinder
 from union import Union
+from cache import GeometryCache
+from lod import LODMesh
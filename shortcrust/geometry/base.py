@@ -1,26 +1,275 @@
 from shortcrust.gl2 import *
-from shortcrust.buffer import AttributeBuffer, ElementArrayBuffer
+from shortcrust.buffer import AttributeBuffer, ElementArrayBuffer, InterleavedBuffer, HALF_FLOAT, half_float_attributes_supported, uint_indices_supported
+from shortcrust.geometry.bounds import Bounds
 from shortcrust.matrix import vec3
+import ctypes
+import numpy
+
+
+def index_dtype(vertex_count):
+	"""
+		Return the smallest unsigned numpy integer type able to index vertex_count vertices
+	"""
+	if vertex_count <= 0x10000:
+		return numpy.uint16
+	else:
+		return numpy.uint32
+
+
+def split_indices(indices, max_vertices=0x10000):
+	"""
+		Split a triangle list into consecutive runs of triangles that each reference at most
+		max_vertices distinct vertices. Returns a list of (vertex_ids, local_indices) pairs
+		in the original triangle order, where vertex_ids is the sorted array of vertices used
+		by the run and local_indices is a uint16 / uint32 array indexing into vertex_ids.
+	"""
+	triangles = numpy.asarray(indices).reshape(-1, 3)
+	chunks = []
+	start = 0
+	while start < len(triangles):
+		remaining = len(triangles) - start
+		if len(numpy.unique(triangles[start:])) <= max_vertices:
+			count = remaining
+		else:
+			# binary search for the longest run that fits (any max_vertices // 3 triangles do)
+			low = max(max_vertices // 3, 1)
+			high = remaining
+			while high - low > 1:
+				middle = (low + high) // 2
+				if len(numpy.unique(triangles[start:start + middle])) <= max_vertices:
+					low = middle
+				else:
+					high = middle
+			count = low
+
+		vertex_ids, local_indices = numpy.unique(triangles[start:start + count], return_inverse=True)
+		chunks.append((vertex_ids, local_indices.astype(index_dtype(max_vertices))))
+		start += count
+	return chunks
 
 
 class Mesh(object):
+	"""
+		A geometry uploaded to GL buffers, ready for drawing.
+
+		Geometries with more than 65536 vertices need 32-bit indices. Where the GL
+		implementation lacks these (OpenGL ES without OES_element_index_uint, as on the
+		Raspberry Pi), the triangles are split into chunks each using at most 65536 vertices;
+		the vertices of all chunks are stored together in one set of buffers, and draw()
+		re-points the attributes last attached from those buffers to each chunk in turn.
+		Pass uint_indices=True or False to override the detection.
+
+		With strip=True, the triangles are converted to a GL_TRIANGLE_STRIP (see
+		shortcrust.geometry.optimize.stripify).
+
+		With interleaved=True, the vertex attributes are packed into a single buffer
+		(vertex_buffer) rather than one each; positions, normals and texture_positions are
+		then views of it, which can still be attached individually, but attach() sets up
+		all three with one bind.
+
+		formats selects a more compact data type than GL_FLOAT for any of the attributes,
+		as a dict keyed by 'positions', 'normals' or 'texture_positions' - for example
+		{'normals': GL_BYTE, 'texture_positions': GL_UNSIGNED_SHORT} cuts the vertex size
+		from 32 to 20 bytes (normals being padded to 4). Integer types are normalized (see
+		shortcrust.buffer.pack_attribute), so only suit values within -1.0 to 1.0 (or 0.0
+		to 1.0 if unsigned); shortcrust.buffer.HALF_FLOAT keeps the range of the values,
+		and falls back to GL_FLOAT where the GL implementation does not support it.
+	"""
 	mode = GL_TRIANGLES
 
-	def __init__(self, geometry, material_color=[1.0, 1.0, 1.0], texture=None):
-		self.positions = AttributeBuffer(geometry.positions)
-		self.normals = AttributeBuffer(geometry.normals)
-		self.texture_positions = AttributeBuffer(geometry.texture_positions)
-		self.indices = ElementArrayBuffer(geometry.indices)
+	def __init__(self, geometry, material_color=[1.0, 1.0, 1.0], texture=None, uint_indices=None, strip=False, interleaved=False, formats=None):
+		positions = geometry.positions
+		normals = geometry.normals
+		texture_positions = geometry.texture_positions
+		indices = geometry.indices
+		self.chunks = None
+
+		if strip:
+			from shortcrust.geometry.optimize import stripify
+			self.mode = GL_TRIANGLE_STRIP
+
+		if len(positions) > 0x10000:
+			if uint_indices is None:
+				uint_indices = uint_indices_supported()
+			if not uint_indices:
+				split = split_indices(indices)
+				if strip:
+					split = [(ids, stripify(local_indices)) for ids, local_indices in split]
+				vertex_ids = numpy.concatenate([ids for ids, local_indices in split])
+				positions = positions[vertex_ids]
+				normals = normals[vertex_ids]
+				texture_positions = texture_positions[vertex_ids]
+				indices = numpy.concatenate([local_indices for ids, local_indices in split])
+
+				# (first vertex, byte offset of first index, index count) for each chunk
+				self.chunks = []
+				first_vertex = 0
+				first_index = 0
+				for ids, local_indices in split:
+					self.chunks.append((first_vertex, first_index * indices.itemsize, len(local_indices)))
+					first_vertex += len(ids)
+					first_index += len(local_indices)
+
+		if strip and self.chunks is None:
+			indices = stripify(indices)
+
+		formats = formats or {}
+		data_types = [
+			formats.get(name, GL_FLOAT) for name in ('positions', 'normals', 'texture_positions')
+		]
+		if HALF_FLOAT in data_types and not half_float_attributes_supported():
+			data_types = [GL_FLOAT if data_type == HALF_FLOAT else data_type for data_type in data_types]
+
+		if interleaved:
+			self.vertex_buffer = InterleavedBuffer([positions, normals, texture_positions], data_types)
+			self.positions, self.normals, self.texture_positions = self.vertex_buffer.attributes
+		else:
+			self.vertex_buffer = None
+			self.positions = AttributeBuffer(positions, data_types[0])
+			self.normals = AttributeBuffer(normals, data_types[1])
+			self.texture_positions = AttributeBuffer(texture_positions, data_types[2])
+		if len(positions) <= 0x10000:
+			# 32-bit indices only reach GL when there are too many vertices for 16-bit ones
+			indices = numpy.asarray(indices).astype(index_dtype(len(positions)), copy=False)
+		self.indices = ElementArrayBuffer(indices, GL_UNSIGNED_INT if indices.itemsize == 4 else GL_UNSIGNED_SHORT)
 		self.index_count = self.indices.element_count
+		self.bounds = Bounds(geometry.positions)
 
 		self.material_color = vec3.create(material_color)
 		self.texture = texture
 
-	def draw(self):
+	def attach(self, position_location, normal_location=None, texture_position_location=None):
+		"""
+			Associate the mesh's vertex attributes with the given shader attribute locations
+			(skipping any that are None)
+		"""
+		self._point_attributes([position_location, normal_location, texture_position_location])
+
+	def _point_attributes(self, locations, first_vertex=0):
+		if self.vertex_buffer:
+			self.vertex_buffer.attach(locations, first_vertex)
+		else:
+			for buf, attr_location in zip((self.positions, self.normals, self.texture_positions), locations):
+				if attr_location is not None:
+					buf.attach(attr_location, first_vertex)
+
+	def draw(self, frustum=None):
+		# If a frustum is passed, skip drawing when the mesh lies wholly outside it
+		if frustum and not frustum.is_visible(self):
+			return
+
 		glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, self.indices.name)
-		glDrawElements(self.mode, self.index_count, self.indices.data_type, None)
+		if self.chunks is None:
+			glDrawElements(self.mode, self.index_count, self.indices.data_type, None)
+			return
+
+		locations = [buf.location for buf in (self.positions, self.normals, self.texture_positions)]
+		for first_vertex, offset, count in self.chunks:
+			self._point_attributes(locations, first_vertex)
+			glDrawElements(self.mode, count, self.indices.data_type, ctypes.c_void_p(offset) if offset else None)
+
+		# leave the attributes pointing at the start of the buffers again
+		self._point_attributes(locations)
+
+
+def _vertex_attribute(name, size):
+	"""
+		Define a property for a vertex attribute of BaseGeometry, stored as a contiguous
+		float32 array of shape (vertex_count, size); any array-like value assigned to it
+		(such as a list of tuples) is converted to this form.
+	"""
+	key = '_' + name
+
+	def get(self):
+		return getattr(self, key)
+
+	def set(self, value):
+		array = numpy.ascontiguousarray(value, dtype=numpy.float32)
+		setattr(self, key, array.reshape(-1, size))
+
+	return property(get, set)
 
 
 class BaseGeometry(object):
-	def to_mesh(self, **kwargs):
-		return Mesh(self, **kwargs)
+	"""
+		A collection of triangles, stored as typed arrays: positions and normals are float32
+		arrays of shape (vertex_count, 3), texture_positions a float32 array of shape
+		(vertex_count, 2), and indices a flat uint16 or uint32 array (depending on the number
+		of vertices) giving three vertex indices per triangle. Subclasses may assign any
+		array-like value to these attributes (such as a list of tuples, or a numpy array of
+		another type), and it will be converted.
+	"""
+	positions = _vertex_attribute('positions', 3)
+	normals = _vertex_attribute('normals', 3)
+	texture_positions = _vertex_attribute('texture_positions', 2)
+
+	def __init__(self, positions=[], normals=[], texture_positions=[], indices=[]):
+		self.positions = positions
+		self.normals = normals
+		self.texture_positions = texture_positions
+		self.indices = indices
+
+	@property
+	def indices(self):
+		return self._indices
+
+	@indices.setter
+	def indices(self, value):
+		array = numpy.asarray(value).reshape(-1)
+		if array.dtype not in (numpy.uint16, numpy.uint32):
+			max_index = int(array.max()) if len(array) else 0
+			array = array.astype(index_dtype(max_index + 1))
+		self._indices = numpy.ascontiguousarray(array)
+
+	@property
+	def vertex_count(self):
+		return len(self.positions)
+
+	@property
+	def index_count(self):
+		return len(self.indices)
+
+	@property
+	def nbytes(self):
+		"""
+			Total size in bytes of the geometry's attribute and index arrays
+		"""
+		return self.positions.nbytes + self.normals.nbytes + self.texture_positions.nbytes + self.indices.nbytes
+
+	def optimized(self, cache_size=32):
+		"""
+			Return a copy of this geometry reordered for the GPU's vertex cache (see
+			shortcrust.geometry.optimize). This runs in pure Python, taking a few seconds per
+			100,000 triangles on a desktop machine, so is best applied to large geometries
+			ahead of time.
+		"""
+		from shortcrust.geometry.optimize import optimize
+		return optimize(self, cache_size)
+
+	def weld(self, **kwargs):
+		"""
+			Return a copy of this geometry with duplicate vertices merged; keyword arguments
+			are passed to shortcrust.geometry.weld.weld
+		"""
+		from shortcrust.geometry.weld import weld
+		return weld(self, **kwargs)
+
+	def lod_chain(self, levels=4, ratio=0.5):
+		"""
+			Return a list of geometries at decreasing levels of detail, starting with this
+			one, each simplified to roughly ratio times the triangles of the last (see
+			shortcrust.geometry.simplify)
+		"""
+		from shortcrust.geometry.simplify import simplify
+		chain = [self]
+		for level in range(1, levels):
+			chain.append(simplify(chain[-1], int(self.index_count // 3 * ratio ** level)))
+		return chain
+
+	def to_mesh(self, optimize=False, **kwargs):
+		"""
+			Upload the geometry to a Mesh; if optimize is true, the geometry is first
+			passed through optimized(). Other keyword arguments are passed to Mesh.
+		"""
+		geometry = self.optimized() if optimize else self
+		return Mesh(geometry, **kwargs)
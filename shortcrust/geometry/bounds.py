@@ -0,0 +1,23 @@
+import numpy
+
+
+class Bounds(object):
+	"""
+		Bounding volumes of a set of points: an axis-aligned bounding box (box_min, box_max)
+		and a bounding sphere (center, radius) centred on the box. All vectors are
+		float32 numpy arrays of length 3.
+	"""
+	def __init__(self, positions):
+		positions = numpy.asarray(positions, dtype=numpy.float32).reshape(-1, 3)
+
+		if len(positions):
+			self.box_min = positions.min(axis=0)
+			self.box_max = positions.max(axis=0)
+			self.center = (self.box_min + self.box_max) * 0.5
+			offsets = positions - self.center
+			self.radius = float(numpy.sqrt((offsets * offsets).sum(axis=1).max()))
+		else:
+			self.box_min = numpy.zeros(3, dtype=numpy.float32)
+			self.box_max = numpy.zeros(3, dtype=numpy.float32)
+			self.center = numpy.zeros(3, dtype=numpy.float32)
+			self.radius = 0.0
@@ -0,0 +1,221 @@
+from shortcrust.geometry.base import BaseGeometry
+import hashlib
+import inspect
+import os
+import struct
+import tempfile
+import numpy
+
+# bump whenever the file layout or the output of a geometry class changes, to invalidate
+# existing cache entries
+FORMAT_VERSION = 1
+
+MAGIC = b'SCGC'
+# magic, format version, vertex count, index count, bytes per index
+HEADER = struct.Struct('<4sIIII')
+
+EXTENSION = '.geom'
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+
+def default_directory():
+	"""
+		The cache directory used when none is specified: $SHORTCRUST_GEOMETRY_CACHE if set,
+		otherwise shortcrust/geometry within $XDG_CACHE_HOME (defaulting to ~/.cache)
+	"""
+	directory = os.environ.get('SHORTCRUST_GEOMETRY_CACHE')
+	if directory:
+		return directory
+	cache_home = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+	return os.path.join(cache_home, 'shortcrust', 'geometry')
+
+
+def _default_arguments(cls):
+	try:
+		spec = inspect.getargspec(cls.__init__)
+	except TypeError:
+		# not a Python function, so it has no defaults to find
+		return {}
+	if not spec.defaults:
+		return {}
+	return dict(zip(spec.args[-len(spec.defaults):], spec.defaults))
+
+
+class GeometryCache(object):
+	"""
+		A persistent cache of generated geometry. get(cls, **kwargs) returns the geometry that
+		cls(**kwargs) would build; the first time, this is generated and its arrays written
+		to a file in the cache directory, keyed by a hash of the class and arguments, and on
+		later calls (including in later runs) that file is memory-mapped instead. The
+		geometry is returned as a plain BaseGeometry, so attributes specific to the
+		geometry class (such as a Sphere's radius) are not available.
+
+		When the files in the directory exceed max_bytes in total, the least recently used
+		are deleted. Failures to write to the cache are ignored, so a read-only or full disk
+		only costs the time to generate the geometry.
+	"""
+	def __init__(self, directory=None, max_bytes=DEFAULT_MAX_BYTES):
+		self.directory = directory or default_directory()
+		self.max_bytes = max_bytes
+
+	def key(self, cls, kwargs):
+		# fill in the defaults of the arguments left out, so that Sphere() and
+		# Sphere(r=1.0) share an entry
+		arguments = _default_arguments(cls)
+		arguments.update(kwargs)
+		description = repr((FORMAT_VERSION, cls.__module__, cls.__name__, sorted(arguments.items())))
+		return hashlib.sha1(description.encode('utf-8')).hexdigest()
+
+	def path(self, cls, kwargs):
+		return os.path.join(self.directory, self.key(cls, kwargs) + EXTENSION)
+
+	def get(self, cls, **kwargs):
+		path = self.path(cls, kwargs)
+
+		try:
+			geometry = self.load(path)
+		except (IOError, OSError, ValueError):
+			geometry = None
+
+		if geometry is not None:
+			try:
+				# record the access for least-recently-used eviction
+				os.utime(path, None)
+			except OSError:
+				pass
+			return geometry
+
+		generated = cls(**kwargs)
+		try:
+			self.store(path, generated)
+			# return the stored arrays, as later calls will
+			geometry = self.load(path)
+			self.evict()
+		except (IOError, OSError, ValueError):
+			if geometry is None:
+				geometry = BaseGeometry(
+					positions=generated.positions.copy(), normals=generated.normals.copy(),
+					texture_positions=generated.texture_positions.copy(), indices=generated.indices.copy()
+				)
+		return geometry
+
+	def load(self, path):
+		"""
+			Memory-map a cache file as a BaseGeometry, or raise ValueError if it is not a
+			valid cache file of this format version
+		"""
+		with open(path, 'rb') as f:
+			header = f.read(HEADER.size)
+		if len(header) < HEADER.size:
+			raise ValueError("truncated geometry cache file: %s" % path)
+		magic, version, vertex_count, index_count, index_size = HEADER.unpack(header)
+		if magic != MAGIC or version != FORMAT_VERSION or index_size not in (2, 4):
+			raise ValueError("not a geometry cache file of version %d: %s" % (FORMAT_VERSION, path))
+
+		sizes = [vertex_count * 12, vertex_count * 12, vertex_count * 8, index_count * index_size]
+		if os.path.getsize(path) != HEADER.size + sum(sizes):
+			raise ValueError("truncated geometry cache file: %s" % path)
+
+		if not sum(sizes):
+			# numpy cannot map an empty region
+			return BaseGeometry()
+
+		data = numpy.memmap(path, dtype=numpy.uint8, mode='r')
+		arrays = []
+		offset = HEADER.size
+		for size, dtype in zip(sizes, [numpy.float32, numpy.float32, numpy.float32, 'u%d' % index_size]):
+			arrays.append(data[offset:offset + size].view(dtype))
+			offset += size
+
+		positions, normals, texture_positions, indices = arrays
+		return BaseGeometry(
+			positions=positions.reshape(-1, 3), normals=normals.reshape(-1, 3),
+			texture_positions=texture_positions.reshape(-1, 2), indices=indices
+		)
+
+	def store(self, path, geometry):
+		"""
+			Write a geometry's arrays to a cache file. The file is written under a temporary
+			name and then renamed, so that other processes never see a partial file.
+		"""
+		if not os.path.isdir(self.directory):
+			try:
+				os.makedirs(self.directory)
+			except OSError:
+				# may have been created concurrently
+				if not os.path.isdir(self.directory):
+					raise
+
+		indices = geometry.indices
+		header = HEADER.pack(MAGIC, FORMAT_VERSION, geometry.vertex_count, len(indices), indices.itemsize)
+
+		fd, temp_path = tempfile.mkstemp(suffix='.tmp', dir=self.directory)
+		try:
+			with os.fdopen(fd, 'wb') as f:
+				f.write(header)
+				f.write(geometry.positions.tobytes())
+				f.write(geometry.normals.tobytes())
+				f.write(geometry.texture_positions.tobytes())
+				f.write(indices.tobytes())
+			os.rename(temp_path, path)
+		except:
+			os.remove(temp_path)
+			raise
+
+	def entries(self):
+		"""
+			Return a list of (mtime, size, path) for each file in the cache, least recently
+			used first
+		"""
+		entries = []
+		for name in os.listdir(self.directory):
+			if not name.endswith(EXTENSION):
+				continue
+			path = os.path.join(self.directory, name)
+			try:
+				stat = os.stat(path)
+			except OSError:
+				# removed concurrently
+				continue
+			entries.append((stat.st_mtime, stat.st_size, path))
+		entries.sort()
+		return entries
+
+	def evict(self):
+		"""
+			Delete the least recently used files until the cache fits within max_bytes
+		"""
+		entries = self.entries()
+		total = sum(size for mtime, size, path in entries)
+		for mtime, size, path in entries:
+			if total <= self.max_bytes:
+				break
+			try:
+				os.remove(path)
+			except OSError:
+				pass
+			total -= size
+
+	def clear(self):
+		if not os.path.isdir(self.directory):
+			return
+		for mtime, size, path in self.entries():
+			try:
+				os.remove(path)
+			except OSError:
+				pass
+
+
+_default_cache = None
+
+
+def get(cls, **kwargs):
+	"""
+		Return the geometry that cls(**kwargs) would build, through a GeometryCache in the
+		default directory
+	"""
+	global _default_cache
+	if _default_cache is None:
+		_default_cache = GeometryCache()
+	return _default_cache.get(cls, **kwargs)
@@ -0,0 +1,442 @@
+"""
+	Loaders for Wavefront OBJ and binary PLY model files, returning BaseGeometry. Files are
+	memory-mapped and parsed with numpy, straight into typed arrays: OBJ text a block of
+	lines at a time, and PLY data as views of the binary records.
+"""
+from shortcrust.geometry.base import BaseGeometry
+import os
+import numpy
+
+# OBJ files are parsed in blocks of about this many bytes, to bound the size of the
+# temporary arrays
+BLOCK_SIZE = 16 * 1024 * 1024
+
+# the vertex attributes given by each corner of an OBJ face, according to its format
+OBJ_FACE_FORMATS = {
+	'v': ('v',),
+	'v/vt': ('v', 'vt'),
+	'v//vn': ('v', 'vn'),
+	'v/vt/vn': ('v', 'vt', 'vn'),
+}
+
+# the number of PLY records first checked for the end of a run of records with the same
+# layout; the window doubles until the run's end is found
+PLY_RUN_WINDOW = 64
+
+PLY_TYPES = {
+	'char': 'i1', 'int8': 'i1',
+	'uchar': 'u1', 'uint8': 'u1',
+	'short': 'i2', 'int16': 'i2',
+	'ushort': 'u2', 'uint16': 'u2',
+	'int': 'i4', 'int32': 'i4',
+	'uint': 'u4', 'uint32': 'u4',
+	'float': 'f4', 'float32': 'f4',
+	'double': 'f8', 'float64': 'f8',
+}
+
+# the names used by various tools for PLY texture coordinates
+PLY_TEXTURE_PROPERTIES = [('u', 'v'), ('s', 't'), ('texture_u', 'texture_v'), ('texture_s', 'texture_t')]
+
+
+def load(path):
+	"""
+		Load a model file as a BaseGeometry, choosing the loader by the file extension
+		(.obj or .ply)
+	"""
+	extension = os.path.splitext(path)[1].lower()
+	if extension == '.obj':
+		return load_obj(path)
+	elif extension == '.ply':
+		return load_ply(path)
+	else:
+		raise ValueError("Unknown model file type: %s" % path)
+
+
+def _map_file(path):
+	if not os.path.getsize(path):
+		return numpy.zeros(0, dtype=numpy.uint8)
+	return numpy.memmap(path, dtype=numpy.uint8, mode='r')
+
+
+def vertex_normals(positions, indices):
+	"""
+		Compute smooth vertex normals for a triangle list, as the normalised sum of the
+		normals of the triangles using each vertex, weighted by their areas
+	"""
+	positions = numpy.asarray(positions, dtype=numpy.float64)
+	triangles = numpy.asarray(indices).reshape(-1, 3)
+	a = positions[triangles[:, 0]]
+	face_normals = numpy.cross(positions[triangles[:, 1]] - a, positions[triangles[:, 2]] - a)
+
+	corners = triangles.reshape(-1)
+	normals = numpy.empty((len(positions), 3))
+	for axis in range(3):
+		normals[:, axis] = numpy.bincount(
+			corners, weights=numpy.repeat(face_normals[:, axis], 3), minlength=len(positions)
+		)
+	lengths = numpy.sqrt((normals * normals).sum(axis=1))
+	lengths[lengths == 0] = 1.0
+	return (normals / lengths[:, numpy.newaxis]).astype(numpy.float32)
+
+
+def fan_triangulate(corner_counts):
+	"""
+		Triangulate polygons as fans around their first corner. corner_counts gives the
+		number of corners of each polygon, the corners being numbered consecutively through
+		all the polygons; returns an (N, 3) array of corner numbers.
+	"""
+	counts = numpy.asarray(corner_counts, dtype=numpy.int64)
+	if len(counts) and (counts == 3).all():
+		return numpy.arange(len(counts) * 3).reshape(-1, 3)
+
+	first_corners = numpy.cumsum(counts) - counts
+	triangle_counts = numpy.maximum(counts - 2, 0)
+	polygons = numpy.repeat(numpy.arange(len(counts)), triangle_counts)
+	# the number of each triangle within its polygon
+	numbers = numpy.arange(triangle_counts.sum()) - numpy.repeat(
+		numpy.cumsum(triangle_counts) - triangle_counts, triangle_counts
+	)
+	base = first_corners[polygons]
+	return numpy.column_stack([base, base + numbers + 1, base + numbers + 2])
+
+
+def _parse_numbers(blob, dtype):
+	"""
+		Parse the whitespace-separated numbers in blob, a uint8 array of newline-terminated
+		lines. Returns (values, counts), counts being the number of values on each line.
+	"""
+	values = numpy.fromstring(blob.tobytes(), dtype=dtype, sep=' ')
+
+	nonspace = blob > 32
+	token_starts = numpy.flatnonzero(nonspace[1:] & ~nonspace[:-1]) + 1
+	if len(nonspace) and nonspace[0]:
+		token_starts = numpy.concatenate(([0], token_starts))
+	tokens_before = numpy.searchsorted(token_starts, numpy.flatnonzero(blob == 10))
+	counts = numpy.diff(numpy.concatenate(([0], tokens_before)))
+
+	if len(values) != len(token_starts):
+		raise ValueError("Could not parse OBJ line: %r" % blob[token_starts[len(values)]:][:80].tobytes())
+	return values, counts
+
+
+def _columns(values, counts, width):
+	# the first width values of each line, padded with zeros for lines having fewer
+	if len(counts) and (counts == counts[0]).all() and counts[0] >= width:
+		return values.reshape(len(counts), -1)[:, :width]
+	columns = numpy.zeros((len(counts), width), dtype=values.dtype)
+	offsets = numpy.cumsum(counts) - counts
+	for i in range(width):
+		has_value = counts > i
+		columns[has_value, i] = values[offsets[has_value] + i]
+	return columns
+
+
+def _obj_blocks(data, block_size):
+	# split the file into blocks of whole lines, each returned as a writable copy ending in
+	# a newline
+	start = 0
+	while start < len(data):
+		end = min(start + block_size, len(data))
+		if end < len(data):
+			newlines = numpy.flatnonzero(data[start:end] == 10)
+			if len(newlines):
+				end = start + newlines[-1] + 1
+			else:
+				# a single line longer than the block size
+				newlines = numpy.flatnonzero(data[end:] == 10)
+				end = end + newlines[0] + 1 if len(newlines) else len(data)
+		block = numpy.array(data[start:end])
+		if block[-1] != 10:
+			block = numpy.concatenate((block, [10])).astype(numpy.uint8)
+		yield block
+		start = end
+
+
+def _unique_vertices(keys):
+	"""
+		Number the distinct rows of keys, an (N, k) array of non-negative integers, in order
+		of first occurrence. Returns (first, numbers): the first row with each number, and
+		the number of each row.
+	"""
+	# combine the columns pairwise, so that the combined keys cannot overflow
+	combined = keys[:, 0]
+	for column in range(1, keys.shape[1]):
+		combined = combined * (int(keys[:, column].max()) + 1) + keys[:, column]
+		if column < keys.shape[1] - 1:
+			combined = numpy.unique(combined, return_inverse=True)[1].astype(numpy.int64)
+	unique_keys, first, inverse = numpy.unique(combined, return_index=True, return_inverse=True)
+
+	order = numpy.argsort(first)
+	new_numbers = numpy.empty(len(unique_keys), dtype=numpy.int64)
+	new_numbers[order] = numpy.arange(len(unique_keys))
+	return first[order], new_numbers[inverse.reshape(-1)]
+
+
+def load_obj(path, block_size=BLOCK_SIZE):
+	"""
+		Load a Wavefront OBJ file as a BaseGeometry. All faces in the file are included
+		(groups, objects and materials are ignored), triangulated as fans; each distinct
+		combination of position, texture coordinate and normal used by a face corner becomes
+		a vertex. Normals are computed if the file has none, and texture positions are
+		zero if it has none.
+	"""
+	data = _map_file(path)
+
+	attributes = {'v': [], 'vt': [], 'vn': []}
+	counts = {'v': 0, 'vt': 0, 'vn': 0}
+	face_format = None
+	format_name = None
+	corners = []
+	corner_counts = []
+
+	for block in _obj_blocks(data, block_size):
+		newlines = numpy.flatnonzero(block == 10)
+		starts = numpy.concatenate(([0], newlines[:-1] + 1))
+		first = block[starts]
+		second = block[numpy.minimum(starts + 1, len(block) - 1)]
+		third = block[numpy.minimum(starts + 2, len(block) - 1)]
+
+		is_v = (first == ord('v')) & (second <= 32)
+		is_vt = (first == ord('v')) & (second == ord('t')) & (third <= 32)
+		is_vn = (first == ord('v')) & (second == ord('n')) & (third <= 32)
+		is_f = (first == ord('f')) & (second <= 32)
+
+		# blank out the keywords, and label each byte with the type of its line
+		block[starts[is_v | is_vt | is_vn | is_f]] = 32
+		block[starts[is_vt | is_vn] + 1] = 32
+		kinds = numpy.zeros(len(starts), dtype=numpy.uint8)
+		kinds[is_v] = 1
+		kinds[is_vt] = 2
+		kinds[is_vn] = 3
+		kinds[is_f] = 4
+		byte_kinds = numpy.repeat(kinds, newlines - starts + 1)
+
+		for kind, name, width in ((1, 'v', 3), (2, 'vt', 2), (3, 'vn', 3)):
+			if (kinds == kind).any():
+				values, line_counts = _parse_numbers(block[byte_kinds == kind], numpy.float64)
+				attributes[name].append(_columns(values, line_counts, width).astype(numpy.float32))
+
+		if is_f.any():
+			blob = block[byte_kinds == 4]
+			if face_format is None:
+				# the format of the first corner determines that of every face
+				nonspace = blob > 32
+				token_start = int(numpy.argmax(nonspace))
+				token_end = token_start + int(numpy.argmax(~nonspace[token_start:]))
+				token = blob[token_start:token_end].tobytes()
+				if b'//' in token:
+					format_name = 'v//vn'
+				else:
+					format_name = ['v', 'v/vt', 'v/vt/vn'][min(token.count(b'/'), 2)]
+				face_format = OBJ_FACE_FORMATS[format_name]
+			# every corner must have the same number of values and of slashes as the first,
+			# so count the slashes on each line before blanking them out
+			slashes = blob == ord('/')
+			line_slashes = numpy.diff(numpy.concatenate((
+				[0], numpy.searchsorted(numpy.flatnonzero(slashes), numpy.flatnonzero(blob == 10))
+			)))
+			blob[slashes] = 32
+			values, line_counts = _parse_numbers(blob, numpy.int64)
+			polygon_sizes = line_counts // len(face_format)
+			if (line_counts % len(face_format)).any() or (line_slashes != polygon_sizes * format_name.count('/')).any():
+				raise ValueError("OBJ faces must all be in the same format (%s)" % format_name)
+			values = values.reshape(-1, len(face_format))
+
+			# indices count from 1, or from -1 backwards from the latest element
+			face_lines = numpy.flatnonzero(is_f)
+			for column, name in enumerate(face_format):
+				indices = values[:, column]
+				negative = indices < 0
+				if negative.any():
+					line_type = {'v': is_v, 'vt': is_vt, 'vn': is_vn}[name]
+					defined = counts[name] + numpy.searchsorted(numpy.flatnonzero(line_type), face_lines)
+					indices[negative] += numpy.repeat(defined, polygon_sizes)[negative] + 1
+			corners.append(values - 1)
+			corner_counts.append(polygon_sizes)
+
+		for name, line_type in (('v', is_v), ('vt', is_vt), ('vn', is_vn)):
+			counts[name] += int(line_type.sum())
+
+	positions = numpy.concatenate(attributes['v']) if attributes['v'] else numpy.zeros((0, 3), numpy.float32)
+	if not corners:
+		return BaseGeometry(positions=positions, normals=numpy.zeros_like(positions),
+			texture_positions=numpy.zeros((len(positions), 2), numpy.float32))
+
+	corners = numpy.concatenate(corners)
+	for column, name in enumerate(face_format):
+		if len(corners) and (corners[:, column].min() < 0 or corners[:, column].max() >= counts[name]):
+			raise ValueError("OBJ face refers to a missing %s element" % name)
+
+	triangles = fan_triangulate(numpy.concatenate(corner_counts))
+	position_indices = corners[:, 0][triangles.reshape(-1)]
+
+	if len(face_format) == 1:
+		# one vertex per position
+		normals = vertex_normals(positions, position_indices)
+		return BaseGeometry(positions=positions, normals=normals,
+			texture_positions=numpy.zeros((len(positions), 2), numpy.float32), indices=position_indices)
+
+	first, numbers = _unique_vertices(corners)
+	vertex_corners = corners[first]
+	indices = numbers[triangles.reshape(-1)]
+
+	if 'vn' in face_format:
+		normals = numpy.concatenate(attributes['vn'])[vertex_corners[:, face_format.index('vn')]]
+	else:
+		# compute normals per position, so that they are smooth across texture seams
+		normals = vertex_normals(positions, position_indices)[vertex_corners[:, 0]]
+	if 'vt' in face_format:
+		texture_positions = numpy.concatenate(attributes['vt'])[vertex_corners[:, 1]]
+	else:
+		texture_positions = numpy.zeros((len(first), 2), numpy.float32)
+
+	return BaseGeometry(positions=positions[vertex_corners[:, 0]], normals=normals,
+		texture_positions=texture_positions, indices=indices)
+
+
+def _read_ply_header(data):
+	end = data[:65536].tobytes().find(b'end_header')
+	if not data[:3].tobytes() == b'ply' or end < 0:
+		raise ValueError("Not a PLY file")
+	header_end = end + data[end:end + 64].tobytes().index(b'\n') + 1
+	lines = data[:end].tobytes().decode('ascii').splitlines()
+
+	byte_order = None
+	elements = []
+	for line in lines[1:]:
+		words = line.split()
+		if not words:
+			continue
+		if words[0] == 'format':
+			if words[1] == 'binary_little_endian':
+				byte_order = '<'
+			elif words[1] == 'binary_big_endian':
+				byte_order = '>'
+			else:
+				raise ValueError("Only binary PLY files are supported, not %s" % words[1])
+		elif words[0] == 'element':
+			elements.append((words[1], int(words[2]), []))
+		elif words[0] == 'property':
+			if words[1] == 'list':
+				# (name, value type, count type)
+				elements[-1][2].append((words[4], PLY_TYPES[words[3]], PLY_TYPES[words[2]]))
+			else:
+				elements[-1][2].append((words[2], PLY_TYPES[words[1]], None))
+
+	if byte_order is None:
+		raise ValueError("PLY header has no format line")
+	return byte_order, elements, header_end
+
+
+def _read_ply_element(data, offset, count, properties, byte_order):
+	"""
+		Read count records of an element starting at byte offset. Records containing lists
+		vary in size, so they are read in runs of records whose lists have the same lengths
+		as the first in the run, each run a structured array view of the data (a list
+		property being a field of shape (length,)). Returns (runs, end offset).
+	"""
+	runs = []
+	while count:
+		# find the list lengths of the first record, and so the layout of the run
+		fields = []
+		lengths = []
+		position = offset
+		for name, value_type, count_type in properties:
+			value_type = numpy.dtype(byte_order + value_type)
+			if count_type:
+				count_type = numpy.dtype(byte_order + count_type)
+				length = int(data[position:position + count_type.itemsize].view(count_type)[0])
+				fields.append((name + '_length', count_type))
+				fields.append((name, value_type, (length,)))
+				lengths.append((name + '_length', length))
+				position += count_type.itemsize + length * value_type.itemsize
+			else:
+				fields.append((name, value_type))
+				position += value_type.itemsize
+		record_type = numpy.dtype(fields)
+
+		available = min(count, (len(data) - offset) // record_type.itemsize)
+		if not available:
+			raise ValueError("PLY file is truncated")
+		records = data[offset:offset + available * record_type.itemsize].view(record_type)
+
+		# the run ends at the first record whose lists differ in length. It is looked for in
+		# a doubling window, so that a short run costs little however many records follow
+		run_length = None
+		scanned = 0
+		window = min(available, PLY_RUN_WINDOW)
+		while run_length is None:
+			for name, length in lengths:
+				mismatched = numpy.flatnonzero(records[name][scanned:window] != length)
+				if len(mismatched):
+					run_length = min(run_length or window, scanned + int(mismatched[0]))
+			if run_length is None:
+				if window == available:
+					run_length = available
+				scanned = window
+				window = min(available, window * 2)
+
+		runs.append(records[:run_length])
+		offset += run_length * record_type.itemsize
+		count -= run_length
+	return runs, offset
+
+
+def load_ply(path):
+	"""
+		Load a binary PLY file as a BaseGeometry, from its vertex element (with x, y, z and
+		optionally nx, ny, nz and texture coordinates as u, v or s, t) and face element
+		(with a vertex_indices or vertex_index list), triangulating faces as fans. Normals
+		are computed if the file has none, and texture positions are zero if it has none.
+		Faces are read fastest when consecutive faces have the same number of corners.
+	"""
+	# slices of a plain ndarray view are cheaper than those of the memmap, which counts
+	# when faces are read in many short runs
+	data = _map_file(path).view(numpy.ndarray)
+	byte_order, elements, offset = _read_ply_header(data)
+
+	vertices = None
+	faces_read = False
+	triangles = []
+	# the corners of each polygon making up its fan of triangles, by number of sides
+	fans = {}
+	for name, count, properties in elements:
+		if vertices is not None and faces_read:
+			# nothing else is needed
+			break
+		runs, offset = _read_ply_element(data, offset, count, properties, byte_order)
+		if name == 'vertex':
+			vertices = runs[0] if runs else numpy.zeros(0, numpy.dtype([(p[0], p[1]) for p in properties]))
+		elif name == 'face':
+			faces_read = True
+			for run in runs:
+				list_name = 'vertex_indices' if 'vertex_indices' in run.dtype.names else 'vertex_index'
+				polygons = run[list_name]
+				sides = polygons.shape[1]
+				if sides < 3:
+					continue
+				if sides not in fans:
+					fan = numpy.arange(1, sides - 1)
+					fans[sides] = numpy.column_stack([numpy.zeros_like(fan), fan, fan + 1]).reshape(-1)
+				triangles.append(polygons[:, fans[sides]].astype(numpy.int64).reshape(-1))
+
+	if vertices is None:
+		raise ValueError("PLY file has no vertex element")
+	names = vertices.dtype.names
+	positions = numpy.column_stack([vertices['x'], vertices['y'], vertices['z']]).astype(numpy.float32)
+	indices = numpy.concatenate(triangles) if triangles else numpy.zeros(0, numpy.int64)
+	if len(indices) and (indices.min() < 0 or indices.max() >= len(positions)):
+		raise ValueError("PLY face refers to a missing vertex")
+
+	if 'nx' in names:
+		normals = numpy.column_stack([vertices['nx'], vertices['ny'], vertices['nz']]).astype(numpy.float32)
+	else:
+		normals = vertex_normals(positions, indices)
+
+	texture_positions = numpy.zeros((len(positions), 2), numpy.float32)
+	for u, v in PLY_TEXTURE_PROPERTIES:
+		if u in names and v in names:
+			texture_positions = numpy.column_stack([vertices[u], vertices[v]]).astype(numpy.float32)
+			break
+
+	return BaseGeometry(positions=positions, normals=normals, texture_positions=texture_positions, indices=indices)
@@ -0,0 +1,126 @@
+import math
+
+
+class LODMesh(object):
+	"""
+		A chain of meshes of the same object at decreasing levels of detail, of which one
+		is drawn according to the object's size on screen. It can be used anywhere a Mesh
+		is: positions, normals, texture_positions, attach() and draw() refer to the current
+		level.
+		Call select(p_matrix, mv_matrix, viewport_height) each frame, before the shader
+		attaches the buffers, to choose the level.
+
+		thresholds[i] is the projected radius, in pixels, of the object's bounding sphere
+		at or above which level i is wanted (the last is 0). By default these are set so
+		that triangle edges come out roughly pixels_per_edge pixels long, assuming the
+		triangles are spread evenly over the surface. A level change only happens once the
+		radius passes a threshold by the fraction given by hysteresis, so that an object
+		hovering around a threshold does not flicker between levels.
+	"""
+	def __init__(self, meshes, thresholds=None, hysteresis=0.1, pixels_per_edge=10.0):
+		self.meshes = list(meshes)
+		if thresholds is None:
+			thresholds = [self._max_radius(mesh, pixels_per_edge) for mesh in self.meshes[1:]] + [0.0]
+		self.thresholds = thresholds
+		self.hysteresis = hysteresis
+		self.level = 0
+		self.pixel_radius = None
+
+		self.bounds = self.meshes[0].bounds
+		self.material_color = self.meshes[0].material_color
+		self.texture = self.meshes[0].texture
+
+	@classmethod
+	def from_geometry(cls, geometry, levels=4, ratio=0.5, thresholds=None, hysteresis=0.1, pixels_per_edge=10.0, **kwargs):
+		"""
+			Build an LODMesh from geometry.lod_chain(levels, ratio); other keyword arguments
+			are passed to each level's Mesh
+		"""
+		meshes = [g.to_mesh(**kwargs) for g in geometry.lod_chain(levels, ratio)]
+		return cls(meshes, thresholds=thresholds, hysteresis=hysteresis, pixels_per_edge=pixels_per_edge)
+
+	@staticmethod
+	def _max_radius(mesh, pixels_per_edge):
+		# The largest projected radius at which the mesh's edges are within pixels_per_edge:
+		# a sphere of radius R pixels split into T triangles has an area of 4 pi R^2, and
+		# each (roughly equilateral) triangle an area of about 0.433 * edge^2
+		triangle_count = max(mesh.index_count // 3, 1)
+		return pixels_per_edge * math.sqrt(0.433 * triangle_count / (4 * math.pi))
+
+	@property
+	def mesh(self):
+		return self.meshes[self.level]
+
+	@property
+	def positions(self):
+		return self.meshes[self.level].positions
+
+	@property
+	def normals(self):
+		return self.meshes[self.level].normals
+
+	@property
+	def texture_positions(self):
+		return self.meshes[self.level].texture_positions
+
+	@property
+	def index_count(self):
+		return self.meshes[self.level].index_count
+
+	def attach(self, position_location, normal_location=None, texture_position_location=None):
+		self.meshes[self.level].attach(position_location, normal_location, texture_position_location)
+
+	def projected_radius(self, p_matrix, mv_matrix, viewport_height):
+		"""
+			Return the radius of the bounding sphere on screen, in pixels, given the
+			projection and model-view matrices and the height of the viewport
+		"""
+		center = self.bounds.center
+		m = mv_matrix
+		x = m[0] * center[0] + m[4] * center[1] + m[8] * center[2] + m[12]
+		y = m[1] * center[0] + m[5] * center[1] + m[9] * center[2] + m[13]
+		z = m[2] * center[0] + m[6] * center[1] + m[10] * center[2] + m[14]
+
+		# the bounding sphere radius, scaled by the largest scale factor of the model-view matrix
+		scale = math.sqrt(max(
+			m[0] * m[0] + m[1] * m[1] + m[2] * m[2],
+			m[4] * m[4] + m[5] * m[5] + m[6] * m[6],
+			m[8] * m[8] + m[9] * m[9] + m[10] * m[10],
+		))
+
+		p = p_matrix
+		w = p[3] * x + p[7] * y + p[11] * z + p[15]
+		if w <= 0:
+			# the centre is behind the camera (or at the eye)
+			return float('inf')
+		return self.bounds.radius * scale * p[5] * viewport_height * 0.5 / w
+
+	def select(self, p_matrix, mv_matrix, viewport_height):
+		"""
+			Choose the level of detail to draw, from the projection and model-view matrices
+			and the viewport height in pixels. Returns the level number.
+		"""
+		radius = self.projected_radius(p_matrix, mv_matrix, viewport_height)
+		self.pixel_radius = radius
+		return self.select_radius(radius)
+
+	def select_radius(self, radius):
+		"""
+			Choose the level of detail to draw, given the projected radius in pixels
+		"""
+		thresholds = self.thresholds
+		level = self.level
+		# move to finer levels once the radius is comfortably above their threshold...
+		while level > 0 and radius >= thresholds[level - 1] * (1 + self.hysteresis):
+			level -= 1
+		# ...and to coarser levels once it is comfortably below the current one's
+		while level < len(self.meshes) - 1 and radius < thresholds[level] * (1 - self.hysteresis):
+			level += 1
+		self.level = level
+		return level
+
+	def draw(self, frustum=None):
+		# If a frustum is passed, skip drawing when the mesh lies wholly outside it
+		if frustum and not frustum.is_visible(self):
+			return
+		self.meshes[self.level].draw()
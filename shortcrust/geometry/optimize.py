@@ -0,0 +1,239 @@
+"""
+	Index optimisations for the GPU's post-transform vertex cache, which lets a vertex
+	referenced again shortly after its first use skip the vertex shader. See Tom Forsyth,
+	"Linear-Speed Vertex Cache Optimisation" (2006).
+"""
+from collections import deque
+import numpy
+
+# scoring parameters from Forsyth's paper
+CACHE_DECAY_POWER = 1.5
+LAST_TRIANGLE_SCORE = 0.75
+VALENCE_BOOST_SCALE = 2.0
+VALENCE_BOOST_POWER = 0.5
+
+
+def acmr(indices, cache_size=16, strip=False):
+	"""
+		Average cache miss ratio: the number of vertex shader invocations per triangle when
+		drawing the given indices through a FIFO vertex cache of cache_size entries. This
+		ranges from 3.0 (no reuse at all) down to about 0.5 for a large regular grid.
+		With strip=True, indices are a GL_TRIANGLE_STRIP, and degenerate triangles are not
+		counted.
+	"""
+	indices = numpy.asarray(indices).reshape(-1).tolist()
+	if strip:
+		triangle_count = sum(
+			1 for a, b, c in zip(indices, indices[1:], indices[2:])
+			if a != b and b != c and a != c
+		)
+	else:
+		triangle_count = len(indices) // 3
+	if not triangle_count:
+		return 0.0
+
+	cache = deque()
+	cached = set()
+	misses = 0
+	for index in indices:
+		if index not in cached:
+			misses += 1
+			cache.append(index)
+			cached.add(index)
+			if len(cache) > cache_size:
+				cached.discard(cache.popleft())
+	return float(misses) / triangle_count
+
+
+def optimize_vertex_cache(indices, vertex_count=None, cache_size=32):
+	"""
+		Reorder a triangle list for the post-transform vertex cache, using Forsyth's
+		algorithm: repeatedly emit the triangle whose vertices score highest, where vertices
+		score for being recently used (in a simulated LRU cache of cache_size entries) and
+		for having few remaining triangles (so that none are left stranded). Returns the
+		reordered indices, with the same dtype as the input.
+	"""
+	indices = numpy.asarray(indices)
+	triangles = indices.reshape(-1, 3)
+	triangle_count = len(triangles)
+	if not triangle_count:
+		return indices.reshape(-1).copy()
+	if vertex_count is None:
+		vertex_count = int(triangles.max()) + 1
+
+	# the triangles using each vertex
+	flat = triangles.reshape(-1)
+	valence = numpy.bincount(flat, minlength=vertex_count)
+	triangles_by_vertex = (numpy.argsort(flat, kind='mergesort') // 3).tolist()
+	ends = numpy.cumsum(valence).tolist()
+	vertex_triangles = [
+		triangles_by_vertex[end - count:end] for end, count in zip(ends, valence.tolist())
+	]
+	triangle_list = triangles.tolist()
+
+	# lookup tables of score for each cache position (with -1, the last entry, meaning
+	# not cached) and for each number of remaining triangles
+	position_scores = [LAST_TRIANGLE_SCORE] * 3 + [
+		(1.0 - float(i - 3) / (cache_size - 3)) ** CACHE_DECAY_POWER
+		for i in range(3, cache_size)
+	] + [0.0]
+	valence_scores = [0.0] + [
+		VALENCE_BOOST_SCALE * n ** -VALENCE_BOOST_POWER
+		for n in range(1, int(valence.max()) + 1)
+	]
+
+	remaining = valence.tolist()
+	vertex_score = [valence_scores[n] for n in remaining]
+	emitted = [False] * triangle_count
+
+	scores = numpy.array(vertex_score)[triangles].sum(axis=1)
+	best = int(scores.argmax())
+	next_in_order = 0
+	cache = []
+	output = []
+
+	while True:
+		if best < 0:
+			# nothing left touching the cache - continue from the next triangle in input order
+			while next_in_order < triangle_count and emitted[next_in_order]:
+				next_in_order += 1
+			if next_in_order == triangle_count:
+				break
+			best = next_in_order
+
+		emitted[best] = True
+		output.append(best)
+		triangle = triangle_list[best]
+		for v in triangle:
+			if best in vertex_triangles[v]:
+				remaining[v] -= 1
+				vertex_triangles[v].remove(best)
+
+		# move the triangle's vertices to the front of the cache
+		new_cache = []
+		for v in triangle:
+			if v not in new_cache:
+				new_cache.append(v)
+		new_cache += [v for v in cache if v not in triangle]
+		for position, v in enumerate(new_cache):
+			if position >= cache_size:
+				position = -1
+			vertex_score[v] = -1.0 if not remaining[v] else (
+				position_scores[position] + valence_scores[remaining[v]]
+			)
+		cache = new_cache[:cache_size]
+
+		# choose the best triangle using a vertex still in the cache
+		best = -1
+		best_score = -1.0
+		for v in cache:
+			for t in vertex_triangles[v]:
+				a, b, c = triangle_list[t]
+				score = vertex_score[a] + vertex_score[b] + vertex_score[c]
+				if score > best_score:
+					best = t
+					best_score = score
+
+	return triangles[output].reshape(-1)
+
+
+def optimize_vertex_fetch(indices, vertex_count=None):
+	"""
+		Renumber vertices in the order they are first used by the indices, so that vertex
+		data is fetched from memory sequentially. Returns (remap, new_indices), where
+		remap[i] is the original number of new vertex i: vertex arrays are reordered as
+		positions[remap]. Vertices not used by any triangle are dropped.
+	"""
+	indices = numpy.asarray(indices).reshape(-1)
+	if vertex_count is None:
+		vertex_count = int(indices.max()) + 1 if len(indices) else 0
+
+	used, first_use = numpy.unique(indices, return_index=True)
+	remap = used[numpy.argsort(first_use)]
+	new_numbers = numpy.zeros(vertex_count, dtype=indices.dtype)
+	new_numbers[remap] = numpy.arange(len(remap), dtype=indices.dtype)
+	return remap, new_numbers[indices]
+
+
+def stripify(indices):
+	"""
+		Convert a triangle list into a single GL_TRIANGLE_STRIP, preserving winding.
+		Strips are grown greedily across shared edges, starting from each unused triangle in
+		turn (so the input order, e.g. from optimize_vertex_cache, is largely kept), and
+		joined by repeating vertices to form degenerate triangles, which GL discards.
+		Degenerate triangles in the input are dropped.
+	"""
+	indices = numpy.asarray(indices)
+	triangle_list = [
+		t for t in indices.reshape(-1, 3).tolist()
+		if t[0] != t[1] and t[1] != t[2] and t[0] != t[2]
+	]
+
+	# directed edge (a, b) -> triangles (a, b, c) as (triangle number, c)
+	edges = {}
+	for number, (a, b, c) in enumerate(triangle_list):
+		edges.setdefault((a, b), []).append((number, c))
+		edges.setdefault((b, c), []).append((number, a))
+		edges.setdefault((c, a), []).append((number, b))
+
+	used = [False] * len(triangle_list)
+
+	def extend(strip, number):
+		# triangle n of a strip is (s[n], s[n+1], s[n+2]) for even n, and (s[n+1], s[n], s[n+2])
+		# for odd n, so the next triangle shares the strip's last edge, in the orientation
+		# given by its parity
+		taken = [number]
+		taken_set = set(taken)
+		while True:
+			if (len(strip) - 2) % 2:
+				edge = (strip[-1], strip[-2])
+			else:
+				edge = (strip[-2], strip[-1])
+			for number, vertex in edges.get(edge, ()):
+				if not used[number] and number not in taken_set:
+					taken.append(number)
+					taken_set.add(number)
+					strip.append(vertex)
+					break
+			else:
+				return strip, taken
+
+	output = []
+	for start, (a, b, c) in enumerate(triangle_list):
+		if used[start]:
+			continue
+
+		# try each rotation of the starting triangle, and keep the longest strip
+		best_strip, best_taken = None, None
+		for rotation in ([a, b, c], [b, c, a], [c, a, b]):
+			strip, taken = extend(rotation, start)
+			if best_strip is None or len(taken) > len(best_taken):
+				best_strip, best_taken = strip, taken
+		for number in best_taken:
+			used[number] = True
+
+		if output:
+			# join with a degenerate triangle, padding so that the new strip starts on an
+			# even-numbered triangle and keeps its winding
+			output.append(output[-1])
+			output.append(best_strip[0])
+			if len(output) % 2:
+				output.append(best_strip[0])
+		output.extend(best_strip)
+
+	return numpy.array(output, dtype=indices.dtype)
+
+
+def optimize(geometry, cache_size=32):
+	"""
+		Return a copy of the geometry with its triangles reordered for the vertex cache
+		and its vertices reordered for fetch locality
+	"""
+	from shortcrust.geometry.base import BaseGeometry
+
+	indices = optimize_vertex_cache(geometry.indices, geometry.vertex_count, cache_size)
+	remap, indices = optimize_vertex_fetch(indices, geometry.vertex_count)
+	return BaseGeometry(
+		positions=geometry.positions[remap], normals=geometry.normals[remap],
+		texture_positions=geometry.texture_positions[remap], indices=indices
+	)
@@ -0,0 +1,170 @@
+from shortcrust.geometry.base import BaseGeometry, index_dtype
+import copy
+import numpy
+
+
+class ParametricSurface(BaseGeometry):
+	"""
+		Base class for surfaces defined by a function mapping two parameters (u, v) to a
+		position and normal. Subclasses implement evaluate(u, v), which is called once with
+		the parameter values of the whole grid, as numpy arrays of shape (1, columns) for u
+		and (rows, 1) for v; it returns a pair (positions, normals), each a sequence of x, y
+		and z components that broadcast to the (rows, columns) shape of the grid.
+
+		u runs from u_range[0] to u_range[1] in u_divisions steps, and likewise for v.
+		Texture coordinates run from 0 to 1 across each.
+
+		If wrap_u is true, the surface is closed in the u direction (like a cylinder): the
+		last column of quads joins back to the first, so no vertices are duplicated at the
+		seam and the u_range[1] column is never evaluated. Otherwise the seam (if any) has a
+		separate column of vertices at each side, so that texture coordinates can run all the
+		way from 0 to 1. wrap_v does the same for v.
+
+		cap_start / cap_end close off the v_range[0] / v_range[1] edge of an open surface with
+		a flat fan of triangles.
+	"""
+	u_range = (0.0, 1.0)
+	v_range = (0.0, 1.0)
+	wrap_u = False
+	wrap_v = False
+
+	def __init__(self, u_divisions=20, v_divisions=20, cap_start=False, cap_end=False):
+		self.u_divisions = u_divisions
+		self.v_divisions = v_divisions
+		self.cap_start = cap_start
+		self.cap_end = cap_end
+
+		columns = u_divisions if self.wrap_u else u_divisions + 1
+		rows = v_divisions if self.wrap_v else v_divisions + 1
+		x = numpy.arange(columns)
+		y = numpy.arange(rows)
+
+		u_start, u_end = self.u_range
+		v_start, v_end = self.v_range
+		u_step = float(u_end - u_start) / u_divisions
+		v_step = float(v_end - v_start) / v_divisions
+		u = (u_start + x * u_step)[numpy.newaxis, :]
+		v = (v_start + y * v_step)[:, numpy.newaxis]
+
+		grid_positions, grid_normals = self.evaluate(u, v)
+
+		vertex_count = rows * columns
+		positions = numpy.empty((rows, columns, 3), dtype=numpy.float32)
+		normals = numpy.empty((rows, columns, 3), dtype=numpy.float32)
+		for axis in range(3):
+			positions[:, :, axis] = grid_positions[axis]
+			normals[:, :, axis] = grid_normals[axis]
+
+		texture_positions = numpy.empty((rows, columns, 2), dtype=numpy.float32)
+		texture_positions[:, :, 0] = x.astype(numpy.float64)[numpy.newaxis, :] / u_divisions
+		texture_positions[:, :, 1] = y.astype(numpy.float64)[:, numpy.newaxis] / v_divisions
+
+		# two triangles for each quad of the grid
+		x0 = x[numpy.newaxis, :u_divisions]
+		x1 = (x0 + 1) % columns
+		y0 = y[:v_divisions, numpy.newaxis] * columns
+		y1 = ((y[:v_divisions, numpy.newaxis] + 1) % rows) * columns
+
+		indices = numpy.empty((v_divisions, u_divisions, 6), dtype=numpy.int64)
+		indices[:, :, 0] = y0 + x0
+		indices[:, :, 1] = y0 + x1
+		indices[:, :, 2] = y1 + x0
+		indices[:, :, 3] = y0 + x1
+		indices[:, :, 4] = y1 + x1
+		indices[:, :, 5] = y1 + x0
+
+		self.positions = positions.reshape(vertex_count, 3)
+		self.normals = normals.reshape(vertex_count, 3)
+		self.texture_positions = texture_positions.reshape(vertex_count, 2)
+		indices = indices.reshape(-1)
+
+		if not self.wrap_v:
+			caps = []
+			if cap_start:
+				caps.append(self._cap(positions[0], positions[1]))
+			if cap_end:
+				caps.append(self._cap(positions[-1], positions[-2]))
+
+			for cap_positions, cap_normals, cap_texture_positions, cap_indices in caps:
+				cap_indices = cap_indices + len(self.positions)
+				self.positions = numpy.concatenate([self.positions, cap_positions])
+				self.normals = numpy.concatenate([self.normals, cap_normals])
+				self.texture_positions = numpy.concatenate([self.texture_positions, cap_texture_positions])
+				indices = numpy.concatenate([indices, cap_indices])
+
+		self.indices = indices.astype(index_dtype(len(self.positions)))
+
+	def evaluate(self, u, v):
+		raise NotImplementedError
+
+	def lod_chain(self, levels=4, ratio=0.5):
+		"""
+			Return a list of geometries at decreasing levels of detail, starting with this
+			one, by regenerating the surface with the divisions in each direction scaled by
+			ratio at each level
+		"""
+		chain = [self]
+		for level in range(1, levels):
+			scale = ratio ** level
+			geometry = copy.copy(self)
+			ParametricSurface.__init__(geometry,
+				u_divisions=max(int(round(self.u_divisions * scale)), min(self.u_divisions, 3)),
+				v_divisions=max(int(round(self.v_divisions * scale)), min(self.v_divisions, 2)),
+				cap_start=self.cap_start, cap_end=self.cap_end)
+			chain.append(geometry)
+		return chain
+
+	def _cap(self, ring, neighbour_ring):
+		"""
+			Build a flat fan of triangles closing off the given ring of vertices; its normal
+			faces away from neighbour_ring (the adjacent ring of the surface). Returns
+			positions, normals, texture positions and (local) indices for the cap, with the
+			centre vertex last.
+		"""
+		ring = ring.astype(numpy.float64)
+		center = ring.mean(axis=0)
+
+		# Newell's method gives a robust normal for a (possibly non-planar) polygon
+		following = numpy.roll(ring, -1, axis=0)
+		normal = numpy.cross(ring, following).sum(axis=0)
+		length = numpy.sqrt((normal * normal).sum())
+		if not length:
+			# degenerate ring (e.g. a pole, where all points coincide) - nothing to cap
+			empty = numpy.empty((0, 3), dtype=numpy.float32)
+			return empty, empty, numpy.empty((0, 2), dtype=numpy.float32), numpy.empty(0, dtype=numpy.int64)
+		normal /= length
+		if numpy.dot(normal, center - neighbour_ring.mean(axis=0)) < 0:
+			normal = -normal
+
+		# planar texture mapping, scaled to fit the cap within the unit square
+		tangent = ring[0] - center
+		tangent -= normal * numpy.dot(tangent, normal)
+		tangent /= numpy.sqrt((tangent * tangent).sum())
+		bitangent = numpy.cross(normal, tangent)
+		offsets = ring - center
+		s = numpy.dot(offsets, tangent)
+		t = numpy.dot(offsets, bitangent)
+		extent = max(numpy.abs(s).max(), numpy.abs(t).max()) or 1.0
+
+		count = len(ring)
+		positions = numpy.concatenate([ring, center[numpy.newaxis, :]]).astype(numpy.float32)
+		normals = numpy.tile(normal, (count + 1, 1)).astype(numpy.float32)
+		texture_positions = numpy.empty((count + 1, 2), dtype=numpy.float32)
+		texture_positions[:count, 0] = 0.5 + 0.5 * s / extent
+		texture_positions[:count, 1] = 0.5 + 0.5 * t / extent
+		texture_positions[count] = 0.5
+
+		# fan of triangles from the centre to each edge of the ring
+		i0 = numpy.arange(count if self.wrap_u else count - 1)
+		i1 = (i0 + 1) % count
+		indices = numpy.empty((len(i0), 3), dtype=numpy.int64)
+		indices[:, 0] = count
+		indices[:, 1] = i0
+		indices[:, 2] = i1
+
+		# ensure anticlockwise winding when viewed from the side the normal faces
+		winding = numpy.cross(ring[i0] - center, ring[i1] - center).sum(axis=0)
+		if numpy.dot(winding, normal) < 0:
+			indices = indices[:, [0, 2, 1]]
+
+		return positions, normals, texture_positions, indices.reshape(-1)
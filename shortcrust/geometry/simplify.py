@@ -0,0 +1,300 @@
+from shortcrust.geometry.base import BaseGeometry
+from shortcrust.geometry.weld import weld
+import numpy
+import warnings
+
+# weight of the planes that keep open boundaries in place, relative to surface planes
+BOUNDARY_WEIGHT = 100.0
+
+# a collapse is rejected if it would leave any triangle's normal turned by more than
+# about 78 degrees (the cosine of which is this) from that of the original triangle it
+# was simplified from
+MIN_NORMAL_DOT = 0.2
+
+# the fraction of edges, cheapest first, considered for collapse in each pass
+CANDIDATE_FRACTION = 0.25
+
+# give up after this many consecutive passes without a collapse
+MAX_STALLED_PASSES = 5
+
+_NOT_CANDIDATE = numpy.iinfo(numpy.int64).max
+
+
+def _plane_quadrics(normals, d, weights):
+	"""
+		Return the quadrics measuring weighted squared distance from planes n.p + d = 0, as
+		a (10, N) array of the distinct coefficients of each symmetric 4x4 matrix
+	"""
+	a, b, c = normals[:, 0], normals[:, 1], normals[:, 2]
+	return numpy.array([
+		a * a, a * b, a * c, a * d, b * b, b * c, b * d, c * c, c * d, d * d
+	]) * weights
+
+
+def _sum_by_vertex(quadrics, vertices, vertex_count):
+	return numpy.array([
+		numpy.bincount(vertices, quadrics[k], minlength=vertex_count) for k in range(10)
+	])
+
+
+def _quadric_error(q, p):
+	x, y, z = p[:, 0], p[:, 1], p[:, 2]
+	return (
+		x * (q[0] * x + 2 * (q[1] * y + q[2] * z + q[3]))
+		+ y * (q[4] * y + 2 * (q[5] * z + q[6]))
+		+ z * (q[7] * z + 2 * q[8])
+		+ q[9]
+	)
+
+
+def _face_normals(p0, p1, p2):
+	"""
+		Return unnormalised normals of the triangles with the given corners, and their lengths
+	"""
+	normals = numpy.cross(p1 - p0, p2 - p0)
+	return normals, numpy.sqrt((normals * normals).sum(axis=1))
+
+
+def _reject_turns(keep, a, b, targets, collapse_of, affected, corners, reference_normals):
+	"""
+		Clear keep for the collapses (merging b into a, at targets) that would flip or
+		sharply turn one of the affected triangles from its reference normal, of unit
+		length or zero if there is none. A triangle may have corners moved by different
+		collapses, so this is repeated until no more are rejected, as each rejection
+		changes the outcome for its neighbours.
+	"""
+	reference_lengths = numpy.sqrt((reference_normals * reference_normals).sum(axis=1))
+	while keep.any():
+		collapse_of[a[~keep]] = -1
+		collapse_of[b[~keep]] = -1
+		triangle_collapses = collapse_of[affected]
+		moved = triangle_collapses >= 0
+		# triangles containing both ends of an edge disappear, so needn't be checked
+		surviving = ~(
+			(moved[:, 0] & (triangle_collapses[:, 0] == triangle_collapses[:, 1]))
+			| (moved[:, 1] & (triangle_collapses[:, 1] == triangle_collapses[:, 2]))
+			| (moved[:, 2] & (triangle_collapses[:, 2] == triangle_collapses[:, 0]))
+		)
+		new_corners = corners.copy()
+		new_corners[moved] = targets[triangle_collapses[moved]]
+		new_normals, new_lengths = _face_normals(new_corners[:, 0], new_corners[:, 1], new_corners[:, 2])
+		bad = surviving & moved.any(axis=1) & (
+			((reference_normals * new_normals).sum(axis=1) < MIN_NORMAL_DOT * reference_lengths * new_lengths)
+			| (new_lengths <= 0)
+		)
+		rejected = triangle_collapses[bad]
+		rejected = rejected[rejected >= 0]
+		if not len(rejected):
+			break
+		keep[rejected] = False
+	return keep
+
+
+def simplify(geometry, target_triangle_count, max_passes=200):
+	"""
+		Simplify a geometry to about target_triangle_count triangles by quadric error edge
+		collapse (Garland & Heckbert, "Surface Simplification Using Quadric Error Metrics",
+		1997). Each vertex carries a quadric measuring squared distance from the planes of
+		its original triangles, and edges are collapsed in order of the error this would
+		introduce, with the merged vertex placed at whichever of the edge's ends or
+		midpoint has the least error. Normals and texture coordinates are interpolated to
+		the same point.
+
+		Rather than collapsing one edge at a time, each pass collapses every edge that is
+		cheaper than all others touching the triangles around it, so that the work is
+		done in a few dozen vectorised passes.
+
+		The geometry is welded first (see shortcrust.geometry.weld), so that unwelded
+		triangle soups are simplified as connected surfaces. Vertices that still share
+		their position with another vertex (the two sides of a texture or normal seam, as
+		in a Sphere) are never moved, so seams do not open up; a flat-shaded geometry, with
+		a seam at every edge, therefore cannot be simplified, and a warning is given if
+		nothing could be collapsed. Open boundaries are held in place by additional
+		quadrics, and collapses that would flip or sharply turn a triangle away from the
+		original it was simplified from are rejected.
+
+		@returns a new BaseGeometry (or the geometry itself, if it already has no more than
+			target_triangle_count triangles)
+	"""
+	if geometry.index_count // 3 <= target_triangle_count:
+		return geometry
+
+	positions = geometry.positions
+	extent = float((positions.max(axis=0) - positions.min(axis=0)).max()) or 1.0
+	geometry = weld(geometry, position_tolerance=extent * 1e-6)
+	triangles = geometry.indices.reshape(-1, 3).astype(numpy.int64)
+	original_triangle_count = len(triangles)
+
+	positions = geometry.positions.astype(numpy.float64)
+	normals = geometry.normals.astype(numpy.float64)
+	texture_positions = geometry.texture_positions.astype(numpy.float64)
+	vertex_count = len(positions)
+
+	# lock vertices on seams: those sharing a position with another vertex, which after
+	# welding must differ in normal or texture position
+	keys = numpy.ascontiguousarray(numpy.round(positions / (extent * 1e-6)).astype(numpy.int64))
+	rows = keys.view(numpy.dtype((numpy.void, keys.dtype.itemsize * 3))).reshape(-1)
+	unique_rows, position_ids = numpy.unique(rows, return_inverse=True)
+	locked = numpy.bincount(position_ids)[position_ids] > 1
+
+	# quadrics of the triangle planes, weighted by area
+	p0, p1, p2 = positions[triangles[:, 0]], positions[triangles[:, 1]], positions[triangles[:, 2]]
+	face_normals, lengths = _face_normals(p0, p1, p2)
+	nonzero = lengths > 0
+	face_normals[nonzero] /= lengths[nonzero, numpy.newaxis]
+	face_quadrics = _plane_quadrics(face_normals, -(face_normals * p0).sum(axis=1), lengths * 0.5)
+	quadrics = _sum_by_vertex(numpy.repeat(face_quadrics, 3, axis=1), triangles.reshape(-1), vertex_count)
+
+	# the normal of each triangle's original, which it must not turn too far from.
+	# Degenerate triangles (such as those at a Sphere's poles) have no face normal, so
+	# use their vertex normals instead
+	source_normals = face_normals.copy()
+	degenerate = lengths <= extent * extent * 1e-12
+	if degenerate.any():
+		vertex_normals = normals[triangles[degenerate]].sum(axis=1)
+		vertex_lengths = numpy.sqrt((vertex_normals * vertex_normals).sum(axis=1))
+		vertex_lengths[vertex_lengths == 0] = numpy.inf
+		source_normals[degenerate] = vertex_normals / vertex_lengths[:, numpy.newaxis]
+
+	# quadrics of planes perpendicular to the triangles along open boundary edges (those
+	# belonging to a single triangle)
+	starts = triangles.reshape(-1)
+	ends = triangles[:, [1, 2, 0]].reshape(-1)
+	edge_keys = numpy.minimum(starts, ends) * vertex_count + numpy.maximum(starts, ends)
+	unique_keys, edge_ids, edge_counts = numpy.unique(edge_keys, return_inverse=True, return_counts=True)
+	boundary = edge_counts[edge_ids] == 1
+	if boundary.any():
+		a = starts[boundary]
+		b = ends[boundary]
+		direction = positions[b] - positions[a]
+		plane_normals = numpy.cross(direction, numpy.repeat(face_normals, 3, axis=0)[boundary])
+		plane_lengths = numpy.sqrt((plane_normals * plane_normals).sum(axis=1))
+		nonzero = plane_lengths > 0
+		plane_normals[nonzero] /= plane_lengths[nonzero, numpy.newaxis]
+		boundary_quadrics = _plane_quadrics(
+			plane_normals, -(plane_normals * positions[a]).sum(axis=1),
+			BOUNDARY_WEIGHT * (direction * direction).sum(axis=1)
+		)
+		quadrics += _sum_by_vertex(numpy.repeat(boundary_quadrics, 2, axis=1), numpy.column_stack([a, b]).reshape(-1), vertex_count)
+
+	random = numpy.random.RandomState(0)
+	stalled_passes = 0
+	for collapse_pass in range(max_passes):
+		if len(triangles) <= target_triangle_count:
+			break
+
+		# candidate edges, each given as (a, b) with a < b
+		starts = triangles.reshape(-1)
+		ends = triangles[:, [1, 2, 0]].reshape(-1)
+		edge_keys = numpy.unique(numpy.minimum(starts, ends) * vertex_count + numpy.maximum(starts, ends))
+		edge_a = edge_keys // vertex_count
+		edge_b = edge_keys % vertex_count
+
+		# error of collapsing to each end and to the midpoint
+		q = quadrics[:, edge_a] + quadrics[:, edge_b]
+		pa = positions[edge_a]
+		pb = positions[edge_b]
+		errors = numpy.column_stack([
+			_quadric_error(q, pa), _quadric_error(q, pb), _quadric_error(q, (pa + pb) * 0.5)
+		])
+		# a locked vertex must stay where it is
+		errors[locked[edge_a], 1:] = numpy.inf
+		errors[locked[edge_b], 0] = numpy.inf
+		errors[locked[edge_b], 2] = numpy.inf
+		choice = errors.argmin(axis=1)
+		costs = errors[numpy.arange(len(choice)), choice]
+
+		# candidates are the cheapest fraction of the edges (but no fewer than a few times
+		# the collapses still needed, each removing about two triangles)
+		needed = (len(triangles) - target_triangle_count + 1) // 2
+		candidates = numpy.flatnonzero(numpy.isfinite(costs))
+		if not len(candidates):
+			break
+		candidate_count = max(int(len(candidates) * CANDIDATE_FRACTION), 4 * needed)
+		if candidate_count < len(candidates):
+			candidates = candidates[numpy.argpartition(costs[candidates], candidate_count)[:candidate_count]]
+
+		# among those, priority is random: ranking by cost would let only the local minima
+		# of a smoothly varying cost through, giving few collapses per pass
+		ranks = numpy.full(len(edge_keys), _NOT_CANDIDATE, dtype=numpy.int64)
+		ranks[candidates] = random.permutation(len(candidates))
+
+		# accept edges whose rank is the lowest at both ends, so that no vertex takes part in
+		# two collapses
+		vertex_min = numpy.full(vertex_count, _NOT_CANDIDATE, dtype=numpy.int64)
+		numpy.minimum.at(vertex_min, edge_a[candidates], ranks[candidates])
+		numpy.minimum.at(vertex_min, edge_b[candidates], ranks[candidates])
+		candidate_ranks = ranks[candidates]
+		accepted = candidates[
+			(vertex_min[edge_a[candidates]] == candidate_ranks)
+			& (vertex_min[edge_b[candidates]] == candidate_ranks)
+		]
+
+		a = edge_a[accepted]
+		b = edge_b[accepted]
+		t = numpy.array([0.0, 1.0, 0.5])[choice[accepted]]
+		targets = pa[accepted] + (pb[accepted] - pa[accepted]) * t[:, numpy.newaxis]
+
+		# reject collapses that would flip or sharply turn a surviving triangle
+		collapse_of = numpy.full(vertex_count, -1, dtype=numpy.int64)
+		collapse_of[a] = numpy.arange(len(accepted))
+		collapse_of[b] = numpy.arange(len(accepted))
+		affected_mask = (collapse_of[triangles] >= 0).any(axis=1)
+		affected = triangles[affected_mask]
+		checks = (a, b, targets, collapse_of, affected, positions[affected], source_normals[affected_mask])
+		keep = _reject_turns(numpy.ones(len(accepted), dtype=bool), *checks)
+
+		# collapse no more than needed to reach the target. Dropping collapses changes the
+		# outcome for triangles they shared with others, so the rest are checked again
+		if keep.sum() > needed:
+			cheapest = numpy.flatnonzero(keep)
+			cheapest = cheapest[numpy.argsort(costs[accepted[cheapest]], kind='mergesort')[:needed]]
+			keep = numpy.zeros(len(accepted), dtype=bool)
+			keep[cheapest] = True
+			keep = _reject_turns(keep, *checks)
+
+		if not keep.any():
+			# nothing could be collapsed this time; different random priorities may do better
+			stalled_passes += 1
+			if stalled_passes == MAX_STALLED_PASSES:
+				break
+			continue
+		stalled_passes = 0
+
+		keep = numpy.flatnonzero(keep)
+		a, b, t, targets = a[keep], b[keep], t[keep], targets[keep]
+
+		# merge b into a
+		weights = t[:, numpy.newaxis]
+		positions[a] = targets
+		merged_normals = normals[a] + (normals[b] - normals[a]) * weights
+		merged_lengths = numpy.sqrt((merged_normals * merged_normals).sum(axis=1))
+		merged_lengths[merged_lengths == 0] = 1.0
+		normals[a] = merged_normals / merged_lengths[:, numpy.newaxis]
+		texture_positions[a] += (texture_positions[b] - texture_positions[a]) * weights
+		quadrics[:, a] += quadrics[:, b]
+		locked[a] |= locked[b]
+
+		remap = numpy.arange(vertex_count)
+		remap[b] = a
+		triangles = remap[triangles]
+		survivors = (
+			(triangles[:, 0] != triangles[:, 1])
+			& (triangles[:, 1] != triangles[:, 2])
+			& (triangles[:, 0] != triangles[:, 2])
+		)
+		triangles = triangles[survivors]
+		source_normals = source_normals[survivors]
+
+	if len(triangles) == original_triangle_count > target_triangle_count:
+		warnings.warn(
+			"simplify could not collapse any edges of a %d triangle geometry; its vertices may "
+			"all lie on normal or texture seams (as in a flat-shaded mesh)" % original_triangle_count
+		)
+
+	# drop the vertices no longer used
+	used, indices = numpy.unique(triangles.reshape(-1), return_inverse=True)
+	return BaseGeometry(
+		positions=positions[used], normals=normals[used],
+		texture_positions=texture_positions[used], indices=indices
+	)
@@ -1,23 +1,97 @@
 from shortcrust.geometry.base import BaseGeometry
+import numpy
 
 
 class Union(BaseGeometry):
-	def __init__(self, geometries):
-		positions = []
-		normals = []
-		texture_positions = []
-		indices = []
-
-		next_index = 0
-
-		for geometry in geometries:
-			positions += geometry.positions
-			normals += geometry.normals
-			texture_positions += geometry.texture_positions
-			indices += [(next_index + i) for i in geometry.indices]
-			next_index += len(geometry.positions)
-
-		self.positions = positions
-		self.normals = normals
-		self.texture_positions = texture_positions
-		self.indices = indices
+	"""
+		A geometry combining several others. The total size of the passed geometries is
+		computed up front, and their data copied directly into preallocated arrays.
+
+		Further geometries can be added later with append. To avoid re-copying the data
+		merged so far, pass vertex_capacity / index_capacity to reserve space for the
+		eventual total size; otherwise the storage grows by doubling as necessary.
+
+		positions, normals, texture_positions and indices are views of the storage, so
+		are updated in place by append. Indices are always stored as uint32, so that
+		any geometry can be appended; Mesh narrows them to 16 bits on upload where the
+		vertex count allows.
+	"""
+	def __init__(self, geometries=[], vertex_capacity=0, index_capacity=0):
+		geometries = list(geometries)
+		arrays = [self._arrays(geometry) for geometry in geometries]
+
+		vertex_capacity = max(vertex_capacity, sum(len(a[0]) for a in arrays))
+		index_capacity = max(index_capacity, sum(len(a[3]) for a in arrays))
+
+		self._vertex_count = 0
+		self._index_count = 0
+		self._position_store = numpy.empty((vertex_capacity, 3), dtype=numpy.float32)
+		self._normal_store = numpy.empty((vertex_capacity, 3), dtype=numpy.float32)
+		self._texture_position_store = numpy.empty((vertex_capacity, 2), dtype=numpy.float32)
+		self._index_store = numpy.empty(index_capacity, dtype=numpy.uint32)
+
+		for positions, normals, texture_positions, indices in arrays:
+			self._append_arrays(positions, normals, texture_positions, indices)
+		self._update_views()
+
+	@staticmethod
+	def _arrays(geometry):
+		# geometries may hold their attributes as lists of tuples or as numpy arrays
+		return (
+			numpy.asarray(geometry.positions, dtype=numpy.float32).reshape(-1, 3),
+			numpy.asarray(geometry.normals, dtype=numpy.float32).reshape(-1, 3),
+			numpy.asarray(geometry.texture_positions, dtype=numpy.float32).reshape(-1, 2),
+			numpy.asarray(geometry.indices).reshape(-1),
+		)
+
+	def append(self, geometry):
+		"""
+			Add a geometry to the union
+		"""
+		self._append_arrays(*self._arrays(geometry))
+		self._update_views()
+
+	def reserve(self, vertex_capacity, index_capacity):
+		"""
+			Ensure that there is room for at least the given total numbers of vertices and
+			indices without further reallocation
+		"""
+		if vertex_capacity > len(self._position_store):
+			self._position_store = self._grow(self._position_store, self._vertex_count, vertex_capacity)
+			self._normal_store = self._grow(self._normal_store, self._vertex_count, vertex_capacity)
+			self._texture_position_store = self._grow(self._texture_position_store, self._vertex_count, vertex_capacity)
+		if index_capacity > len(self._index_store):
+			self._index_store = self._grow(self._index_store, self._index_count, index_capacity)
+
+	@staticmethod
+	def _grow(store, used, capacity):
+		new_store = numpy.empty((capacity,) + store.shape[1:], dtype=store.dtype)
+		new_store[:used] = store[:used]
+		return new_store
+
+	def _append_arrays(self, positions, normals, texture_positions, indices):
+		v0 = self._vertex_count
+		v1 = v0 + len(positions)
+		i0 = self._index_count
+		i1 = i0 + len(indices)
+
+		if v1 > len(self._position_store):
+			self.reserve(max(v1, 2 * len(self._position_store)), 0)
+		if i1 > len(self._index_store):
+			self.reserve(0, max(i1, 2 * len(self._index_store)))
+
+		self._position_store[v0:v1] = positions
+		self._normal_store[v0:v1] = normals
+		self._texture_position_store[v0:v1] = texture_positions
+		# rebase the geometry's indices onto its position within the union
+		self._index_store[i0:i1] = indices
+		self._index_store[i0:i1] += v0
+
+		self._vertex_count = v1
+		self._index_count = i1
+
+	def _update_views(self):
+		self.positions = self._position_store[:self._vertex_count]
+		self.normals = self._normal_store[:self._vertex_count]
+		self.texture_positions = self._texture_position_store[:self._vertex_count]
+		self.indices = self._index_store[:self._index_count]
@@ -0,0 +1,55 @@
+from shortcrust.geometry.base import BaseGeometry
+import numpy
+
+
+def _quantize(values, tolerance):
+	return numpy.round(values / tolerance).astype(numpy.int64)
+
+
+def weld(geometry, position_tolerance=1e-5, normal_tolerance=1e-3, texture_tolerance=1e-5, remove_degenerate=True):
+	"""
+		Merge vertices whose attributes are equal once quantized to multiples of the given
+		tolerances, and remap the indices to match. Each merged vertex keeps the attributes
+		of its first occurrence, and vertices stay in order of first occurrence.
+
+		Passing None as normal_tolerance or texture_tolerance ignores that attribute when
+		comparing vertices. For example, a Sphere's seam and pole vertices differ only in
+		texture coordinates, so welding them needs texture_tolerance=None (at the cost of
+		texture mapping along the seam).
+
+		If remove_degenerate is true, triangles left with two or more identical vertices
+		are dropped.
+
+		@returns a new BaseGeometry
+	"""
+	keys = [_quantize(geometry.positions, position_tolerance)]
+	if normal_tolerance is not None:
+		keys.append(_quantize(geometry.normals, normal_tolerance))
+	if texture_tolerance is not None:
+		keys.append(_quantize(geometry.texture_positions, texture_tolerance))
+	keys = numpy.ascontiguousarray(numpy.hstack(keys))
+
+	# view each row of keys as a single opaque value, so that numpy.unique compares whole rows
+	rows = keys.view(numpy.dtype((numpy.void, keys.dtype.itemsize * keys.shape[1]))).reshape(-1)
+	unique_rows, first, inverse = numpy.unique(rows, return_index=True, return_inverse=True)
+
+	# number the unique vertices in order of first occurrence
+	order = numpy.argsort(first)
+	keep = first[order]
+	new_numbers = numpy.empty(len(unique_rows), dtype=numpy.int64)
+	new_numbers[order] = numpy.arange(len(unique_rows))
+	indices = new_numbers[inverse][geometry.indices]
+
+	if remove_degenerate:
+		triangles = indices.reshape(-1, 3)
+		valid = (
+			(triangles[:, 0] != triangles[:, 1])
+			& (triangles[:, 1] != triangles[:, 2])
+			& (triangles[:, 0] != triangles[:, 2])
+		)
+		indices = triangles[valid].reshape(-1)
+
+	return BaseGeometry(
+		positions=geometry.positions[keep], normals=geometry.normals[keep],
+		texture_positions=geometry.texture_positions[keep], indices=indices
+	)
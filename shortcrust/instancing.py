@@ -0,0 +1,161 @@
+"""
+	Pseudo-instancing, for drawing many copies of a mesh with few draw calls on GL
+	implementations without instanced drawing (such as OpenGL ES 2.0). The geometry is
+	replicated several times in one set of buffers, with each vertex carrying the number
+	of its copy as an extra attribute; the vertex shader uses this to look up the copy's
+	transform in a uniform array, so a whole array's worth of instances is drawn with one
+	uniform upload and one glDrawElements.
+"""
+from shortcrust.gl2 import *
+from shortcrust import has_glut
+from shortcrust.buffer import AttributeBuffer, uint_indices_supported
+from shortcrust.geometry.base import BaseGeometry, Mesh, index_dtype
+from shortcrust.shader import ShaderProgram
+import numpy
+
+# uniform vectors left over for the shader's other uniforms (projection matrix, lights and
+# so on) when sizing the array of per-instance uniforms
+RESERVED_UNIFORM_VECTORS = 16
+
+_max_vertex_uniform_vectors = None
+
+
+def max_vertex_uniform_vectors():
+	"""
+		Return the number of vec4 uniforms available to a vertex shader (at least 128 in
+		OpenGL ES 2.0). Requires a current GL context.
+	"""
+	global _max_vertex_uniform_vectors
+	if _max_vertex_uniform_vectors is None:
+		if has_glut:
+			# GL_MAX_VERTEX_UNIFORM_VECTORS only exists in desktop GL from 4.1
+			_max_vertex_uniform_vectors = int(glGetIntegerv(GL_MAX_VERTEX_UNIFORM_COMPONENTS)) // 4
+		else:
+			_max_vertex_uniform_vectors = int(glGetIntegerv(GL_MAX_VERTEX_UNIFORM_VECTORS))
+	return _max_vertex_uniform_vectors
+
+
+def instances_per_draw(vectors_per_instance=4, reserved_vectors=RESERVED_UNIFORM_VECTORS):
+	"""
+		Return the number of instances that fit in one draw call, given the number of vec4
+		uniforms taken by each instance (4 for a mat4) and the number to leave for other
+		uniforms
+	"""
+	return max(1, (max_vertex_uniform_vectors() - reserved_vectors) // vectors_per_instance)
+
+
+def replicate(geometry, count):
+	"""
+		Return a BaseGeometry consisting of count copies of geometry, one after another
+	"""
+	vertex_count = geometry.vertex_count
+	dtype = index_dtype(vertex_count * count)
+	offsets = numpy.arange(count, dtype=dtype)[:, numpy.newaxis] * dtype(vertex_count)
+	return BaseGeometry(
+		positions=numpy.tile(geometry.positions, (count, 1)),
+		normals=numpy.tile(geometry.normals, (count, 1)),
+		texture_positions=numpy.tile(geometry.texture_positions, (count, 1)),
+		indices=(geometry.indices.astype(dtype)[numpy.newaxis, :] + offsets).reshape(-1),
+	)
+
+
+class InstancedMesh(Mesh):
+	"""
+		A mesh of instance_capacity copies of a geometry, whose vertices have an extra
+		attribute (instance_ids, a float) giving the number of their copy. draw_instances
+		draws any number of instances of the geometry, instance_capacity at a time.
+
+		By default, each instance has a mat4 transform (vectors_per_instance=4), uploaded to
+		a uniform mat4 array; for other per-instance data, such as a vec4 of translation and
+		scale, pass matrices=False and the number of vec4s per instance, to upload to a
+		uniform vec4 array. instance_capacity defaults to as many instances as fit in the
+		vertex shader's uniforms (see instances_per_draw), and is reduced if necessary so
+		that the copies need only 16-bit indices where 32-bit ones are unavailable.
+
+		Other keyword arguments are passed to Mesh (strip is not supported).
+	"""
+	def __init__(self, geometry, instance_capacity=None, vectors_per_instance=4, matrices=True, reserved_vectors=RESERVED_UNIFORM_VECTORS, **kwargs):
+		if kwargs.get('strip'):
+			raise ValueError("InstancedMesh cannot be drawn as a triangle strip")
+		if matrices and vectors_per_instance % 4:
+			raise ValueError("vectors_per_instance must be a multiple of 4 for matrices")
+
+		if instance_capacity is None:
+			instance_capacity = instances_per_draw(vectors_per_instance, reserved_vectors)
+		uint_indices = kwargs.get('uint_indices')
+		if uint_indices is None:
+			uint_indices = uint_indices_supported()
+		if not uint_indices:
+			instance_capacity = min(instance_capacity, 0x10000 // max(geometry.vertex_count, 1))
+		if instance_capacity < 1:
+			raise ValueError("Geometry has too many vertices to instance without 32-bit indices")
+
+		self.instance_capacity = instance_capacity
+		self.vectors_per_instance = vectors_per_instance
+		self.matrices = matrices
+		self.instance_index_count = geometry.index_count
+
+		super(InstancedMesh, self).__init__(replicate(geometry, instance_capacity), **kwargs)
+
+		instance_ids = numpy.repeat(numpy.arange(instance_capacity, dtype=numpy.float32), geometry.vertex_count)
+		self.instance_ids = AttributeBuffer(instance_ids.reshape(-1, 1))
+
+	def attach(self, position_location, normal_location=None, texture_position_location=None, instance_id_location=None):
+		super(InstancedMesh, self).attach(position_location, normal_location, texture_position_location)
+		if instance_id_location is not None:
+			self.instance_ids.attach(instance_id_location)
+
+	def draw_instances(self, uniform_location, instances):
+		"""
+			Draw an instance of the geometry for each entry of instances - an array-like of
+			shape (instance_count, 4 * vectors_per_instance), such as a list of mat4s or a
+			mat4batch - uploading them a chunk at a time to the uniform array at
+			uniform_location. Returns the number of draw calls made.
+		"""
+		instances = numpy.ascontiguousarray(instances, dtype=numpy.float32).reshape(-1, 4 * self.vectors_per_instance)
+
+		glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, self.indices.name)
+		draw_count = 0
+		for start in range(0, len(instances), self.instance_capacity):
+			chunk = instances[start:start + self.instance_capacity]
+			data = (GLfloat * chunk.size).from_address(chunk.ctypes.data)
+			if self.matrices:
+				glUniformMatrix4fv(uniform_location, chunk.size // 16, GL_FALSE, data)
+			else:
+				glUniform4fv(uniform_location, chunk.size // 4, data)
+			glDrawElements(self.mode, len(chunk) * self.instance_index_count, self.indices.data_type, None)
+			draw_count += 1
+		return draw_count
+
+
+class InstancedShaderProgram(ShaderProgram):
+	"""
+		A ShaderProgram for drawing InstancedMeshes. The vertex shader is compiled with
+		MAX_INSTANCES defined as the number of instances that fit in its uniforms, to size
+		the per-instance uniform array - for example:
+
+			attribute float aInstanceId;
+			uniform mat4 uInstanceMatrices[MAX_INSTANCES];
+			...
+			gl_Position = uPMatrix * uInstanceMatrices[int(aInstanceId)] * vec4(aVertexPosition, 1.0);
+
+		Set vectors_per_instance, matrices and reserved_vectors as for InstancedMesh, and
+		create meshes with create_mesh so that their capacity matches.
+	"""
+	vectors_per_instance = 4
+	matrices = True
+	reserved_vectors = RESERVED_UNIFORM_VECTORS
+
+	def __init__(self):
+		self.max_instances = instances_per_draw(self.vectors_per_instance, self.reserved_vectors)
+		self.vertex_shader = "#define MAX_INSTANCES %d\n%s" % (self.max_instances, self.vertex_shader)
+		super(InstancedShaderProgram, self).__init__()
+
+	def create_mesh(self, geometry, **kwargs):
+		"""
+			Create an InstancedMesh of geometry to draw with this shader
+		"""
+		return InstancedMesh(
+			geometry, instance_capacity=self.max_instances,
+			vectors_per_instance=self.vectors_per_instance, matrices=self.matrices, **kwargs
+		)
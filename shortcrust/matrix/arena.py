@@ -0,0 +1,88 @@
+import numpy
+from shortcrust.gl2 import GLfloat
+from shortcrust.matrix.mat3 import Mat3
+from shortcrust.matrix.mat4 import Mat4
+from shortcrust.matrix.vec3 import Vec3
+
+
+def asArray(vec):
+	"""
+		Returns a numpy view of an existing mat3 / mat4 / vec3 (or any other GLfloat array),
+		sharing its memory - changes to one are visible in the other
+
+		@param {GLfloat[]} vec GLfloat array to view
+
+		@returns {ndarray} float32 array of the same length as vec
+	"""
+	return numpy.ctypeslib.as_array(vec)
+
+
+class Arena(object):
+	"""
+		A preallocated block of memory holding up to 'capacity' mat4s / mat3s / vec3s
+		contiguously. Each allocated element is a genuine Mat4 / Mat3 / Vec3 (usable with
+		the mat4, mat3 and vec3 functions and passable to GL functions) whose memory lives
+		inside the arena, and the whole arena is simultaneously available as the
+		(capacity, element_size) float32 numpy array 'array' - so the same values can be
+		updated in bulk with mat4batch without any copying.
+	"""
+	element_type = None  # ctypes array type of a single element; defined by subclasses
+
+	def __init__(self, capacity):
+		self.capacity = capacity
+		self.element_size = self.element_type._length_
+		self.array = numpy.zeros((capacity, self.element_size), dtype=numpy.float32)
+		self.elements = []
+
+	def __len__(self):
+		return len(self.elements)
+
+	def __getitem__(self, index):
+		return self.elements[index]
+
+	def __iter__(self):
+		return iter(self.elements)
+
+	def allocate(self, values=None):
+		"""
+			Claim the next free element of the arena, optionally initialising it from an
+			array-like object of element_size numbers
+		"""
+		index = len(self.elements)
+		if index >= self.capacity:
+			raise IndexError("Arena is full (capacity %d)" % self.capacity)
+
+		if values is not None:
+			self.array[index] = values
+
+		element = self.element_type.from_buffer(self.array, index * self.array.itemsize * self.element_size)
+		self.elements.append(element)
+		return element
+
+	def allocated(self):
+		"""
+			Return a numpy view of the allocated elements, as a (len(self), element_size) array
+		"""
+		return self.array[:len(self.elements)]
+
+	def gl_array(self, start=0, stop=None):
+		"""
+			Return a GLfloat array sharing memory with elements start to stop-1, suitable for
+			passing to GL functions that accept a count of elements (e.g. glUniformMatrix4fv)
+		"""
+		if stop is None:
+			stop = len(self.elements)
+		offset = start * self.element_size
+		return (GLfloat * ((stop - start) * self.element_size)).from_buffer(self.array, offset * self.array.itemsize)
+
+
+class Mat4Arena(Arena):
+	element_type = Mat4
+
+
+class Mat3Arena(Arena):
+	element_type = Mat3
+
+
+class Vec3Arena(Arena):
+	element_type = Vec3
@@ -37,6 +37,34 @@ def create(mat=None):
 	return dest
 
 
+def set(mat, dest):
+	"""
+		Copies the values of one mat4 to another
+
+		@param {mat4} mat mat4 containing values to copy
+		@param {mat4} dest mat4 receiving copied values
+
+		@returns {mat4} dest
+	"""
+	dest[0] = mat[0]
+	dest[1] = mat[1]
+	dest[2] = mat[2]
+	dest[3] = mat[3]
+	dest[4] = mat[4]
+	dest[5] = mat[5]
+	dest[6] = mat[6]
+	dest[7] = mat[7]
+	dest[8] = mat[8]
+	dest[9] = mat[9]
+	dest[10] = mat[10]
+	dest[11] = mat[11]
+	dest[12] = mat[12]
+	dest[13] = mat[13]
+	dest[14] = mat[14]
+	dest[15] = mat[15]
+	return dest
+
+
 def identity(dest=None):
 	"""
 		Sets a mat4 to an identity matrix
@@ -67,6 +95,152 @@ def identity(dest=None):
 	return dest
 
 
+def inverse(mat, dest=None):
+	"""
+		Calculates the inverse matrix of a mat4
+
+		@param {mat4} mat mat4 to calculate inverse of
+		@param {mat4} [dest] mat4 receiving inverse matrix. If not specified result is written to mat
+
+		@returns {mat4} dest is specified, mat otherwise, null if matrix cannot be inverted
+	"""
+	if not dest:
+		dest = mat
+
+	# Cache the matrix values (makes for huge speed increases!)
+	a00 = mat[0]
+	a01 = mat[1]
+	a02 = mat[2]
+	a03 = mat[3]
+
+	a10 = mat[4]
+	a11 = mat[5]
+	a12 = mat[6]
+	a13 = mat[7]
+
+	a20 = mat[8]
+	a21 = mat[9]
+	a22 = mat[10]
+	a23 = mat[11]
+
+	a30 = mat[12]
+	a31 = mat[13]
+	a32 = mat[14]
+	a33 = mat[15]
+
+	b00 = a00 * a11 - a01 * a10
+	b01 = a00 * a12 - a02 * a10
+	b02 = a00 * a13 - a03 * a10
+	b03 = a01 * a12 - a02 * a11
+	b04 = a01 * a13 - a03 * a11
+	b05 = a02 * a13 - a03 * a12
+	b06 = a20 * a31 - a21 * a30
+	b07 = a20 * a32 - a22 * a30
+	b08 = a20 * a33 - a23 * a30
+	b09 = a21 * a32 - a22 * a31
+	b10 = a21 * a33 - a23 * a31
+	b11 = a22 * a33 - a23 * a32
+
+	d = (b00 * b11 - b01 * b10 + b02 * b09 + b03 * b08 - b04 * b07 + b05 * b06)
+
+	if not d:
+		return None
+	invDet = 1.0 / d
+
+	dest[0] = (a11 * b11 - a12 * b10 + a13 * b09) * invDet
+	dest[1] = (-a01 * b11 + a02 * b10 - a03 * b09) * invDet
+	dest[2] = (a31 * b05 - a32 * b04 + a33 * b03) * invDet
+	dest[3] = (-a21 * b05 + a22 * b04 - a23 * b03) * invDet
+	dest[4] = (-a10 * b11 + a12 * b08 - a13 * b07) * invDet
+	dest[5] = (a00 * b11 - a02 * b08 + a03 * b07) * invDet
+	dest[6] = (-a30 * b05 + a32 * b02 - a33 * b01) * invDet
+	dest[7] = (a20 * b05 - a22 * b02 + a23 * b01) * invDet
+	dest[8] = (a10 * b10 - a11 * b08 + a13 * b06) * invDet
+	dest[9] = (-a00 * b10 + a01 * b08 - a03 * b06) * invDet
+	dest[10] = (a30 * b04 - a31 * b02 + a33 * b00) * invDet
+	dest[11] = (-a20 * b04 + a21 * b02 - a23 * b00) * invDet
+	dest[12] = (-a10 * b09 + a11 * b07 - a12 * b06) * invDet
+	dest[13] = (a00 * b09 - a01 * b07 + a02 * b06) * invDet
+	dest[14] = (-a30 * b03 + a31 * b01 - a32 * b00) * invDet
+	dest[15] = (a20 * b03 - a21 * b01 + a22 * b00) * invDet
+
+	return dest
+
+
+def multiply(mat, mat2, dest=None):
+	"""
+		Performs a matrix multiplication
+
+		@param {mat4} mat First operand
+		@param {mat4} mat2 Second operand
+		@param {mat4} [dest] mat4 receiving operation result. If not specified result is written to mat
+
+		@returns {mat4} dest if specified, mat otherwise
+	"""
+	if not dest:
+		dest = mat
+
+	# Cache the matrix values (makes for huge speed increases!)
+	a00 = mat[0]
+	a01 = mat[1]
+	a02 = mat[2]
+	a03 = mat[3]
+
+	a10 = mat[4]
+	a11 = mat[5]
+	a12 = mat[6]
+	a13 = mat[7]
+
+	a20 = mat[8]
+	a21 = mat[9]
+	a22 = mat[10]
+	a23 = mat[11]
+
+	a30 = mat[12]
+	a31 = mat[13]
+	a32 = mat[14]
+	a33 = mat[15]
+
+	b00 = mat2[0]
+	b01 = mat2[1]
+	b02 = mat2[2]
+	b03 = mat2[3]
+
+	b10 = mat2[4]
+	b11 = mat2[5]
+	b12 = mat2[6]
+	b13 = mat2[7]
+
+	b20 = mat2[8]
+	b21 = mat2[9]
+	b22 = mat2[10]
+	b23 = mat2[11]
+
+	b30 = mat2[12]
+	b31 = mat2[13]
+	b32 = mat2[14]
+	b33 = mat2[15]
+
+	dest[0] = b00 * a00 + b01 * a10 + b02 * a20 + b03 * a30
+	dest[1] = b00 * a01 + b01 * a11 + b02 * a21 + b03 * a31
+	dest[2] = b00 * a02 + b01 * a12 + b02 * a22 + b03 * a32
+	dest[3] = b00 * a03 + b01 * a13 + b02 * a23 + b03 * a33
+	dest[4] = b10 * a00 + b11 * a10 + b12 * a20 + b13 * a30
+	dest[5] = b10 * a01 + b11 * a11 + b12 * a21 + b13 * a31
+	dest[6] = b10 * a02 + b11 * a12 + b12 * a22 + b13 * a32
+	dest[7] = b10 * a03 + b11 * a13 + b12 * a23 + b13 * a33
+	dest[8] = b20 * a00 + b21 * a10 + b22 * a20 + b23 * a30
+	dest[9] = b20 * a01 + b21 * a11 + b22 * a21 + b23 * a31
+	dest[10] = b20 * a02 + b21 * a12 + b22 * a22 + b23 * a32
+	dest[11] = b20 * a03 + b21 * a13 + b22 * a23 + b23 * a33
+	dest[12] = b30 * a00 + b31 * a10 + b32 * a20 + b33 * a30
+	dest[13] = b30 * a01 + b31 * a11 + b32 * a21 + b33 * a31
+	dest[14] = b30 * a02 + b31 * a12 + b32 * a22 + b33 * a32
+	dest[15] = b30 * a03 + b31 * a13 + b32 * a23 + b33 * a33
+
+	return dest
+
+
 def translate(mat, vec, dest=None):
 	"""
 		Translates a matrix by the given vector
@@ -126,6 +300,54 @@ def translate(mat, vec, dest=None):
 	return dest
 
 
+def scale(mat, vec, dest=None):
+	"""
+		Scales a matrix by the given vector
+
+		@param {mat4} mat mat4 to scale
+		@param {vec3} vec vec3 specifying the scale for each axis
+		@param {mat4} [dest] mat4 receiving operation result. If not specified result is written to mat
+
+		@returns {mat4} dest if specified, mat otherwise
+	"""
+	x = vec[0]
+	y = vec[1]
+	z = vec[2]
+
+	if (not dest) or (mat == dest):
+		mat[0] *= x
+		mat[1] *= x
+		mat[2] *= x
+		mat[3] *= x
+		mat[4] *= y
+		mat[5] *= y
+		mat[6] *= y
+		mat[7] *= y
+		mat[8] *= z
+		mat[9] *= z
+		mat[10] *= z
+		mat[11] *= z
+		return mat
+
+	dest[0] = mat[0] * x
+	dest[1] = mat[1] * x
+	dest[2] = mat[2] * x
+	dest[3] = mat[3] * x
+	dest[4] = mat[4] * y
+	dest[5] = mat[5] * y
+	dest[6] = mat[6] * y
+	dest[7] = mat[7] * y
+	dest[8] = mat[8] * z
+	dest[9] = mat[9] * z
+	dest[10] = mat[10] * z
+	dest[11] = mat[11] * z
+	dest[12] = mat[12]
+	dest[13] = mat[13]
+	dest[14] = mat[14]
+	dest[15] = mat[15]
+	return dest
+
+
 def rotate(mat, angle, axis, dest=None):
 	"""
 		Rotates a matrix by the given angle around the specified axis
@@ -410,6 +632,46 @@ def perspective(fovy, aspect, near, far, dest=None):
 	return frustum(-right, right, -top, top, near, far, dest)
 
 
+def ortho(left, right, bottom, top, near, far, dest=None):
+	"""
+		Generates an orthogonal projection matrix with the given bounds
+
+		@param {number} left Left bound of the frustum
+		@param {number} right Right bound of the frustum
+		@param {number} bottom Bottom bound of the frustum
+		@param {number} top Top bound of the frustum
+		@param {number} near Near bound of the frustum
+		@param {number} far Far bound of the frustum
+		@param {mat4} [dest] mat4 frustum matrix will be written into
+
+		@returns {mat4} dest if specified, a new mat4 otherwise
+	"""
+
+	if not dest:
+		dest = create()
+
+	rl = float(right - left)
+	tb = float(top - bottom)
+	fn = float(far - near)
+	dest[0] = 2 / rl
+	dest[1] = 0
+	dest[2] = 0
+	dest[3] = 0
+	dest[4] = 0
+	dest[5] = 2 / tb
+	dest[6] = 0
+	dest[7] = 0
+	dest[8] = 0
+	dest[9] = 0
+	dest[10] = -2 / fn
+	dest[11] = 0
+	dest[12] = -(left + right) / rl
+	dest[13] = -(top + bottom) / tb
+	dest[14] = -(far + near) / fn
+	dest[15] = 1
+	return dest
+
+
 def toInverseMat3(mat, dest=None):
 	"""
 		Calculates the inverse of the upper 3x3 elements of a mat4 and copies the result into a mat3
@@ -0,0 +1,357 @@
+import numpy
+from shortcrust.gl2 import GLfloat
+
+# Batched counterparts of the functions in shortcrust.matrix.mat4. A batch of N mat4s is
+# stored as a C-contiguous numpy array of shape (N, 16) and dtype float32, with each row
+# laid out in the same column-major order as a single mat4. Every function performs one
+# vectorised operation over the whole batch, rather than one python call per matrix.
+#
+# Wherever a function takes a vector or angle argument, either a single value (applied
+# to every matrix) or one value per matrix may be passed.
+
+
+def _as4x4(mats):
+	# View a (N, 16) batch as (N, 4, 4); m[n, i, j] is element 4 * i + j of matrix n,
+	# i.e. column i, row j
+	return mats.reshape(-1, 4, 4)
+
+
+def _vectors(vecs):
+	return numpy.asarray(vecs, dtype=numpy.float32).reshape(-1, 3)
+
+
+def _angles(angles):
+	angles = numpy.asarray(angles, dtype=numpy.float32)
+	return numpy.sin(angles).reshape(-1, 1), numpy.cos(angles).reshape(-1, 1)
+
+
+def create(count, mats=None):
+	"""
+		Creates a new batch of mat4s
+
+		@param {number} count Number of matrices in the batch
+		@param {mat4[]} [mats] Array-like object of count mat4s (or a single mat4) to initialize with
+
+		@returns {mat4batch} New (count, 16) float32 array
+	"""
+	dest = numpy.zeros((count, 16), dtype=numpy.float32)
+
+	if mats is not None:
+		dest[:] = numpy.asarray(mats, dtype=numpy.float32).reshape(-1, 16)
+
+	return dest
+
+
+def identity(count=None, dest=None):
+	"""
+		Sets every matrix of a batch to an identity matrix
+
+		@param {number} [count] Number of matrices in a newly created batch, if dest is not specified
+		@param {mat4batch} [dest] mat4batch to set
+
+		@returns {mat4batch} dest if specified, a new mat4batch otherwise
+	"""
+	if dest is None:
+		dest = create(count)
+
+	dest[:] = 0
+	dest[:, 0] = 1
+	dest[:, 5] = 1
+	dest[:, 10] = 1
+	dest[:, 15] = 1
+	return dest
+
+
+def translate(mats, vecs, dest=None):
+	"""
+		Translates each matrix of a batch by the given vector(s)
+
+		@param {mat4batch} mats mat4batch to translate
+		@param {vec3|vec3[]} vecs vec3 specifying the translation, or one vec3 per matrix
+		@param {mat4batch} [dest] mat4batch receiving operation result. If not specified result is written to mats
+
+		@returns {mat4batch} dest if specified, mats otherwise
+	"""
+	m = _as4x4(mats)
+	v = _vectors(vecs)
+
+	if dest is None or dest is mats:
+		dest = mats
+		d = m
+	else:
+		d = _as4x4(dest)
+		d[:, :3, :] = m[:, :3, :]
+
+	d[:, 3, :] = numpy.matmul(v[:, numpy.newaxis, :], m[:, :3, :])[:, 0, :] + m[:, 3, :]
+	return dest
+
+
+def rotate(mats, angles, axis, dest=None):
+	"""
+		Rotates each matrix of a batch by the given angle(s) around the specified axis (or axes)
+		If rotating around a primary axis (X,Y,Z) one of the specialized rotation functions should be used instead for performance
+
+		@param {mat4batch} mats mat4batch to rotate
+		@param {number|number[]} angles Angle (in radians) to rotate, or one angle per matrix
+		@param {vec3|vec3[]} axis vec3 representing the axis to rotate around, or one vec3 per matrix
+		@param {mat4batch} [dest] mat4batch receiving operation result. If not specified result is written to mats
+
+		@returns {mat4batch} dest if specified, mats otherwise
+	"""
+	axis = _vectors(axis)
+	length = numpy.sqrt((axis * axis).sum(axis=1))
+	if not length.all():
+		raise ValueError("Cannot rotate around a zero-length axis")
+	axis = axis / length[:, numpy.newaxis]
+	x = axis[:, 0:1]
+	y = axis[:, 1:2]
+	z = axis[:, 2:3]
+
+	s, c = _angles(angles)
+	t = 1 - c
+
+	# Construct the rotation matrices; b[n, i, k] is element bik of the scalar version
+	b = numpy.empty((max(len(x), len(s)), 3, 3), dtype=numpy.float32)
+	b[:, 0, 0:1] = x * x * t + c
+	b[:, 0, 1:2] = y * x * t + z * s
+	b[:, 0, 2:3] = z * x * t - y * s
+
+	b[:, 1, 0:1] = x * y * t - z * s
+	b[:, 1, 1:2] = y * y * t + c
+	b[:, 1, 2:3] = z * y * t + x * s
+
+	b[:, 2, 0:1] = x * z * t + y * s
+	b[:, 2, 1:2] = y * z * t - x * s
+	b[:, 2, 2:3] = z * z * t + c
+
+	m = _as4x4(mats)
+	if dest is None or dest is mats:
+		dest = mats
+		d = m
+	else:
+		d = _as4x4(dest)
+		d[:, 3, :] = m[:, 3, :]
+
+	# Perform rotation-specific matrix multiplication
+	d[:, :3, :] = numpy.matmul(b, m[:, :3, :])
+	return dest
+
+
+def rotateX(mats, angles, dest=None):
+	"""
+		Rotates each matrix of a batch by the given angle(s) around the X axis
+
+		@param {mat4batch} mats mat4batch to rotate
+		@param {number|number[]} angles Angle (in radians) to rotate, or one angle per matrix
+		@param {mat4batch} [dest] mat4batch receiving operation result. If not specified result is written to mats
+
+		@returns {mat4batch} dest if specified, mats otherwise
+	"""
+	s, c = _angles(angles)
+	m = _as4x4(mats)
+	a1 = m[:, 1, :]
+	a2 = m[:, 2, :]
+
+	r1 = a1 * c + a2 * s
+	r2 = a2 * c - a1 * s
+
+	if dest is None or dest is mats:
+		dest = mats
+		d = m
+	else:  # If the source and destination differ, copy the unchanged rows
+		d = _as4x4(dest)
+		d[:, 0, :] = m[:, 0, :]
+		d[:, 3, :] = m[:, 3, :]
+
+	d[:, 1, :] = r1
+	d[:, 2, :] = r2
+	return dest
+
+
+def rotateY(mats, angles, dest=None):
+	"""
+		Rotates each matrix of a batch by the given angle(s) around the Y axis
+
+		@param {mat4batch} mats mat4batch to rotate
+		@param {number|number[]} angles Angle (in radians) to rotate, or one angle per matrix
+		@param {mat4batch} [dest] mat4batch receiving operation result. If not specified result is written to mats
+
+		@returns {mat4batch} dest if specified, mats otherwise
+	"""
+	s, c = _angles(angles)
+	m = _as4x4(mats)
+	a0 = m[:, 0, :]
+	a2 = m[:, 2, :]
+
+	r0 = a0 * c - a2 * s
+	r2 = a0 * s + a2 * c
+
+	if dest is None or dest is mats:
+		dest = mats
+		d = m
+	else:  # If the source and destination differ, copy the unchanged rows
+		d = _as4x4(dest)
+		d[:, 1, :] = m[:, 1, :]
+		d[:, 3, :] = m[:, 3, :]
+
+	d[:, 0, :] = r0
+	d[:, 2, :] = r2
+	return dest
+
+
+def rotateZ(mats, angles, dest=None):
+	"""
+		Rotates each matrix of a batch by the given angle(s) around the Z axis
+
+		@param {mat4batch} mats mat4batch to rotate
+		@param {number|number[]} angles Angle (in radians) to rotate, or one angle per matrix
+		@param {mat4batch} [dest] mat4batch receiving operation result. If not specified result is written to mats
+
+		@returns {mat4batch} dest if specified, mats otherwise
+	"""
+	s, c = _angles(angles)
+	m = _as4x4(mats)
+	a0 = m[:, 0, :]
+	a1 = m[:, 1, :]
+
+	r0 = a0 * c + a1 * s
+	r1 = a1 * c - a0 * s
+
+	if dest is None or dest is mats:
+		dest = mats
+		d = m
+	else:  # If the source and destination differ, copy the unchanged rows
+		d = _as4x4(dest)
+		d[:, 2, :] = m[:, 2, :]
+		d[:, 3, :] = m[:, 3, :]
+
+	d[:, 0, :] = r0
+	d[:, 1, :] = r1
+	return dest
+
+
+def toInverseMat3(mats, dest=None):
+	"""
+		Calculates the inverse of the upper 3x3 elements of each mat4 in a batch and copies the results into a batch of mat3s
+		The resulting matrices are useful for calculating transformed normals
+
+		@param {mat4batch} mats mat4batch containing values to invert and copy
+		@param {mat3batch} [dest] (N, 9) float32 array receiving values
+
+		@returns {mat3batch} dest if specified, a new (N, 9) array otherwise. Matrices that cannot be inverted are set to zero
+	"""
+	a00 = mats[:, 0]
+	a01 = mats[:, 1]
+	a02 = mats[:, 2]
+
+	a10 = mats[:, 4]
+	a11 = mats[:, 5]
+	a12 = mats[:, 6]
+
+	a20 = mats[:, 8]
+	a21 = mats[:, 9]
+	a22 = mats[:, 10]
+
+	b01 = a22 * a11 - a12 * a21
+	b11 = -a22 * a10 + a12 * a20
+	b21 = a21 * a10 - a11 * a20
+
+	d = a00 * b01 + a01 * b11 + a02 * b21
+	invertible = (d != 0)
+	id = numpy.zeros_like(d)
+	id[invertible] = 1.0 / d[invertible]
+
+	if dest is None:
+		dest = numpy.empty((len(mats), 9), dtype=numpy.float32)
+
+	dest[:, 0] = b01 * id
+	dest[:, 1] = (-a22 * a01 + a02 * a21) * id
+	dest[:, 2] = (a12 * a01 - a02 * a11) * id
+	dest[:, 3] = b11 * id
+	dest[:, 4] = (a22 * a00 - a02 * a20) * id
+	dest[:, 5] = (-a12 * a00 + a02 * a10) * id
+	dest[:, 6] = b21 * id
+	dest[:, 7] = (-a21 * a00 + a01 * a20) * id
+	dest[:, 8] = (a11 * a00 - a01 * a10) * id
+
+	return dest
+
+
+def multiplyVec3(mats, vecs, dest=None):
+	"""
+		Transforms vec3s with the matrices of a batch
+		4th vector component is implicitly '1'
+
+		@param {mat4batch} mats mat4batch to transform the vectors with
+		@param {vec3[]} vecs (N, 3) array of vec3s to transform, one per matrix
+		@param {vec3[]} [dest] (N, 3) array receiving operation result. If not specified result is written to vecs
+
+		@returns {vec3[]} dest if specified, vecs otherwise
+	"""
+	if dest is None:
+		dest = vecs
+
+	m = _as4x4(mats)
+	v = _vectors(vecs)
+	dest[:] = numpy.matmul(v[:, numpy.newaxis, :], m[:, :3, :3])[:, 0, :] + m[:, 3, :3]
+	return dest
+
+
+def lookAt(eyes, centers, ups, dest=None):
+	"""
+		Generates look-at matrices with the given eye positions, focal points, and up axes
+
+		@param {vec3|vec3[]} eyes Position of the viewer, or one position per matrix
+		@param {vec3|vec3[]} centers Point the viewer is looking at, or one point per matrix
+		@param {vec3|vec3[]} ups vec3 pointing "up", or one vec3 per matrix
+		@param {mat4batch} [dest] mat4batch matrices will be written into
+
+		@returns {mat4batch} dest if specified, a new mat4batch otherwise
+	"""
+	eyes = _vectors(eyes)
+	centers = _vectors(centers)
+	ups = _vectors(ups)
+	count = max(len(eyes), len(centers), len(ups))
+
+	if dest is None:
+		dest = create(count)
+
+	def normalize(v):
+		length = numpy.sqrt((v * v).sum(axis=1))
+		nonzero = (length != 0)
+		v[nonzero] /= length[nonzero, numpy.newaxis]
+		v[~nonzero] = 0
+		return v
+
+	z = normalize(numpy.broadcast_to(eyes - centers, (count, 3)).copy())
+	x = normalize(numpy.cross(ups, z))
+	y = normalize(numpy.cross(z, x))
+
+	d = _as4x4(dest)
+	d[:, :3, 0] = x
+	d[:, :3, 1] = y
+	d[:, :3, 2] = z
+	d[:, :3, 3] = 0
+	d[:, 3, 0] = -(x * eyes).sum(axis=1)
+	d[:, 3, 1] = -(y * eyes).sum(axis=1)
+	d[:, 3, 2] = -(z * eyes).sum(axis=1)
+	d[:, 3, 3] = 1
+
+	# an eye position coinciding with its focal point gives an identity matrix
+	coincident = ~(z.any(axis=1))
+	if coincident.any():
+		dest[coincident] = identity(coincident.sum())
+
+	return dest
+
+
+def asGLfloats(mats):
+	"""
+		Returns a GLfloat array sharing memory with a batch, suitable for passing (without copying)
+		to GL functions such as glUniformMatrix4fv with a count of len(mats)
+
+		@param {mat4batch} mats C-contiguous mat4batch
+
+		@returns {GLfloat[]} ctypes array of 16 * len(mats) GLfloats
+	"""
+	return (GLfloat * mats.size).from_buffer(mats)
@@ -0,0 +1,503 @@
+import math
+from shortcrust.gl2 import GLfloat
+from shortcrust.matrix import mat3, mat4
+
+Quat = GLfloat * 4
+
+# Quaternions are stored as [x, y, z, w], as in gl-matrix.
+
+
+def create(quat=None):
+	"""
+		Creates a new instance of a quat using the default array type
+		Any array-like object containing at least 4 numeric elements can serve as a quat
+
+		@param {quat} [quat] quat containing values to initialize with
+
+		@returns {quat} New quat
+	"""
+	dest = Quat()
+
+	if quat:
+		dest[0] = quat[0]
+		dest[1] = quat[1]
+		dest[2] = quat[2]
+		dest[3] = quat[3]
+
+	return dest
+
+
+def set(quat, dest):
+	"""
+		Copies the values of one quat to another
+
+		@param {quat} quat quat containing values to copy
+		@param {quat} dest quat receiving copied values
+
+		@returns {quat} dest
+	"""
+	dest[0] = quat[0]
+	dest[1] = quat[1]
+	dest[2] = quat[2]
+	dest[3] = quat[3]
+	return dest
+
+
+def identity(dest=None):
+	"""
+		Sets a quat to the identity quaternion (no rotation)
+
+		@param {quat} [dest] quat to set
+
+		@returns {quat} dest if specified, a new quat otherwise
+	"""
+	if not dest:
+		dest = create()
+
+	dest[0] = 0
+	dest[1] = 0
+	dest[2] = 0
+	dest[3] = 1
+	return dest
+
+
+def dot(quat, quat2):
+	"""
+		Calculates the dot product of two quats
+
+		@param {quat} quat First operand
+		@param {quat} quat2 Second operand
+
+		@returns {number} Dot product of quat and quat2
+	"""
+	return quat[0] * quat2[0] + quat[1] * quat2[1] + quat[2] * quat2[2] + quat[3] * quat2[3]
+
+
+def conjugate(quat, dest=None):
+	"""
+		Calculates the conjugate of a quat. For a normalized quat this is also the inverse rotation
+
+		@param {quat} quat quat to calculate conjugate of
+		@param {quat} [dest] quat receiving conjugate values. If not specified result is written to quat
+
+		@returns {quat} dest if specified, quat otherwise
+	"""
+	if (not dest) or (quat == dest):
+		quat[0] *= -1
+		quat[1] *= -1
+		quat[2] *= -1
+		return quat
+
+	dest[0] = -quat[0]
+	dest[1] = -quat[1]
+	dest[2] = -quat[2]
+	dest[3] = quat[3]
+	return dest
+
+
+def length(quat):
+	"""
+		Calculates the length of a quat
+
+		@param {quat} quat quat to calculate length of
+
+		@returns Length of quat
+	"""
+	x = quat[0]
+	y = quat[1]
+	z = quat[2]
+	w = quat[3]
+	return math.sqrt(x * x + y * y + z * z + w * w)
+
+
+def normalize(quat, dest=None):
+	"""
+		Generates a unit quaternion of the same direction as the provided quat
+		If quat has a length of zero, dest is set to zero
+
+		@param {quat} quat quat to normalize
+		@param {quat} [dest] quat receiving operation result. If not specified result is written to quat
+
+		@returns {quat} dest if specified, quat otherwise
+	"""
+	if not dest:
+		dest = quat
+
+	x = quat[0]
+	y = quat[1]
+	z = quat[2]
+	w = quat[3]
+	len = math.sqrt(x * x + y * y + z * z + w * w)
+	if not len:
+		dest[0] = 0
+		dest[1] = 0
+		dest[2] = 0
+		dest[3] = 0
+		return dest
+
+	len = 1 / len
+	dest[0] = x * len
+	dest[1] = y * len
+	dest[2] = z * len
+	dest[3] = w * len
+	return dest
+
+
+def multiply(quat, quat2, dest=None):
+	"""
+		Performs a quaternion multiplication; the resulting rotation is that of quat2 followed by quat
+
+		@param {quat} quat First operand
+		@param {quat} quat2 Second operand
+		@param {quat} [dest] quat receiving operation result. If not specified result is written to quat
+
+		@returns {quat} dest if specified, quat otherwise
+	"""
+	if not dest:
+		dest = quat
+
+	qax = quat[0]
+	qay = quat[1]
+	qaz = quat[2]
+	qaw = quat[3]
+	qbx = quat2[0]
+	qby = quat2[1]
+	qbz = quat2[2]
+	qbw = quat2[3]
+
+	dest[0] = qax * qbw + qaw * qbx + qay * qbz - qaz * qby
+	dest[1] = qay * qbw + qaw * qby + qaz * qbx - qax * qbz
+	dest[2] = qaz * qbw + qaw * qbz + qax * qby - qay * qbx
+	dest[3] = qaw * qbw - qax * qbx - qay * qby - qaz * qbz
+
+	return dest
+
+
+def multiplyVec3(quat, vec, dest=None):
+	"""
+		Transforms a vec3 with the given quaternion
+
+		@param {quat} quat quat to transform the vector with
+		@param {vec3} vec vec3 to transform
+		@param {vec3} [dest] vec3 receiving operation result. If not specified result is written to vec
+
+		@returns {vec3} dest if specified, vec otherwise
+	"""
+	if not dest:
+		dest = vec
+
+	x = vec[0]
+	y = vec[1]
+	z = vec[2]
+	qx = quat[0]
+	qy = quat[1]
+	qz = quat[2]
+	qw = quat[3]
+
+	# calculate quat * vec
+	ix = qw * x + qy * z - qz * y
+	iy = qw * y + qz * x - qx * z
+	iz = qw * z + qx * y - qy * x
+	iw = -qx * x - qy * y - qz * z
+
+	# calculate result * inverse quat
+	dest[0] = ix * qw + iw * -qx + iy * -qz - iz * -qy
+	dest[1] = iy * qw + iw * -qy + iz * -qx - ix * -qz
+	dest[2] = iz * qw + iw * -qz + ix * -qy - iy * -qx
+
+	return dest
+
+
+def fromAngleAxis(angle, axis, dest=None):
+	"""
+		Sets a quat from the given angle and rotation axis
+
+		@param {number} angle Angle (in radians) to rotate
+		@param {vec3} axis vec3 representing the axis to rotate around; must be normalized
+		@param {quat} [dest] quat receiving operation result
+
+		@returns {quat} dest if specified, a new quat otherwise
+	"""
+	if not dest:
+		dest = create()
+
+	half = angle * 0.5
+	s = math.sin(half)
+	dest[0] = s * axis[0]
+	dest[1] = s * axis[1]
+	dest[2] = s * axis[2]
+	dest[3] = math.cos(half)
+
+	return dest
+
+
+def rotateX(quat, angle, dest=None):
+	"""
+		Rotates a quat by the given angle around the X axis
+		Much cheaper than mat4.rotateX, so incremental rotations are best accumulated here
+		and converted with toMat4 once per frame
+
+		@param {quat} quat quat to rotate
+		@param {number} angle Angle (in radians) to rotate
+		@param {quat} [dest] quat receiving operation result. If not specified result is written to quat
+
+		@returns {quat} dest if specified, quat otherwise
+	"""
+	if not dest:
+		dest = quat
+
+	half = angle * 0.5
+	bx = math.sin(half)
+	bw = math.cos(half)
+	ax = quat[0]
+	ay = quat[1]
+	az = quat[2]
+	aw = quat[3]
+
+	dest[0] = ax * bw + aw * bx
+	dest[1] = ay * bw + az * bx
+	dest[2] = az * bw - ay * bx
+	dest[3] = aw * bw - ax * bx
+	return dest
+
+
+def rotateY(quat, angle, dest=None):
+	"""
+		Rotates a quat by the given angle around the Y axis
+
+		@param {quat} quat quat to rotate
+		@param {number} angle Angle (in radians) to rotate
+		@param {quat} [dest] quat receiving operation result. If not specified result is written to quat
+
+		@returns {quat} dest if specified, quat otherwise
+	"""
+	if not dest:
+		dest = quat
+
+	half = angle * 0.5
+	by = math.sin(half)
+	bw = math.cos(half)
+	ax = quat[0]
+	ay = quat[1]
+	az = quat[2]
+	aw = quat[3]
+
+	dest[0] = ax * bw - az * by
+	dest[1] = ay * bw + aw * by
+	dest[2] = az * bw + ax * by
+	dest[3] = aw * bw - ay * by
+	return dest
+
+
+def rotateZ(quat, angle, dest=None):
+	"""
+		Rotates a quat by the given angle around the Z axis
+
+		@param {quat} quat quat to rotate
+		@param {number} angle Angle (in radians) to rotate
+		@param {quat} [dest] quat receiving operation result. If not specified result is written to quat
+
+		@returns {quat} dest if specified, quat otherwise
+	"""
+	if not dest:
+		dest = quat
+
+	half = angle * 0.5
+	bz = math.sin(half)
+	bw = math.cos(half)
+	ax = quat[0]
+	ay = quat[1]
+	az = quat[2]
+	aw = quat[3]
+
+	dest[0] = ax * bw + ay * bz
+	dest[1] = ay * bw - ax * bz
+	dest[2] = az * bw + aw * bz
+	dest[3] = aw * bw - az * bz
+	return dest
+
+
+def toMat3(quat, dest=None):
+	"""
+		Calculates a 3x3 rotation matrix from the given quat
+
+		@param {quat} quat quat to create matrix from
+		@param {mat3} [dest] mat3 receiving operation result
+
+		@returns {mat3} dest if specified, a new mat3 otherwise
+	"""
+	if not dest:
+		dest = mat3.create()
+
+	x = quat[0]
+	y = quat[1]
+	z = quat[2]
+	w = quat[3]
+
+	x2 = x + x
+	y2 = y + y
+	z2 = z + z
+
+	xx = x * x2
+	xy = x * y2
+	xz = x * z2
+	yy = y * y2
+	yz = y * z2
+	zz = z * z2
+	wx = w * x2
+	wy = w * y2
+	wz = w * z2
+
+	dest[0] = 1 - (yy + zz)
+	dest[1] = xy + wz
+	dest[2] = xz - wy
+
+	dest[3] = xy - wz
+	dest[4] = 1 - (xx + zz)
+	dest[5] = yz + wx
+
+	dest[6] = xz + wy
+	dest[7] = yz - wx
+	dest[8] = 1 - (xx + yy)
+
+	return dest
+
+
+def toMat4(quat, dest=None):
+	"""
+		Calculates a 4x4 rotation matrix from the given quat
+
+		@param {quat} quat quat to create matrix from
+		@param {mat4} [dest] mat4 receiving operation result
+
+		@returns {mat4} dest if specified, a new mat4 otherwise
+	"""
+	if not dest:
+		dest = mat4.create()
+
+	x = quat[0]
+	y = quat[1]
+	z = quat[2]
+	w = quat[3]
+
+	x2 = x + x
+	y2 = y + y
+	z2 = z + z
+
+	xx = x * x2
+	xy = x * y2
+	xz = x * z2
+	yy = y * y2
+	yz = y * z2
+	zz = z * z2
+	wx = w * x2
+	wy = w * y2
+	wz = w * z2
+
+	dest[0] = 1 - (yy + zz)
+	dest[1] = xy + wz
+	dest[2] = xz - wy
+	dest[3] = 0
+
+	dest[4] = xy - wz
+	dest[5] = 1 - (xx + zz)
+	dest[6] = yz + wx
+	dest[7] = 0
+
+	dest[8] = xz + wy
+	dest[9] = yz - wx
+	dest[10] = 1 - (xx + yy)
+	dest[11] = 0
+
+	dest[12] = 0
+	dest[13] = 0
+	dest[14] = 0
+	dest[15] = 1
+
+	return dest
+
+
+def slerp(quat, quat2, slerp, dest=None):
+	"""
+		Performs a spherical linear interpolation between two quats, along the shortest path
+
+		@param {quat} quat First quaternion
+		@param {quat} quat2 Second quaternion
+		@param {number} slerp Interpolation amount between the two inputs
+		@param {quat} [dest] quat receiving operation result. If not specified result is written to quat
+
+		@returns {quat} dest if specified, quat otherwise
+	"""
+	if not dest:
+		dest = quat
+
+	ax = quat[0]
+	ay = quat[1]
+	az = quat[2]
+	aw = quat[3]
+	bx = quat2[0]
+	by = quat2[1]
+	bz = quat2[2]
+	bw = quat2[3]
+
+	cosHalfTheta = ax * bx + ay * by + az * bz + aw * bw
+	if cosHalfTheta < 0:
+		# q and -q represent the same rotation; negate one to take the shorter path
+		cosHalfTheta = -cosHalfTheta
+		bx = -bx
+		by = -by
+		bz = -bz
+		bw = -bw
+
+	if cosHalfTheta >= 1.0:
+		dest[0] = ax
+		dest[1] = ay
+		dest[2] = az
+		dest[3] = aw
+		return dest
+
+	halfTheta = math.acos(cosHalfTheta)
+	sinHalfTheta = math.sqrt(1.0 - cosHalfTheta * cosHalfTheta)
+
+	if sinHalfTheta < 0.001:
+		ratioA = 1 - slerp
+		ratioB = slerp
+	else:
+		ratioA = math.sin((1 - slerp) * halfTheta) / sinHalfTheta
+		ratioB = math.sin(slerp * halfTheta) / sinHalfTheta
+
+	dest[0] = ax * ratioA + bx * ratioB
+	dest[1] = ay * ratioA + by * ratioB
+	dest[2] = az * ratioA + bz * ratioB
+	dest[3] = aw * ratioA + bw * ratioB
+
+	return dest
+
+
+def nlerp(quat, quat2, lerp, dest=None):
+	"""
+		Performs a normalized linear interpolation between two quats, along the shortest path
+		Cheaper than slerp, at the cost of a non-constant angular velocity; well suited to
+		blending between nearby orientations such as successive animation keyframes
+
+		@param {quat} quat First quaternion
+		@param {quat} quat2 Second quaternion
+		@param {number} lerp Interpolation amount between the two inputs
+		@param {quat} [dest] quat receiving operation result. If not specified result is written to quat
+
+		@returns {quat} dest if specified, quat otherwise
+	"""
+	if not dest:
+		dest = quat
+
+	ratioB = lerp
+	if dot(quat, quat2) < 0:
+		ratioB = -lerp
+	ratioA = 1 - lerp
+
+	dest[0] = quat[0] * ratioA + quat2[0] * ratioB
+	dest[1] = quat[1] * ratioA + quat2[1] * ratioB
+	dest[2] = quat[2] * ratioA + quat2[2] * ratioB
+	dest[3] = quat[3] * ratioA + quat2[3] * ratioB
+
+	return normalize(dest)
@@ -0,0 +1,333 @@
+import numpy
+
+# Batched counterparts of the functions in shortcrust.matrix.quat. A batch of N quats is
+# stored as a numpy array of shape (N, 4) and dtype float32, each row being [x, y, z, w].
+#
+# Wherever a function takes an angle, axis or interpolation amount, either a single value
+# (applied to every quat) or one value per quat may be passed.
+
+
+def _column(values):
+	return numpy.asarray(values, dtype=numpy.float32).reshape(-1, 1)
+
+
+def create(count, quats=None):
+	"""
+		Creates a new batch of quats
+
+		@param {number} count Number of quats in the batch
+		@param {quat[]} [quats] Array-like object of count quats (or a single quat) to initialize with
+
+		@returns {quatbatch} New (count, 4) float32 array
+	"""
+	dest = numpy.zeros((count, 4), dtype=numpy.float32)
+
+	if quats is not None:
+		dest[:] = numpy.asarray(quats, dtype=numpy.float32).reshape(-1, 4)
+
+	return dest
+
+
+def identity(count=None, dest=None):
+	"""
+		Sets every quat of a batch to the identity quaternion
+
+		@param {number} [count] Number of quats in a newly created batch, if dest is not specified
+		@param {quatbatch} [dest] quatbatch to set
+
+		@returns {quatbatch} dest if specified, a new quatbatch otherwise
+	"""
+	if dest is None:
+		dest = create(count)
+
+	dest[:, :3] = 0
+	dest[:, 3] = 1
+	return dest
+
+
+def dot(quats, quats2):
+	"""
+		Calculates the dot products of corresponding quats
+
+		@returns {number[]} (N,) array of dot products
+	"""
+	return (numpy.asarray(quats) * numpy.asarray(quats2)).sum(axis=-1)
+
+
+def normalize(quats, dest=None):
+	"""
+		Normalizes each quat of a batch. Quats of zero length are set to zero
+
+		@param {quatbatch} quats quatbatch to normalize
+		@param {quatbatch} [dest] quatbatch receiving operation result. If not specified result is written to quats
+
+		@returns {quatbatch} dest if specified, quats otherwise
+	"""
+	if dest is None:
+		dest = quats
+
+	length = numpy.sqrt((quats * quats).sum(axis=1))
+	nonzero = (length != 0)
+	dest[nonzero] = quats[nonzero] / length[nonzero, numpy.newaxis]
+	dest[~nonzero] = 0
+	return dest
+
+
+def conjugate(quats, dest=None):
+	"""
+		Calculates the conjugate of each quat of a batch
+
+		@param {quatbatch} quats quatbatch to calculate conjugates of
+		@param {quatbatch} [dest] quatbatch receiving operation result. If not specified result is written to quats
+
+		@returns {quatbatch} dest if specified, quats otherwise
+	"""
+	if dest is None:
+		dest = quats
+
+	dest[:, :3] = -quats[:, :3]
+	dest[:, 3] = quats[:, 3]
+	return dest
+
+
+def multiply(quats, quats2, dest=None):
+	"""
+		Multiplies corresponding quats of two batches (or each quat of a batch by a single quat)
+
+		@param {quatbatch} quats First operand
+		@param {quatbatch|quat} quats2 Second operand
+		@param {quatbatch} [dest] quatbatch receiving operation result. If not specified result is written to quats
+
+		@returns {quatbatch} dest if specified, quats otherwise
+	"""
+	if dest is None:
+		dest = quats
+
+	quats2 = numpy.asarray(quats2, dtype=numpy.float32).reshape(-1, 4)
+	qax = quats[:, 0]
+	qay = quats[:, 1]
+	qaz = quats[:, 2]
+	qaw = quats[:, 3]
+	qbx = quats2[:, 0]
+	qby = quats2[:, 1]
+	qbz = quats2[:, 2]
+	qbw = quats2[:, 3]
+
+	x = qax * qbw + qaw * qbx + qay * qbz - qaz * qby
+	y = qay * qbw + qaw * qby + qaz * qbx - qax * qbz
+	z = qaz * qbw + qaw * qbz + qax * qby - qay * qbx
+	w = qaw * qbw - qax * qbx - qay * qby - qaz * qbz
+
+	dest[:, 0] = x
+	dest[:, 1] = y
+	dest[:, 2] = z
+	dest[:, 3] = w
+	return dest
+
+
+def multiplyVec3(quats, vecs, dest=None):
+	"""
+		Transforms vec3s with the quats of a batch
+
+		@param {quatbatch} quats quatbatch to transform the vectors with
+		@param {vec3[]} vecs (N, 3) array of vec3s to transform, one per quat
+		@param {vec3[]} [dest] (N, 3) array receiving operation result. If not specified result is written to vecs
+
+		@returns {vec3[]} dest if specified, vecs otherwise
+	"""
+	if dest is None:
+		dest = vecs
+
+	q = quats[:, :3]
+	w = quats[:, 3:4]
+	# v' = v + 2w(q x v) + 2q x (q x v)
+	t = 2 * numpy.cross(q, vecs)
+	dest[:] = vecs + w * t + numpy.cross(q, t)
+	return dest
+
+
+def fromAngleAxis(angles, axes, dest=None):
+	"""
+		Sets quats from the given angles and rotation axes
+
+		@param {number|number[]} angles Angle (in radians) to rotate, or one angle per quat
+		@param {vec3|vec3[]} axes Normalized vec3 representing the axis to rotate around, or one per quat
+		@param {quatbatch} [dest] quatbatch receiving operation result
+
+		@returns {quatbatch} dest if specified, a new quatbatch otherwise
+	"""
+	half = _column(angles) * 0.5
+	axes = numpy.asarray(axes, dtype=numpy.float32).reshape(-1, 3)
+
+	if dest is None:
+		dest = create(max(len(half), len(axes)))
+
+	dest[:, :3] = numpy.sin(half) * axes
+	dest[:, 3:4] = numpy.cos(half)
+	return dest
+
+
+def _rotate(quats, angles, axis, dest):
+	# multiply by the quaternion for a rotation about one primary axis
+	half = _column(angles) * 0.5
+	b = numpy.zeros((len(half), 4), dtype=numpy.float32)
+	b[:, axis:axis + 1] = numpy.sin(half)
+	b[:, 3:4] = numpy.cos(half)
+	return multiply(quats, b, dest)
+
+
+def rotateX(quats, angles, dest=None):
+	"""
+		Rotates each quat of a batch by the given angle(s) around the X axis
+
+		@returns {quatbatch} dest if specified, quats otherwise
+	"""
+	return _rotate(quats, angles, 0, dest)
+
+
+def rotateY(quats, angles, dest=None):
+	"""
+		Rotates each quat of a batch by the given angle(s) around the Y axis
+
+		@returns {quatbatch} dest if specified, quats otherwise
+	"""
+	return _rotate(quats, angles, 1, dest)
+
+
+def rotateZ(quats, angles, dest=None):
+	"""
+		Rotates each quat of a batch by the given angle(s) around the Z axis
+
+		@returns {quatbatch} dest if specified, quats otherwise
+	"""
+	return _rotate(quats, angles, 2, dest)
+
+
+def toMat3(quats, dest=None):
+	"""
+		Calculates 3x3 rotation matrices from a batch of quats
+
+		@param {quatbatch} quats quatbatch to create matrices from
+		@param {mat3batch} [dest] (N, 9) float32 array receiving operation result
+
+		@returns {mat3batch} dest if specified, a new (N, 9) array otherwise
+	"""
+	if dest is None:
+		dest = numpy.empty((len(quats), 9), dtype=numpy.float32)
+
+	_toRotation(quats, dest, 3)
+	return dest
+
+
+def toMat4(quats, dest=None):
+	"""
+		Calculates 4x4 rotation matrices from a batch of quats
+
+		@param {quatbatch} quats quatbatch to create matrices from
+		@param {mat4batch} [dest] mat4batch receiving operation result
+
+		@returns {mat4batch} dest if specified, a new mat4batch otherwise
+	"""
+	if dest is None:
+		dest = numpy.empty((len(quats), 16), dtype=numpy.float32)
+
+	_toRotation(quats, dest, 4)
+	dest[:, 3] = 0
+	dest[:, 7] = 0
+	dest[:, 11] = 0
+	dest[:, 12:15] = 0
+	dest[:, 15] = 1
+	return dest
+
+
+def _toRotation(quats, dest, size):
+	# write the rotation matrix elements into columns of a batch of size x size matrices
+	x = quats[:, 0]
+	y = quats[:, 1]
+	z = quats[:, 2]
+	w = quats[:, 3]
+
+	x2 = x + x
+	y2 = y + y
+	z2 = z + z
+
+	xx = x * x2
+	xy = x * y2
+	xz = x * z2
+	yy = y * y2
+	yz = y * z2
+	zz = z * z2
+	wx = w * x2
+	wy = w * y2
+	wz = w * z2
+
+	dest[:, 0] = 1 - (yy + zz)
+	dest[:, 1] = xy + wz
+	dest[:, 2] = xz - wy
+
+	dest[:, size] = xy - wz
+	dest[:, size + 1] = 1 - (xx + zz)
+	dest[:, size + 2] = yz + wx
+
+	dest[:, 2 * size] = xz + wy
+	dest[:, 2 * size + 1] = yz - wx
+	dest[:, 2 * size + 2] = 1 - (xx + yy)
+
+
+def _shortestPath(quats, quats2):
+	# negate quats2 where necessary, so that interpolation takes the shorter path
+	quats2 = numpy.asarray(quats2, dtype=numpy.float32).reshape(-1, 4)
+	cosHalfTheta = dot(quats, quats2)
+	sign = numpy.where(cosHalfTheta < 0, -1, 1).astype(numpy.float32)
+	return quats2 * sign[:, numpy.newaxis], numpy.abs(cosHalfTheta)
+
+
+def slerp(quats, quats2, amounts, dest=None):
+	"""
+		Performs spherical linear interpolation between corresponding quats, along the shortest path
+
+		@param {quatbatch} quats First quaternions
+		@param {quatbatch|quat} quats2 Second quaternions
+		@param {number|number[]} amounts Interpolation amount, or one amount per quat
+		@param {quatbatch} [dest] quatbatch receiving operation result. If not specified result is written to quats
+
+		@returns {quatbatch} dest if specified, quats otherwise
+	"""
+	if dest is None:
+		dest = quats
+
+	quats2, cosHalfTheta = _shortestPath(quats, quats2)
+	t = _column(amounts)
+	cosHalfTheta = numpy.minimum(cosHalfTheta, 1.0)[:, numpy.newaxis]
+
+	halfTheta = numpy.arccos(cosHalfTheta)
+	sinHalfTheta = numpy.sqrt(1.0 - cosHalfTheta * cosHalfTheta)
+
+	# fall back on linear interpolation where the quats are (nearly) identical
+	linear = (sinHalfTheta < 0.001)
+	safeSin = numpy.where(linear, 1.0, sinHalfTheta)
+	ratioA = numpy.where(linear, 1 - t, numpy.sin((1 - t) * halfTheta) / safeSin)
+	ratioB = numpy.where(linear, t, numpy.sin(t * halfTheta) / safeSin)
+
+	dest[:] = quats * ratioA + quats2 * ratioB
+	return dest
+
+
+def nlerp(quats, quats2, amounts, dest=None):
+	"""
+		Performs normalized linear interpolation between corresponding quats, along the shortest path
+
+		@param {quatbatch} quats First quaternions
+		@param {quatbatch|quat} quats2 Second quaternions
+		@param {number|number[]} amounts Interpolation amount, or one amount per quat
+		@param {quatbatch} [dest] quatbatch receiving operation result. If not specified result is written to quats
+
+		@returns {quatbatch} dest if specified, quats otherwise
+	"""
+	if dest is None:
+		dest = quats
+
+	quats2, cosHalfTheta = _shortestPath(quats, quats2)
+	t = _column(amounts)
+	dest[:] = quats * (1 - t) + quats2 * t
+	return normalize(dest)
@@ -23,3 +23,282 @@ def create(vec=None):
 		dest[0] = dest[1] = dest[2] = 0
 
 	return dest
+
+
+def set(vec, dest):
+	"""
+		Copies the values of one vec3 to another
+
+		@param {vec3} vec vec3 containing values to copy
+		@param {vec3} dest vec3 receiving copied values
+
+		@returns {vec3} dest
+	"""
+	dest[0] = vec[0]
+	dest[1] = vec[1]
+	dest[2] = vec[2]
+
+	return dest
+
+
+def add(vec, vec2, dest=None):
+	"""
+		Performs a vector addition
+
+		@param {vec3} vec First operand
+		@param {vec3} vec2 Second operand
+		@param {vec3} [dest] vec3 receiving operation result. If not specified result is written to vec
+
+		@returns {vec3} dest if specified, vec otherwise
+	"""
+	if (not dest) or (vec == dest):
+		vec[0] += vec2[0]
+		vec[1] += vec2[1]
+		vec[2] += vec2[2]
+		return vec
+
+	dest[0] = vec[0] + vec2[0]
+	dest[1] = vec[1] + vec2[1]
+	dest[2] = vec[2] + vec2[2]
+	return dest
+
+
+def subtract(vec, vec2, dest=None):
+	"""
+		Performs a vector subtraction
+
+		@param {vec3} vec First operand
+		@param {vec3} vec2 Second operand
+		@param {vec3} [dest] vec3 receiving operation result. If not specified result is written to vec
+
+		@returns {vec3} dest if specified, vec otherwise
+	"""
+	if (not dest) or (vec == dest):
+		vec[0] -= vec2[0]
+		vec[1] -= vec2[1]
+		vec[2] -= vec2[2]
+		return vec
+
+	dest[0] = vec[0] - vec2[0]
+	dest[1] = vec[1] - vec2[1]
+	dest[2] = vec[2] - vec2[2]
+	return dest
+
+
+def multiply(vec, vec2, dest=None):
+	"""
+		Performs a vector multiplication
+
+		@param {vec3} vec First operand
+		@param {vec3} vec2 Second operand
+		@param {vec3} [dest] vec3 receiving operation result. If not specified result is written to vec
+
+		@returns {vec3} dest if specified, vec otherwise
+	"""
+	if (not dest) or (vec == dest):
+		vec[0] *= vec2[0]
+		vec[1] *= vec2[1]
+		vec[2] *= vec2[2]
+		return vec
+
+	dest[0] = vec[0] * vec2[0]
+	dest[1] = vec[1] * vec2[1]
+	dest[2] = vec[2] * vec2[2]
+	return dest
+
+
+def negate(vec, dest=None):
+	"""
+		Negates the components of a vec3
+
+		@param {vec3} vec vec3 to negate
+		@param {vec3} [dest] vec3 receiving operation result. If not specified result is written to vec
+
+		@returns {vec3} dest if specified, vec otherwise
+	"""
+	if not dest:
+		dest = vec
+
+	dest[0] = -vec[0]
+	dest[1] = -vec[1]
+	dest[2] = -vec[2]
+	return dest
+
+
+def scale(vec, val, dest=None):
+	"""
+		Multiplies the components of a vec3 by a scalar value
+
+		@param {vec3} vec vec3 to scale
+		@param {number} val Value to scale by
+		@param {vec3} [dest] vec3 receiving operation result. If not specified result is written to vec
+
+		@returns {vec3} dest if specified, vec otherwise
+	"""
+	if (not dest) or (vec == dest):
+		vec[0] *= val
+		vec[1] *= val
+		vec[2] *= val
+		return vec
+
+	dest[0] = vec[0] * val
+	dest[1] = vec[1] * val
+	dest[2] = vec[2] * val
+	return dest
+
+
+def normalize(vec, dest=None):
+	"""
+		Generates a unit vector of the same direction as the provided vec3
+		If vector length is 0, returns [0, 0, 0]
+
+		@param {vec3} vec vec3 to normalize
+		@param {vec3} [dest] vec3 receiving operation result. If not specified result is written to vec
+
+		@returns {vec3} dest if specified, vec otherwise
+	"""
+	if not dest:
+		dest = vec
+
+	x = vec[0]
+	y = vec[1]
+	z = vec[2]
+	len = math.sqrt(x * x + y * y + z * z)
+
+	if not len:
+		dest[0] = 0
+		dest[1] = 0
+		dest[2] = 0
+		return dest
+	elif len == 1:
+		dest[0] = x
+		dest[1] = y
+		dest[2] = z
+		return dest
+
+	len = 1 / len
+	dest[0] = x * len
+	dest[1] = y * len
+	dest[2] = z * len
+	return dest
+
+
+def cross(vec, vec2, dest=None):
+	"""
+		Generates the cross product of two vec3s
+
+		@param {vec3} vec First operand
+		@param {vec3} vec2 Second operand
+		@param {vec3} [dest] vec3 receiving operation result. If not specified result is written to vec
+
+		@returns {vec3} dest if specified, vec otherwise
+	"""
+	if not dest:
+		dest = vec
+
+	x = vec[0]
+	y = vec[1]
+	z = vec[2]
+	x2 = vec2[0]
+	y2 = vec2[1]
+	z2 = vec2[2]
+
+	dest[0] = y * z2 - z * y2
+	dest[1] = z * x2 - x * z2
+	dest[2] = x * y2 - y * x2
+	return dest
+
+
+def length(vec):
+	"""
+		Calculates the length of a vec3
+
+		@param {vec3} vec vec3 to calculate length of
+
+		@returns {number} Length of vec
+	"""
+	x = vec[0]
+	y = vec[1]
+	z = vec[2]
+	return math.sqrt(x * x + y * y + z * z)
+
+
+def dot(vec, vec2):
+	"""
+		Calculates the dot product of two vec3s
+
+		@param {vec3} vec First operand
+		@param {vec3} vec2 Second operand
+
+		@returns {number} Dot product of vec and vec2
+	"""
+	return vec[0] * vec2[0] + vec[1] * vec2[1] + vec[2] * vec2[2]
+
+
+def direction(vec, vec2, dest=None):
+	"""
+		Generates a unit vector pointing from vec2 to vec (as in gl-matrix, so that
+		direction(eye, center) is the view's z axis in mat4.lookAt)
+
+		@param {vec3} vec vec3 to point to
+		@param {vec3} vec2 Origin vec3
+		@param {vec3} [dest] vec3 receiving operation result. If not specified result is written to vec
+
+		@returns {vec3} dest if specified, vec otherwise
+	"""
+	if not dest:
+		dest = vec
+
+	x = vec[0] - vec2[0]
+	y = vec[1] - vec2[1]
+	z = vec[2] - vec2[2]
+	len = math.sqrt(x * x + y * y + z * z)
+
+	if not len:
+		dest[0] = 0
+		dest[1] = 0
+		dest[2] = 0
+		return dest
+
+	len = 1 / len
+	dest[0] = x * len
+	dest[1] = y * len
+	dest[2] = z * len
+	return dest
+
+
+def lerp(vec, vec2, lerp, dest=None):
+	"""
+		Performs a linear interpolation between two vec3
+
+		@param {vec3} vec First vector
+		@param {vec3} vec2 Second vector
+		@param {number} lerp Interpolation amount between the two inputs
+		@param {vec3} [dest] vec3 receiving operation result. If not specified result is written to vec
+
+		@returns {vec3} dest if specified, vec otherwise
+	"""
+	if not dest:
+		dest = vec
+
+	dest[0] = vec[0] + lerp * (vec2[0] - vec[0])
+	dest[1] = vec[1] + lerp * (vec2[1] - vec[1])
+	dest[2] = vec[2] + lerp * (vec2[2] - vec[2])
+
+	return dest
+
+
+def dist(vec, vec2):
+	"""
+		Calculates the euclidian distance between two vec3
+
+		@param {vec3} vec First vector
+		@param {vec3} vec2 Second vector
+
+		@returns {number} Distance between vec and vec2
+	"""
+	x = vec2[0] - vec[0]
+	y = vec2[1] - vec[1]
+	z = vec2[2] - vec[2]
+
+	return math.sqrt(x * x + y * y + z * z)
@@ -0,0 +1,155 @@
+import numpy
+
+# Batched counterparts of the functions in shortcrust.matrix.vec3, along with functions for
+# transforming whole arrays of points and normals by a mat4. A batch of N vec3s is stored
+# as a numpy array of shape (N, 3) and dtype float32 - the same layout as the position and
+# normal arrays of a geometry, so these can be transformed in one call.
+#
+# Wherever a function takes a second vector or an interpolation amount, either a single
+# value (applied to every vector) or one value per vector may be passed.
+
+
+def _vectors(vecs):
+	return numpy.asarray(vecs, dtype=numpy.float32).reshape(-1, 3)
+
+
+def _as4x4(mat):
+	# view a single mat4 as m[i, j] = element 4 * i + j (column i, row j)
+	return numpy.asarray(mat, dtype=numpy.float32).reshape(4, 4)
+
+
+def create(count, vecs=None):
+	"""
+		Creates a new batch of vec3s
+
+		@param {number} count Number of vectors in the batch
+		@param {vec3[]} [vecs] Array-like object of count vec3s (or a single vec3) to initialize with
+
+		@returns {vec3batch} New (count, 3) float32 array
+	"""
+	dest = numpy.zeros((count, 3), dtype=numpy.float32)
+
+	if vecs is not None:
+		dest[:] = _vectors(vecs)
+
+	return dest
+
+
+def length(vecs):
+	"""
+		Calculates the length of each vec3 of a batch
+
+		@returns {number[]} (N,) array of lengths
+	"""
+	return numpy.sqrt((vecs * vecs).sum(axis=1))
+
+
+def dot(vecs, vecs2):
+	"""
+		Calculates the dot products of corresponding vec3s
+
+		@returns {number[]} (N,) array of dot products
+	"""
+	return (vecs * _vectors(vecs2)).sum(axis=1)
+
+
+def normalize(vecs, dest=None):
+	"""
+		Normalizes each vec3 of a batch. Vectors of zero length are set to [0, 0, 0]
+
+		@param {vec3batch} vecs vec3batch to normalize
+		@param {vec3batch} [dest] vec3batch receiving operation result. If not specified result is written to vecs
+
+		@returns {vec3batch} dest if specified, vecs otherwise
+	"""
+	if dest is None:
+		dest = vecs
+
+	len = length(vecs)
+	nonzero = (len != 0)
+	dest[nonzero] = vecs[nonzero] / len[nonzero, numpy.newaxis]
+	dest[~nonzero] = 0
+	return dest
+
+
+def cross(vecs, vecs2, dest=None):
+	"""
+		Generates the cross products of corresponding vec3s
+
+		@param {vec3batch} vecs First operand
+		@param {vec3batch|vec3} vecs2 Second operand
+		@param {vec3batch} [dest] vec3batch receiving operation result. If not specified result is written to vecs
+
+		@returns {vec3batch} dest if specified, vecs otherwise
+	"""
+	if dest is None:
+		dest = vecs
+
+	dest[:] = numpy.cross(vecs, _vectors(vecs2))
+	return dest
+
+
+def lerp(vecs, vecs2, amounts, dest=None):
+	"""
+		Performs linear interpolation between corresponding vec3s
+
+		@param {vec3batch} vecs First vectors
+		@param {vec3batch|vec3} vecs2 Second vectors
+		@param {number|number[]} amounts Interpolation amount, or one amount per vector
+		@param {vec3batch} [dest] vec3batch receiving operation result. If not specified result is written to vecs
+
+		@returns {vec3batch} dest if specified, vecs otherwise
+	"""
+	if dest is None:
+		dest = vecs
+
+	t = numpy.asarray(amounts, dtype=numpy.float32).reshape(-1, 1)
+	dest[:] = vecs + t * (_vectors(vecs2) - vecs)
+	return dest
+
+
+def transformPoints(mat, points, dest=None):
+	"""
+		Transforms an array of points by a mat4, as per mat4.multiplyVec3
+		4th vector component is implicitly '1'
+
+		@param {mat4} mat mat4 to transform the points with
+		@param {vec3batch} points (N, 3) array of points to transform
+		@param {vec3batch} [dest] vec3batch receiving operation result. If not specified result is written to points
+
+		@returns {vec3batch} dest if specified, points otherwise
+	"""
+	if dest is None:
+		dest = points
+
+	m = _as4x4(mat)
+	dest[:] = numpy.dot(points, m[:3, :3]) + m[3, :3]
+	return dest
+
+
+def transformNormals(mat, normals, dest=None, normalize_result=True):
+	"""
+		Transforms an array of normals by a mat4. Normals are multiplied by the transposed
+		inverse of the upper 3x3 of the matrix (as per mat4.toInverseMat3 / mat3.transpose),
+		so that they remain perpendicular to their surfaces under non-uniform scaling
+
+		@param {mat4} mat mat4 to transform the normals with
+		@param {vec3batch} normals (N, 3) array of normals to transform
+		@param {vec3batch} [dest] vec3batch receiving operation result. If not specified result is written to normals
+		@param {boolean} [normalize_result] If true (the default), rescale the results to unit length
+
+		@returns {vec3batch} dest if specified, normals otherwise, None if the matrix cannot be inverted
+	"""
+	m = _as4x4(mat)[:3, :3]
+	try:
+		n = numpy.linalg.inv(m).T
+	except numpy.linalg.LinAlgError:
+		return None
+
+	if dest is None:
+		dest = normals
+
+	dest[:] = numpy.dot(normals, n)
+	if normalize_result:
+		normalize(dest)
+	return dest
@@ -0,0 +1,378 @@
+"""
+	A loose octree, for finding the objects of a large scene that lie within the view
+	frustum or within a radius of a point without testing every one, while letting the
+	objects move cheaply.
+
+	Each object is stored by its bounding sphere, in a single node: the smallest cell
+	whose loosened bounds (the cell grown by a factor of looseness around its center)
+	hold the sphere wherever its center lies within the cell. The node is therefore found
+	directly from the sphere's radius and center, without descending the tree, and an
+	object that moves only needs relinking when its center crosses into another cell -
+	which move_many detects for thousands of objects at once, leaving the rest untouched.
+"""
+import numpy
+
+# arrays holding a value per object slot, grown together as objects are inserted
+_SLOT_ARRAYS = [
+	('local_centers', numpy.float32, (3,)),
+	('local_radii', numpy.float32, ()),
+	('centers', numpy.float32, (3,)),
+	('radii', numpy.float32, ()),
+	('levels', numpy.int64, ()),
+	('cells', numpy.int64, (3,)),
+	('slot_nodes', numpy.int64, ()),
+	('slot_next', numpy.int64, ()),
+	('slot_prev', numpy.int64, ()),
+]
+
+
+def _octant(key):
+	# the position of the node with key (level, x, y, z) among its parent's children
+	level, x, y, z = key
+	return (x & 1) | (y & 1) << 1 | (z & 1) << 2
+
+
+class LooseOctree(object):
+	"""
+		A loose octree over a cube of the given size centred on center. Objects are
+		anything with bounds (such as a Mesh or LODMesh), or any hashable object given
+		with bounds of its own, placed by an optional model matrix; their bounding
+		spheres are transformed as in Frustum.intersects_spheres. Objects outside the
+		cube are kept at the root, and tested on every query. To index the nodes of a
+		scene graph, insert(node, node.world_matrix, node.mesh.bounds) each node, and
+		move it when its world matrix changes.
+
+		max_depth limits the number of levels below the root, and so the smallest cell
+		size (size / 2 ** max_depth); looseness must be greater than 1, and trades
+		tighter cells (smaller values) against objects being stored deeper in the tree.
+	"""
+	def __init__(self, center=(0.0, 0.0, 0.0), size=1024.0, max_depth=8, looseness=2.0):
+		if looseness <= 1:
+			raise ValueError("looseness must be greater than 1")
+		self.size = float(size)
+		self.origin = numpy.asarray(center, dtype=numpy.float64) - self.size * 0.5
+		self._origin = self.origin.tolist()
+		self.max_depth = max_depth
+		self.looseness = looseness
+
+		# object -> slot, and the reverse; slots index the arrays of _SLOT_ARRAYS, with
+		# slot_nodes giving the node holding each object (-1 for free slots), and
+		# slot_next / slot_prev linking the objects of each node into a list
+		self.slots = {}
+		self.objects = []
+		self.free_slots = []
+		for name, dtype, shape in _SLOT_ARRAYS:
+			setattr(self, name, numpy.zeros((0,) + shape, dtype=dtype))
+
+		# nodes are numbers indexing node_keys - (level, x, y, z), where level is 0 for the
+		# root and x, y, z count cells along each axis at that level - node_centers,
+		# node_children (the child node in each octant, or -1) and node_first (the first
+		# slot in the node's list of objects, or -1). Nodes holding no objects and no
+		# children are removed, and their numbers reused.
+		self.node_ids = {}
+		self.node_keys = []
+		self.node_centers = numpy.zeros((0, 3), dtype=numpy.float64)
+		self.node_children = numpy.zeros((0, 8), dtype=numpy.int64)
+		self.node_first = numpy.zeros(0, dtype=numpy.int64)
+		self.node_parents = []
+		self.node_child_counts = []
+		self.free_nodes = []
+		self.root = self._node((0, 0, 0, 0))
+
+	def __len__(self):
+		return len(self.slots)
+
+	def __contains__(self, obj):
+		return obj in self.slots
+
+	@property
+	def node_count(self):
+		return len(self.node_ids)
+
+	def _allocate(self, count):
+		reused = min(count, len(self.free_slots))
+		slots = [self.free_slots.pop() for i in range(reused)]
+		first = len(self.objects)
+		slots.extend(range(first, first + count - reused))
+		self.objects.extend([None] * (count - reused))
+
+		capacity = len(self.radii)
+		if len(self.objects) > capacity:
+			capacity = max(len(self.objects), capacity * 2)
+			for name, dtype, shape in _SLOT_ARRAYS:
+				old = getattr(self, name)
+				new = numpy.zeros((capacity,) + shape, dtype=dtype)
+				new[:len(old)] = old
+				setattr(self, name, new)
+		return slots
+
+	def _locate(self, centers, radii):
+		"""
+			Return the level and cell coordinates of the node to hold each of the given
+			spheres, as arrays
+		"""
+		# the deepest level whose loosened cells hold the sphere from anywhere within the
+		# cell: radius <= (looseness - 1) * cell size / 2
+		with numpy.errstate(divide='ignore'):
+			levels = numpy.floor(numpy.log2((self.looseness - 1) * self.size * 0.5 / radii))
+		levels = numpy.clip(numpy.nan_to_num(levels), 0, self.max_depth).astype(numpy.int64)
+
+		cell_sizes = numpy.ldexp(self.size, -levels)
+		cells = numpy.floor((centers - self.origin) / cell_sizes[:, numpy.newaxis]).astype(numpy.int64)
+		outside = ((cells < 0) | (cells >= (1 << levels)[:, numpy.newaxis])).any(axis=1)
+		levels[outside] = 0
+		cells[outside] = 0
+		return levels, cells
+
+	def _node(self, key):
+		"""
+			Return the number of the node with the given key, creating it (and any missing
+			ancestors) if necessary
+		"""
+		node = self.node_ids.get(key)
+		if node is not None:
+			return node
+
+		level, x, y, z = key
+		parent = self._node((level - 1, x >> 1, y >> 1, z >> 1)) if level else -1
+		if self.free_nodes:
+			node = self.free_nodes.pop()
+			self.node_keys[node] = key
+			self.node_parents[node] = parent
+			self.node_child_counts[node] = 0
+		else:
+			node = len(self.node_parents)
+			self.node_keys.append(key)
+			self.node_parents.append(parent)
+			self.node_child_counts.append(0)
+			if node == len(self.node_centers):
+				capacity = max(node * 2, 64)
+				self.node_centers = numpy.resize(self.node_centers, (capacity, 3))
+				self.node_children = numpy.resize(self.node_children, (capacity, 8))
+				self.node_first = numpy.resize(self.node_first, capacity)
+
+		cell_size = self.size / (1 << level)
+		self.node_centers[node] = (
+			self._origin[0] + (x + 0.5) * cell_size,
+			self._origin[1] + (y + 0.5) * cell_size,
+			self._origin[2] + (z + 0.5) * cell_size,
+		)
+		self.node_children[node] = -1
+		self.node_first[node] = -1
+		if parent >= 0:
+			self.node_children[parent, _octant(key)] = node
+			self.node_child_counts[parent] += 1
+		self.node_ids[key] = node
+		return node
+
+	def _link(self, slot, key):
+		node = self._node(key)
+		first = self.node_first[node]
+		self.slot_next[slot] = first
+		self.slot_prev[slot] = -1
+		if first >= 0:
+			self.slot_prev[first] = slot
+		self.node_first[node] = slot
+		self.slot_nodes[slot] = node
+
+	def _unlink(self, slot):
+		node = int(self.slot_nodes[slot])
+		self.slot_nodes[slot] = -1
+		previous = self.slot_prev[slot]
+		following = self.slot_next[slot]
+		if previous >= 0:
+			self.slot_next[previous] = following
+		else:
+			self.node_first[node] = following
+		if following >= 0:
+			self.slot_prev[following] = previous
+		while node != self.root and self.node_first[node] < 0 and not self.node_child_counts[node]:
+			parent = self.node_parents[node]
+			key = self.node_keys[node]
+			self.node_children[parent, _octant(key)] = -1
+			self.node_child_counts[parent] -= 1
+			del self.node_ids[key]
+			self.free_nodes.append(node)
+			node = parent
+
+	def _place(self, slots, model_matrices, inserting=False):
+		"""
+			Recompute the bounding spheres of the objects in slots from their model
+			matrices, and relink those that have changed node. Returns the number relinked.
+		"""
+		slots = numpy.asarray(slots, dtype=numpy.int64)
+		centers = self.local_centers[slots]
+		radii = self.local_radii[slots]
+		if model_matrices is not None:
+			m = numpy.asarray(model_matrices, dtype=numpy.float32).reshape(-1, 4, 4)
+			centers = numpy.matmul(centers[:, numpy.newaxis, :], m[:, :3, :3])[:, 0, :] + m[:, 3, :3]
+			radii = radii * numpy.sqrt((m[:, :3, :3] * m[:, :3, :3]).sum(axis=2)).max(axis=1)
+		self.centers[slots] = centers
+		self.radii[slots] = radii
+
+		levels, cells = self._locate(centers, radii)
+		if inserting:
+			moved = numpy.ones(len(slots), dtype=bool)
+		else:
+			moved = (levels != self.levels[slots]) | (cells != self.cells[slots]).any(axis=1)
+		self.levels[slots] = levels
+		self.cells[slots] = cells
+
+		for slot, level, (x, y, z) in zip(slots[moved].tolist(), levels[moved].tolist(), cells[moved].tolist()):
+			if not inserting:
+				self._unlink(slot)
+			self._link(slot, (level, x, y, z))
+		return int(moved.sum())
+
+	def insert(self, obj, model_matrix=None, bounds=None):
+		"""
+			Add an object, placed by model_matrix, using bounds (a Bounds, or anything with
+			center and radius) in place of obj.bounds if given
+		"""
+		self.insert_many([obj], model_matrix, None if bounds is None else [bounds])
+
+	def insert_many(self, objects, model_matrices=None, bounds=None):
+		"""
+			Add a list of objects at once, where model_matrices (if given) is a (N, 16)
+			mat4batch of their model matrices and bounds a list of their bounds
+		"""
+		objects = list(objects)
+		if bounds is None:
+			bounds = [obj.bounds for obj in objects]
+		for obj in objects:
+			if obj in self.slots:
+				raise ValueError("Object is already in the octree")
+
+		slots = self._allocate(len(objects))
+		self.local_centers[slots] = numpy.array([b.center for b in bounds], dtype=numpy.float32).reshape(-1, 3)
+		self.local_radii[slots] = [b.radius for b in bounds]
+		for obj, slot in zip(objects, slots):
+			self.slots[obj] = slot
+			self.objects[slot] = obj
+		self._place(slots, model_matrices, inserting=True)
+
+	def remove(self, obj):
+		slot = self.slots.pop(obj)
+		self._unlink(slot)
+		self.objects[slot] = None
+		self.free_slots.append(slot)
+
+	def move(self, obj, model_matrix):
+		"""
+			Update an object's position from its new model matrix. Returns True if it
+			had to be relinked into another node.
+		"""
+		return bool(self._place([self.slots[obj]], model_matrix))
+
+	def move_many(self, objects, model_matrices):
+		"""
+			Update the positions of a list of objects from a (N, 16) mat4batch of their
+			new model matrices. Returns the number of objects relinked into other nodes.
+		"""
+		return self._place([self.slots[obj] for obj in objects], model_matrices)
+
+	def _slots_of(self, nodes):
+		"""
+			Return the slots of the objects held by the given nodes, following all of
+			their lists a step at a time
+		"""
+		slots = []
+		current = self.node_first.take(nodes)
+		current = current[current >= 0]
+		while len(current) > 1:
+			slots.append(current)
+			current = self.slot_next.take(current)
+			current = current[current >= 0]
+		# the rest of a single long list, such as the root's
+		tail = []
+		slot = int(current[0]) if len(current) else -1
+		while slot >= 0:
+			tail.append(slot)
+			slot = int(self.slot_next[slot])
+		slots.append(numpy.array(tail, dtype=numpy.int64))
+		return numpy.concatenate(slots)
+
+	def _search(self, test):
+		"""
+			Descend from the root through every node whose loosened bounds pass test, and
+			return (candidates, accepted): the slots of the objects in those nodes, except
+			that nodes lying wholly within the query have their objects, and all of their
+			descendants' objects, returned in accepted without further tests.
+
+			test(centers, half_size) is given an array of the centers of a level's nodes
+			and the half size of their loosened bounds, and returns boolean arrays
+			(intersecting, inside). The root itself is not tested. Each level's nodes are
+			tested at once.
+		"""
+		root = numpy.array([self.root])
+		candidate_nodes = [root]
+		accepted_nodes = []
+		# nodes to test, and nodes within the subtrees of those found to be inside
+		nodes = self._children(root)
+		inside_nodes = numpy.zeros(0, dtype=numpy.int64)
+		level = 1
+		while len(nodes) or len(inside_nodes):
+			if len(nodes):
+				half_size = numpy.ldexp(self.size, -level) * self.looseness * 0.5
+				intersecting, inside = test(self.node_centers.take(nodes, axis=0), half_size)
+				partial = nodes[intersecting & ~inside]
+				candidate_nodes.append(partial)
+				inside_nodes = numpy.concatenate([inside_nodes, nodes[inside]])
+				nodes = self._children(partial)
+			if len(inside_nodes):
+				accepted_nodes.append(inside_nodes)
+				inside_nodes = self._children(inside_nodes)
+			level += 1
+		return (
+			self._slots_of(numpy.concatenate(candidate_nodes)),
+			self._slots_of(numpy.concatenate(accepted_nodes or [inside_nodes])),
+		)
+
+	def _children(self, nodes):
+		children = self.node_children.take(nodes, axis=0).reshape(-1)
+		return children[children >= 0]
+
+	def query_frustum(self, frustum):
+		"""
+			Return the objects whose bounding spheres are at least partly inside frustum
+			(a shortcrust.culling.Frustum built from the projection and view matrices).
+			Counts towards the frustum's drawn_count and culled_count.
+		"""
+		# scale the planes so that a box of half size h reaches h either side of them
+		planes = frustum.planes.astype(numpy.float64)
+		planes /= numpy.abs(planes[:, :3]).sum(axis=1)[:, numpy.newaxis]
+
+		def test(centers, half_size):
+			distances = (numpy.dot(centers, planes[:, :3].T) + planes[:, 3]).min(axis=1)
+			return distances >= -half_size, distances >= half_size
+
+		candidates, accepted = self._search(test)
+		visible = candidates[frustum.intersects_spheres(self.centers[candidates], self.radii[candidates])]
+		slots = numpy.concatenate([accepted, visible])
+
+		frustum.drawn_count += len(slots)
+		frustum.culled_count += len(self.slots) - len(slots)
+		objects = self.objects
+		return [objects[slot] for slot in slots.tolist()]
+
+	def query_sphere(self, center, radius):
+		"""
+			Return the objects whose bounding spheres come within radius of center
+		"""
+		center = numpy.asarray(center, dtype=numpy.float64)
+
+		def test(centers, half_size):
+			offsets = numpy.clip(center, centers - half_size, centers + half_size) - center
+			# the corner of each box furthest from center
+			corners = numpy.abs(centers - center) + half_size
+			return (
+				(offsets * offsets).sum(axis=1) <= radius * radius,
+				(corners * corners).sum(axis=1) <= radius * radius,
+			)
+
+		candidates, accepted = self._search(test)
+		offsets = self.centers[candidates] - center
+		reach = self.radii[candidates] + radius
+		slots = numpy.concatenate([accepted, candidates[(offsets * offsets).sum(axis=1) <= reach * reach]])
+		objects = self.objects
+		return [objects[slot] for slot in slots.tolist()]
@@ -5,6 +5,7 @@ _gl = ctypes.CDLL('libGLESv2.so')
 
 
 GLboolean = ctypes.c_ubyte
+GLbyte = ctypes.c_byte
 GLubyte = ctypes.c_ubyte
 GLint = ctypes.c_int
 GLuint = ctypes.c_uint
@@ -95,6 +96,12 @@ def glBufferData(target, data, usage):
 	_gl.glBufferData(target, ctypes.sizeof(data), ctypes.byref(data), usage)
 
 
+@gl_check_error
+def glBufferSubData(target, offset, data):
+	# offset and size are GLintptr / GLsizeiptr, which are pointer-sized
+	_gl.glBufferSubData(target, ctypes.c_long(offset), ctypes.c_long(ctypes.sizeof(data)), ctypes.byref(data))
+
+
 glClear = gl_check_error(_gl.glClear)
 
 
@@ -163,6 +170,14 @@ def glGenTextures(n):
 glGetAttribLocation = gl_check_error(_gl.glGetAttribLocation)
 
 
+@gl_check_error
+def glGetIntegerv(pname):
+	# only single-valued parameters are supported
+	params = GLint()
+	_gl.glGetIntegerv(pname, ctypes.byref(params))
+	return params.value
+
+
 @gl_check_error
 def glGetProgramInfoLog(program):
 	N = 1024
@@ -0,0 +1,130 @@
+from shortcrust.matrix import mat3, mat4
+
+
+class Node(object):
+	"""
+		A node in a transform hierarchy. Each node has a local transform ('matrix',
+		relative to its parent) and lazily computes and caches its world matrix (the
+		product of the local matrices from the root down to this node) and the
+		corresponding normal matrix. These are only recalculated when the node or one
+		of its ancestors has changed since they were last read, so unchanging parts of
+		a scene cost nothing per frame.
+
+		If the root node's matrix is the camera's view matrix (as generated by
+		mat4.lookAt), world_matrix gives each node's model-view matrix and
+		normal_matrix is suitable for passing straight to the shader.
+
+		After modifying 'matrix' directly, call invalidate(); the transform methods
+		(translate, rotate etc) and set_matrix do this automatically.
+	"""
+
+	def __init__(self, matrix=None, mesh=None):
+		self.parent = None
+		self.children = []
+		self.mesh = mesh
+
+		if matrix:
+			self.matrix = mat4.create(matrix)
+		else:
+			self.matrix = mat4.identity()
+
+		self._world_matrix = mat4.create()
+		self._normal_matrix = mat3.create()
+
+		# If a node is dirty, all of its descendants are dirty too; this allows
+		# invalidate() to stop descending as soon as it reaches a dirty node
+		self._world_dirty = True
+		self._normal_dirty = True
+
+	def add(self, child):
+		"""
+			Attach child (detaching it from its current parent, if any) as a child of this node
+		"""
+		if child.parent:
+			child.parent.remove(child)
+		child.parent = self
+		self.children.append(child)
+		child.invalidate()
+		return child
+
+	def remove(self, child):
+		self.children.remove(child)
+		child.parent = None
+		child.invalidate()
+
+	def invalidate(self):
+		"""
+			Mark the cached world and normal matrices of this node and its descendants as
+			needing to be recalculated
+		"""
+		if self._world_dirty:
+			return
+		self._world_dirty = True
+		self._normal_dirty = True
+		for child in self.children:
+			child.invalidate()
+
+	@property
+	def world_matrix(self):
+		if self._world_dirty:
+			if self.parent:
+				mat4.multiply(self.parent.world_matrix, self.matrix, self._world_matrix)
+			else:
+				mat4.set(self.matrix, self._world_matrix)
+			self._world_dirty = False
+		return self._world_matrix
+
+	@property
+	def normal_matrix(self):
+		"""
+			The transposed inverse of the upper 3x3 of world_matrix, for transforming normals.
+			If world_matrix cannot be inverted, the previous value is retained.
+		"""
+		if self._normal_dirty:
+			if mat4.toInverseMat3(self.world_matrix, self._normal_matrix):
+				mat3.transpose(self._normal_matrix)
+			self._normal_dirty = False
+		return self._normal_matrix
+
+	def walk(self):
+		"""
+			Iterate over this node and all of its descendants, parents before children
+		"""
+		yield self
+		for child in self.children:
+			for node in child.walk():
+				yield node
+
+	# Local transform operations, as per the corresponding mat4 functions
+
+	def set_matrix(self, mat):
+		mat4.set(mat, self.matrix)
+		self.invalidate()
+
+	def identity(self):
+		mat4.identity(self.matrix)
+		self.invalidate()
+
+	def translate(self, vec):
+		mat4.translate(self.matrix, vec)
+		self.invalidate()
+
+	def scale(self, vec):
+		mat4.scale(self.matrix, vec)
+		self.invalidate()
+
+	def rotate(self, angle, axis):
+		mat4.rotate(self.matrix, angle, axis)
+		self.invalidate()
+
+	def rotateX(self, angle):
+		mat4.rotateX(self.matrix, angle)
+		self.invalidate()
+
+	def rotateY(self, angle):
+		mat4.rotateY(self.matrix, angle)
+		self.invalidate()
+
+	def rotateZ(self, angle):
+		mat4.rotateZ(self.matrix, angle)
+		self.invalidate()